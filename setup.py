@@ -37,8 +37,9 @@ setup(
     ],
     install_requires=["Django>=2.1,<3.1", "Wagtail>=2.6,<2.10", "polib>=1.1,<2.0"],
     extras_require={
-        "testing": ["dj-database-url==0.5.0",],
+        "testing": ["dj-database-url==0.5.0", "httpx>=0.18,<1.0",],
         "google_translate": ["googletrans>=2.4,<3.0",],
+        "deepl": ["requests>=2.20,<3.0", "httpx>=0.18,<1.0",],
     },
     zip_safe=False,
 )
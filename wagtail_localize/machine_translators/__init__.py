@@ -1,6 +1,8 @@
 from django.conf import settings
 from django.utils.module_loading import import_string
 
+from .cache import CachingMachineTranslator, get_translator_key
+
 
 def get_machine_translator():
     config = getattr(settings, 'WAGTAILLOCALIZE_MACHINE_TRANSLATOR', None)
@@ -11,4 +13,9 @@ def get_machine_translator():
     # Raises ImportError
     machine_translator_class = import_string(config['CLASS'])
 
-    return machine_translator_class(config.get('OPTIONS', {}))
+    machine_translator = machine_translator_class(config.get('OPTIONS', {}))
+
+    if config.get('CACHE', True):
+        machine_translator = CachingMachineTranslator(machine_translator, get_translator_key(config))
+
+    return machine_translator
@@ -1,11 +1,236 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+
+
+class MachineTranslatorError(Exception):
+    pass
+
+
+class TemporaryMachineTranslatorError(MachineTranslatorError):
+    """
+    Raised by translate_chunk when the request may succeed if it's tried again later,
+    for example if the service is rate limiting us or is temporarily unavailable.
+
+    retry_after is the number of seconds the service asked us to wait, if it said.
+    """
+    def __init__(self, message="", retry_after=None):
+        self.retry_after = retry_after
+
+        super().__init__(message)
+
+
+def chunk_strings(strings, max_count=None, max_characters=None):
+    """
+    Splits the given list of StringValues into lists that contain no more than max_count
+    strings and (unless a single string is longer) no more than max_characters characters.
+    """
+    chunk = []
+    chunk_characters = 0
+
+    for string in strings:
+        string_characters = len(string.data)
+
+        if chunk and (
+            (max_count is not None and len(chunk) >= max_count)
+            or (max_characters is not None and chunk_characters + string_characters > max_characters)
+        ):
+            yield chunk
+            chunk = []
+            chunk_characters = 0
+
+        chunk.append(string)
+        chunk_characters += string_characters
+
+    if chunk:
+        yield chunk
+
+
 class BaseMachineTranslator:
+    """
+    Base class for machine translators.
+
+    Machine translators can either override translate, which is given all of the strings
+    at once, or implement translate_chunk (and optionally atranslate_chunk). Only the
+    latter are split into chunks of max_chunk_size strings and max_chunk_characters
+    characters, sent in parallel and retried when they raise TemporaryMachineTranslatorError.
+    """
     display_name = "Unknown"
 
+    # The maximum number of strings and total characters that can be sent in a single
+    # request. These, and the other attributes below, can be overridden with the
+    # MAX_CHUNK_SIZE, MAX_CHUNK_CHARACTERS, MAX_WORKERS, MAX_RETRIES and RETRY_BACKOFF
+    # options.
+    max_chunk_size = None
+    max_chunk_characters = None
+
+    # The number of chunks that are sent at the same time
+    max_workers = 1
+
+    # How many times to retry a chunk that raised TemporaryMachineTranslatorError, and the
+    # number of seconds to wait before the first retry (this doubles after each attempt)
+    max_retries = 3
+    retry_backoff = 1.0
+
     def __init__(self, options):
         self.options = options
 
-    def translate(self, strings):
+    def get_option(self, name, default):
+        return self.options.get(name, default)
+
+    def get_chunks(self, strings):
+        return list(chunk_strings(
+            strings,
+            max_count=self.get_option('MAX_CHUNK_SIZE', self.max_chunk_size),
+            max_characters=self.get_option('MAX_CHUNK_CHARACTERS', self.max_chunk_characters),
+        ))
+
+    def combine_chunks(self, strings, results):
+        translations = {}
+        for result in results:
+            translations.update(result)
+
+        # Return the translations in the same order as the input
+        return {
+            string: translations[string] for string in strings if string in translations
+        }
+
+    def get_retry_delay(self, error, attempt):
+        """
+        Returns the number of seconds to wait before retrying a chunk that raised the
+        given TemporaryMachineTranslatorError, or None if it shouldn't be retried.
+        """
+        if attempt >= self.get_option('MAX_RETRIES', self.max_retries):
+            return None
+
+        if error.retry_after is not None:
+            return error.retry_after
+
+        return self.get_option('RETRY_BACKOFF', self.retry_backoff) * 2 ** attempt
+
+    def translate(self, source_locale, target_locale, strings):
+        """
+        Translates the given list of StringValues. Returns a dict mapping each StringValue
+        to its translation.
+
+        Machine translators can override this, or implement translate_chunk instead. In
+        that case, this splits the strings into chunks, sends them (in parallel if
+        max_workers > 1) and combines the results.
+        """
+        if type(self).translate_chunk is BaseMachineTranslator.translate_chunk:
+            raise NotImplementedError("Machine translators must implement translate or translate_chunk")
+
+        chunks = self.get_chunks(strings)
+
+        def translate_chunk(chunk):
+            return self.translate_chunk_with_retry(source_locale, target_locale, chunk)
+
+        max_workers = min(self.get_option('MAX_WORKERS', self.max_workers), len(chunks))
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(translate_chunk, chunks))
+        else:
+            results = [translate_chunk(chunk) for chunk in chunks]
+
+        return self.combine_chunks(strings, results)
+
+    def translate_chunk(self, source_locale, target_locale, strings):
+        """
+        Translates a list of StringValues that fits in a single request. Returns a dict
+        mapping each StringValue to its translation.
+        """
         raise NotImplementedError
 
+    def translate_chunk_with_retry(self, source_locale, target_locale, strings):
+        attempt = 0
+
+        while True:
+            try:
+                return self.translate_chunk(source_locale, target_locale, strings)
+            except TemporaryMachineTranslatorError as e:
+                delay = self.get_retry_delay(e, attempt)
+                if delay is None:
+                    raise
+
+                time.sleep(delay)
+                attempt += 1
+
+    async def atranslate(self, source_locale, target_locale, strings):
+        """
+        Async version of translate. The chunks are sent concurrently (up to max_workers
+        at a time) using atranslate_chunk.
+
+        Machine translators that only implement translate can't be split into chunks, so
+        translate is run in a thread instead.
+        """
+        if (
+            type(self).translate_chunk is BaseMachineTranslator.translate_chunk
+            and type(self).atranslate_chunk is BaseMachineTranslator.atranslate_chunk
+        ):
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.translate, source_locale, target_locale, strings
+            )
+
+        return await self.atranslate_chunks(source_locale, target_locale, strings, self.atranslate_chunk)
+
+    async def atranslate_chunks(self, source_locale, target_locale, strings, atranslate_chunk):
+        semaphore = asyncio.Semaphore(self.get_option('MAX_WORKERS', self.max_workers))
+
+        async def translate_chunk(chunk):
+            attempt = 0
+
+            async with semaphore:
+                while True:
+                    try:
+                        return await atranslate_chunk(source_locale, target_locale, chunk)
+                    except TemporaryMachineTranslatorError as e:
+                        delay = self.get_retry_delay(e, attempt)
+                        if delay is None:
+                            raise
+
+                        await asyncio.sleep(delay)
+                        attempt += 1
+
+        results = await asyncio.gather(*[translate_chunk(chunk) for chunk in self.get_chunks(strings)])
+
+        return self.combine_chunks(strings, results)
+
+    async def atranslate_chunk(self, source_locale, target_locale, strings):
+        """
+        Async version of translate_chunk. By default, this runs translate_chunk in a thread.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.translate_chunk, source_locale, target_locale, strings
+        )
+
     def can_translate(self, source_locale, target_locale):
         return False
+
+
+async def atranslate_to_locales(machine_translator, source_locale, target_locales, strings, concurrency=4):
+    """
+    Translates the given strings into each of the target locales, running up to `concurrency`
+    translations at the same time.
+
+    Returns a dict mapping each target locale to the result of machine_translator.atranslate.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def translate(target_locale):
+        async with semaphore:
+            return await machine_translator.atranslate(source_locale, target_locale, strings)
+
+    results = await asyncio.gather(*[translate(target_locale) for target_locale in target_locales])
+
+    return dict(zip(target_locales, results))
+
+
+def translate_to_locales(machine_translator, source_locale, target_locales, strings, concurrency=4):
+    """
+    Synchronous version of atranslate_to_locales.
+    """
+    return async_to_sync(atranslate_to_locales)(
+        machine_translator, source_locale, target_locales, strings, concurrency=concurrency
+    )
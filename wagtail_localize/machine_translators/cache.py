@@ -0,0 +1,228 @@
+import json
+import threading
+import uuid
+from collections import OrderedDict, namedtuple
+
+from asgiref.sync import sync_to_async
+
+from wagtail_localize.strings import StringValue
+
+from .base import BaseMachineTranslator
+
+
+CacheInfo = namedtuple("CacheInfo", ["memory_hits", "database_hits", "misses", "currsize", "maxsize"])
+
+
+class MachineTranslationMemoryCache:
+    """
+    A bounded, thread-safe LRU cache of machine translations that sits in front of
+    the MachineTranslation table.
+
+    This also counts how many strings were found in memory, found in the database
+    or had to be sent to the machine translator.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.clear()
+
+    def get_many(self, keys):
+        """
+        Returns a dict of the translations that are in the cache for the given keys.
+        """
+        found = {}
+
+        with self.lock:
+            for key in keys:
+                if key in self.translations:
+                    self.translations.move_to_end(key)
+                    found[key] = self.translations[key]
+
+        return found
+
+    def set_many(self, translations):
+        with self.lock:
+            for key, data in translations.items():
+                self.translations[key] = data
+                self.translations.move_to_end(key)
+
+            while len(self.translations) > self.maxsize:
+                self.translations.popitem(last=False)
+
+    def record(self, memory_hits=0, database_hits=0, misses=0):
+        with self.lock:
+            self.memory_hits += memory_hits
+            self.database_hits += database_hits
+            self.misses += misses
+
+    def cache_info(self):
+        return CacheInfo(self.memory_hits, self.database_hits, self.misses, len(self.translations), self.maxsize)
+
+    def clear(self):
+        self.translations = OrderedDict()
+        self.memory_hits = 0
+        self.database_hits = 0
+        self.misses = 0
+
+
+memory_cache = MachineTranslationMemoryCache()
+
+
+def get_translator_key(config):
+    """
+    Returns a UUID that identifies the given machine translator configuration.
+
+    Translations are cached under this key, so changing the class or options of the
+    machine translator stops translations made by the old configuration being used.
+    """
+    return uuid.uuid5(
+        uuid.NAMESPACE_OID,
+        json.dumps([config['CLASS'], config.get('OPTIONS', {})], sort_keys=True, separators=(",", ":"), default=str),
+    )
+
+
+class CachingMachineTranslator(BaseMachineTranslator):
+    """
+    Wraps a machine translator so that strings it has already translated are fetched
+    from memory or the MachineTranslation table instead of being sent again.
+    """
+
+    def __init__(self, translator, translator_key, memory_cache=memory_cache):
+        super().__init__(translator.options)
+        self.translator = translator
+        self.translator_key = translator_key
+        self.memory_cache = memory_cache
+
+    @property
+    def display_name(self):
+        return self.translator.display_name
+
+    def can_translate(self, source_locale, target_locale):
+        return self.translator.can_translate(source_locale, target_locale)
+
+    def get_key(self, source_locale, target_locale, source_hash):
+        return (self.translator_key, source_locale.id, target_locale.id, source_hash)
+
+    def get_cached_translations(self, source_locale, target_locale, source_hashes):
+        """
+        Returns a dict of the translations of the given source hashes that are in
+        memory or in the database.
+        """
+        from ..models import MachineTranslation, filter_in_batches
+
+        # Look in memory first
+        translations = {
+            key[3]: data
+            for key, data in self.memory_cache.get_many(
+                self.get_key(source_locale, target_locale, source_hash) for source_hash in source_hashes
+            ).items()
+        }
+        memory_hits = len(translations)
+
+        # Then the database
+        database_translations = {}
+        missing_hashes = set(source_hashes) - translations.keys()
+        if missing_hashes:
+            database_translations = dict(
+                filter_in_batches(
+                    MachineTranslation.objects.filter(
+                        translator_key=self.translator_key,
+                        source_locale=source_locale,
+                        target_locale=target_locale,
+                    ).values_list("source_hash", "data"),
+                    "source_hash",
+                    missing_hashes,
+                )
+            )
+            translations.update(database_translations)
+
+            self.memory_cache.set_many({
+                self.get_key(source_locale, target_locale, source_hash): data
+                for source_hash, data in database_translations.items()
+            })
+
+        self.memory_cache.record(memory_hits=memory_hits, database_hits=len(database_translations))
+
+        return translations
+
+    def save_translations(self, source_locale, target_locale, translations):
+        """
+        Caches translations that were returned by the machine translator.
+
+        Returns them as a dict keyed by source hash.
+        """
+        from ..models import MachineTranslation, String
+
+        new_translations = {
+            String.get_data_hash(string.data): translation.data
+            for string, translation in translations.items()
+        }
+
+        MachineTranslation.objects.bulk_create([
+            MachineTranslation(
+                translator_key=self.translator_key,
+                source_locale=source_locale,
+                target_locale=target_locale,
+                source_hash=source_hash,
+                data=data,
+            )
+            for source_hash, data in new_translations.items()
+        ], ignore_conflicts=True)
+
+        self.memory_cache.set_many({
+            self.get_key(source_locale, target_locale, source_hash): data
+            for source_hash, data in new_translations.items()
+        })
+
+        return new_translations
+
+    def translate(self, source_locale, target_locale, strings):
+        from ..models import String
+
+        strings_by_hash = {String.get_data_hash(string.data): string for string in strings}
+        translations = self.get_cached_translations(source_locale, target_locale, strings_by_hash.keys())
+
+        # Send anything that isn't cached to the machine translator
+        missing_strings = [string for source_hash, string in strings_by_hash.items() if source_hash not in translations]
+        if missing_strings:
+            translations.update(self.save_translations(
+                source_locale, target_locale, self.translator.translate(source_locale, target_locale, missing_strings)
+            ))
+
+        self.memory_cache.record(misses=len(missing_strings))
+
+        return {
+            string: StringValue(translations[source_hash])
+            for source_hash, string in strings_by_hash.items()
+            if source_hash in translations
+        }
+
+    async def atranslate(self, source_locale, target_locale, strings):
+        from ..models import String
+
+        strings_by_hash = {String.get_data_hash(string.data): string for string in strings}
+        translations = await sync_to_async(self.get_cached_translations)(source_locale, target_locale, strings_by_hash.keys())
+
+        missing_strings = [string for source_hash, string in strings_by_hash.items() if source_hash not in translations]
+        if missing_strings:
+            translations.update(await sync_to_async(self.save_translations)(
+                source_locale, target_locale, await self.translator.atranslate(source_locale, target_locale, missing_strings)
+            ))
+
+        self.memory_cache.record(misses=len(missing_strings))
+
+        return {
+            string: StringValue(translations[source_hash])
+            for source_hash, string in strings_by_hash.items()
+            if source_hash in translations
+        }
+
+    def clear_cache(self):
+        """
+        Deletes all translations that were cached for this machine translator's configuration.
+        """
+        from ..models import MachineTranslation
+
+        MachineTranslation.objects.filter(translator_key=self.translator_key).delete()
+        self.memory_cache.clear()
@@ -1,9 +1,20 @@
+import asyncio
+import threading
+import weakref
+
 import requests
+from requests.adapters import HTTPAdapter
 from django.utils.translation import gettext_lazy as _
 
 from wagtail_localize.strings import StringValue
 
-from .base import BaseMachineTranslator
+from .base import BaseMachineTranslator, TemporaryMachineTranslatorError
+
+try:
+    # Optional, used by atranslate to make requests without blocking the event loop
+    import httpx
+except ImportError:
+    httpx = None
 
 
 def language_code(code, is_target=False):
@@ -14,22 +25,146 @@ def language_code(code, is_target=False):
     return code.split("-")[0].upper()
 
 
+# Sessions are shared by all DeepLTranslator instances (and threads) in the process so
+# that connections to DeepL are kept alive and reused between calls. They're keyed by
+# pool size as that can't be changed once the session is created.
+sessions = {}
+sessions_lock = threading.Lock()
+
+
+def get_session(pool_size):
+    with sessions_lock:
+        if pool_size not in sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            sessions[pool_size] = session
+
+        return sessions[pool_size]
+
+
+def close_sessions():
+    """
+    Closes all connections to DeepL.
+    """
+    with sessions_lock:
+        for session in sessions.values():
+            session.close()
+
+        sessions.clear()
+
+
+# Like the sessions, httpx clients are shared by all DeepLTranslator instances so their
+# connections are reused. A client can only be used by the event loop it was created in,
+# so they're kept per event loop (and dropped along with the loop)
+async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client(pool_size):
+    clients = async_clients.setdefault(asyncio.get_running_loop(), {})
+
+    if pool_size not in clients or clients[pool_size].is_closed:
+        clients[pool_size] = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    return clients[pool_size]
+
+
+async def aclose_async_clients():
+    """
+    Closes all connections to DeepL that were made from the running event loop. Call
+    this when shutting down, for example from an ASGI lifespan shutdown handler.
+    """
+    clients = async_clients.pop(asyncio.get_running_loop(), {})
+
+    for client in clients.values():
+        await client.aclose()
+
+
+def get_retry_after(response):
+    try:
+        return float(response.headers['Retry-After'])
+    except (KeyError, ValueError):
+        return None
+
+
 class DeepLTranslator(BaseMachineTranslator):
     display_name = _("DeepL")
 
-    def translate(self, source_locale, target_locale, strings):
-        response = requests.post('https://api.deepl.com/v2/translate', {
+    # DeepL accepts up to 50 texts per request and request bodies of up to 128KiB
+    max_chunk_size = 50
+    max_chunk_characters = 100000
+    max_workers = 4
+
+    # Seconds to wait to connect and for a response. Can be overridden with the TIMEOUT option
+    timeout = (5, 60)
+
+    def get_pool_size(self):
+        # Use at least as many connections as there are workers so they don't wait for each other
+        return self.get_option('POOL_SIZE', self.get_option('MAX_WORKERS', self.max_workers))
+
+    @property
+    def session(self):
+        return get_session(self.get_pool_size())
+
+    def get_url(self):
+        return self.options.get('API_URL', 'https://api.deepl.com/v2/translate')
+
+    def get_request_data(self, source_locale, target_locale, strings):
+        return {
             'auth_key': self.options['AUTH_KEY'],
             'text': [string.data for string in strings],
             'tag_handling': 'xml',
             'source_lang': language_code(source_locale.language_code),
             'target_lang': language_code(target_locale.language_code, is_target=True),
-        })
+        }
+
+    def handle_response(self, strings, response):
+        # Works with both requests and httpx responses
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TemporaryMachineTranslatorError(
+                "DeepL responded with status {}".format(response.status_code),
+                retry_after=get_retry_after(response),
+            )
+
+        response.raise_for_status()
 
         return {
             string: StringValue(translation['text'])
             for string, translation in zip(strings, response.json()['translations'])
         }
 
+    def translate_chunk(self, source_locale, target_locale, strings):
+        response = self.session.post(
+            self.get_url(),
+            self.get_request_data(source_locale, target_locale, strings),
+            timeout=self.get_option('TIMEOUT', self.timeout),
+        )
+
+        return self.handle_response(strings, response)
+
+    async def atranslate(self, source_locale, target_locale, strings):
+        if httpx is None:
+            # Send the requests from threads instead
+            return await super().atranslate(source_locale, target_locale, strings)
+
+        timeout = self.get_option('TIMEOUT', self.timeout)
+        if isinstance(timeout, (list, tuple)):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+
+        client = get_async_client(self.get_pool_size())
+
+        async def atranslate_chunk(source_locale, target_locale, strings):
+            response = await client.post(
+                self.get_url(),
+                data=self.get_request_data(source_locale, target_locale, strings),
+                timeout=timeout,
+            )
+            return self.handle_response(strings, response)
+
+        return await self.atranslate_chunks(source_locale, target_locale, strings, atranslate_chunk)
+
     def can_translate(self, source_locale, target_locale):
         return language_code(source_locale.language_code) != language_code(target_locale.language_code, is_target=True)
@@ -44,10 +44,14 @@ def translate_html(html):
 class DummyTranslator(BaseMachineTranslator):
     display_name = _("Dummy translator")
 
-    def translate(self, source_locale, target_locale, strings):
+    def translate_chunk(self, source_locale, target_locale, strings):
         return {
             string: StringValue(translate_html(string.data)) for string in strings
         }
 
+    async def atranslate_chunk(self, source_locale, target_locale, strings):
+        # Nothing here blocks, so there's no need to use a thread
+        return self.translate_chunk(source_locale, target_locale, strings)
+
     def can_translate(self, source_locale, target_locale):
         return language_code(source_locale.language_code) != language_code(target_locale.language_code)
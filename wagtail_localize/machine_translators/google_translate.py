@@ -21,7 +21,7 @@ def language_code(code):
 class GoogleTranslateTranslator(BaseMachineTranslator):
     display_name = _("Google Translate")
 
-    def translate(self, source_locale, target_locale, strings):
+    def translate_chunk(self, source_locale, target_locale, strings):
         translator = googletrans.Translator()
         google_translations = translator.translate(
             [string.render_text() for string in strings],
@@ -29,13 +29,11 @@ class GoogleTranslateTranslator(BaseMachineTranslator):
             dest=language_code(target_locale.language_code),
         )
 
-        translations = {
-            translation.origin: translation.text
-            for translation in google_translations
-        }
-
+        # The translations are returned in the same order as the strings. Don't match them up by
+        # their text as that would collapse strings that render to the same text
         return {
-            string: StringValue.from_plaintext(translations[string.render_text()]) for string in strings
+            string: StringValue.from_plaintext(translation.text)
+            for string, translation in zip(strings, google_translations)
         }
 
     def can_translate(self, source_locale, target_locale):
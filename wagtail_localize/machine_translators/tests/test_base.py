@@ -0,0 +1,175 @@
+import asyncio
+import threading
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from wagtail.core.models import Locale
+
+from wagtail_localize.machine_translators.base import (
+    BaseMachineTranslator,
+    TemporaryMachineTranslatorError,
+    chunk_strings,
+    translate_to_locales,
+)
+from wagtail_localize.machine_translators.cache import CachingMachineTranslator, MachineTranslationMemoryCache, get_translator_key
+from wagtail_localize.strings import StringValue
+
+
+class UppercaseTranslator(BaseMachineTranslator):
+    max_chunk_size = 2
+    max_workers = 3
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.chunks = []
+        self.failures = options.get('FAILURES', 0)
+        self.lock = threading.Lock()
+
+    def translate_chunk(self, source_locale, target_locale, strings):
+        with self.lock:
+            self.chunks.append(strings)
+
+            if self.failures:
+                self.failures -= 1
+                raise TemporaryMachineTranslatorError()
+
+        return {string: StringValue(string.data.upper()) for string in strings}
+
+
+class SlowAsyncTranslator(BaseMachineTranslator):
+    def __init__(self, options):
+        super().__init__(options)
+        self.running = 0
+        self.max_running = 0
+
+    async def atranslate_chunk(self, source_locale, target_locale, strings):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+
+        return {string: StringValue(f"{target_locale.language_code}: {string.data}") for string in strings}
+
+
+class TranslateOnlyTranslator(BaseMachineTranslator):
+    """
+    A machine translator that only implements translate, like the ones written before
+    translate_chunk was added.
+    """
+    def translate(self, source_locale, target_locale, strings):
+        return {string: StringValue(string.data[::-1]) for string in strings}
+
+
+class TestChunkStrings(TestCase):
+    def test_max_count(self):
+        strings = [StringValue(str(i)) for i in range(5)]
+
+        self.assertEqual(list(chunk_strings(strings, max_count=2)), [strings[0:2], strings[2:4], strings[4:5]])
+
+    def test_max_characters(self):
+        strings = [StringValue("aaa"), StringValue("bb"), StringValue("c"), StringValue("dddddd")]
+
+        # The last string is too long for a chunk on its own so it's given its own chunk
+        self.assertEqual(list(chunk_strings(strings, max_characters=5)), [strings[0:2], strings[2:3], strings[3:4]])
+
+    def test_unlimited(self):
+        strings = [StringValue(str(i)) for i in range(5)]
+
+        self.assertEqual(list(chunk_strings(strings)), [strings])
+        self.assertEqual(list(chunk_strings([])), [])
+
+
+class TestBaseMachineTranslator(TestCase):
+    def setUp(self):
+        self.english_locale = Locale.objects.get()
+        self.french_locale = Locale.objects.create(language_code="fr")
+
+    def test_translate_in_chunks(self):
+        translator = UppercaseTranslator({})
+        strings = [StringValue(f"string {i}") for i in range(7)]
+
+        translations = translator.translate(self.english_locale, self.french_locale, strings)
+
+        self.assertEqual(len(translator.chunks), 4)
+        self.assertEqual(list(translations.keys()), strings)
+        self.assertEqual(translations[strings[6]], StringValue("STRING 6"))
+
+    def test_translate_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            BaseMachineTranslator({}).translate(self.english_locale, self.french_locale, [StringValue("foo")])
+
+    def test_options_override_chunk_size(self):
+        translator = UppercaseTranslator({'MAX_CHUNK_SIZE': 10, 'MAX_WORKERS': 1})
+        translator.translate(self.english_locale, self.french_locale, [StringValue(f"string {i}") for i in range(7)])
+
+        self.assertEqual(len(translator.chunks), 1)
+
+    @mock.patch("wagtail_localize.machine_translators.base.time.sleep")
+    def test_retry(self, sleep):
+        translator = UppercaseTranslator({'FAILURES': 2})
+
+        translations = translator.translate(self.english_locale, self.french_locale, [StringValue("foo")])
+
+        self.assertEqual(translations, {StringValue("foo"): StringValue("FOO")})
+        self.assertEqual([call[0][0] for call in sleep.call_args_list], [1.0, 2.0])
+
+    @mock.patch("wagtail_localize.machine_translators.base.time.sleep")
+    def test_gives_up_after_max_retries(self, sleep):
+        translator = UppercaseTranslator({'FAILURES': 10, 'MAX_RETRIES': 2})
+
+        with self.assertRaises(TemporaryMachineTranslatorError):
+            translator.translate(self.english_locale, self.french_locale, [StringValue("foo")])
+
+        self.assertEqual(len(translator.chunks), 3)
+
+    def test_atranslate(self):
+        translator = UppercaseTranslator({})
+        strings = [StringValue(f"string {i}") for i in range(7)]
+
+        translations = async_to_sync(translator.atranslate)(self.english_locale, self.french_locale, strings)
+
+        self.assertEqual(len(translator.chunks), 4)
+        self.assertEqual(list(translations.keys()), strings)
+        self.assertEqual(translations[strings[6]], StringValue("STRING 6"))
+
+    @mock.patch("wagtail_localize.machine_translators.base.asyncio.sleep")
+    def test_atranslate_retry(self, sleep):
+        translator = UppercaseTranslator({'FAILURES': 2})
+
+        translations = async_to_sync(translator.atranslate)(self.english_locale, self.french_locale, [StringValue("foo")])
+
+        self.assertEqual(translations, {StringValue("foo"): StringValue("FOO")})
+        self.assertEqual([call[0][0] for call in sleep.call_args_list], [1.0, 2.0])
+
+    def test_atranslate_limits_concurrent_chunks(self):
+        translator = SlowAsyncTranslator({'MAX_CHUNK_SIZE': 1, 'MAX_WORKERS': 3})
+
+        async_to_sync(translator.atranslate)(self.english_locale, self.french_locale, [StringValue(f"string {i}") for i in range(10)])
+
+        self.assertEqual(translator.max_running, 3)
+
+    def test_translate_to_locales(self):
+        translator = SlowAsyncTranslator({})
+        locales = [Locale.objects.create(language_code=language_code) for language_code in ["de", "es", "it", "nl", "pt"]]
+        strings = [StringValue("foo"), StringValue("bar")]
+
+        translations = translate_to_locales(translator, self.english_locale, locales, strings, concurrency=2)
+
+        self.assertEqual(list(translations.keys()), locales)
+        self.assertEqual(translations[locales[1]], {
+            StringValue("foo"): StringValue("es: foo"),
+            StringValue("bar"): StringValue("es: bar"),
+        })
+        self.assertEqual(translator.max_running, 2)
+
+    def test_translator_that_only_implements_translate(self):
+        translator = TranslateOnlyTranslator({})
+        strings = [StringValue("foo"), StringValue("bar")]
+        expected = {StringValue("foo"): StringValue("oof"), StringValue("bar"): StringValue("rab")}
+
+        self.assertEqual(async_to_sync(translator.atranslate)(self.english_locale, self.french_locale, strings), expected)
+        self.assertEqual(translate_to_locales(translator, self.english_locale, [self.french_locale], strings), {self.french_locale: expected})
+
+        caching_translator = CachingMachineTranslator(translator, get_translator_key({'CLASS': 'TranslateOnlyTranslator'}), memory_cache=MachineTranslationMemoryCache())
+        self.assertEqual(async_to_sync(caching_translator.atranslate)(self.english_locale, self.french_locale, strings), expected)
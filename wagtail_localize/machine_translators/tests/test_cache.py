@@ -0,0 +1,118 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
+from wagtail.core.models import Locale
+
+from wagtail_localize.machine_translators import get_machine_translator
+from wagtail_localize.machine_translators.cache import (
+    CachingMachineTranslator,
+    MachineTranslationMemoryCache,
+    get_translator_key,
+)
+from wagtail_localize.machine_translators.dummy import DummyTranslator
+from wagtail_localize.models import MachineTranslation
+from wagtail_localize.strings import StringValue
+
+
+DUMMY_CONFIG = {
+    'CLASS': 'wagtail_localize.machine_translators.dummy.DummyTranslator',
+}
+
+
+class TestCachingMachineTranslator(TestCase):
+    def setUp(self):
+        self.english_locale = Locale.objects.get()
+        self.french_locale = Locale.objects.create(language_code="fr")
+        self.memory_cache = MachineTranslationMemoryCache(maxsize=10)
+
+    def get_translator(self, config=DUMMY_CONFIG, memory_cache=None):
+        return CachingMachineTranslator(
+            DummyTranslator(config.get('OPTIONS', {})),
+            get_translator_key(config),
+            memory_cache=memory_cache or self.memory_cache,
+        )
+
+    def test_translate(self):
+        translator = self.get_translator()
+
+        with mock.patch.object(DummyTranslator, "translate", wraps=translator.translator.translate) as translate:
+            translations = translator.translate(self.english_locale, self.french_locale, [StringValue("Hello world!")])
+            self.assertEqual(translations, {StringValue("Hello world!"): StringValue("world! Hello")})
+            self.assertEqual(translate.call_count, 1)
+
+            # Only the new string is sent to the machine translator
+            translations = translator.translate(self.english_locale, self.french_locale, [StringValue("Hello world!"), StringValue("Foo bar")])
+            self.assertEqual(translations, {
+                StringValue("Hello world!"): StringValue("world! Hello"),
+                StringValue("Foo bar"): StringValue("bar Foo"),
+            })
+            self.assertEqual(translate.call_count, 2)
+            self.assertEqual(translate.call_args[0][2], [StringValue("Foo bar")])
+
+        self.assertEqual(MachineTranslation.objects.count(), 2)
+        self.assertEqual(self.memory_cache.cache_info(), (1, 0, 2, 2, 10))
+
+    def test_atranslate(self):
+        translator = self.get_translator()
+        translator.translate(self.english_locale, self.french_locale, [StringValue("Hello world!")])
+
+        with mock.patch.object(DummyTranslator, "atranslate", wraps=translator.translator.atranslate) as atranslate:
+            translations = async_to_sync(translator.atranslate)(self.english_locale, self.french_locale, [StringValue("Hello world!"), StringValue("Foo bar")])
+
+        self.assertEqual(translations, {
+            StringValue("Hello world!"): StringValue("world! Hello"),
+            StringValue("Foo bar"): StringValue("bar Foo"),
+        })
+        self.assertEqual(atranslate.call_args[0][2], [StringValue("Foo bar")])
+        self.assertEqual(MachineTranslation.objects.count(), 2)
+        self.assertEqual(self.memory_cache.cache_info(), (1, 0, 2, 2, 10))
+
+    def test_translations_are_persisted(self):
+        self.get_translator().translate(self.english_locale, self.french_locale, [StringValue("Hello world!")])
+
+        # A new process would start with an empty memory cache
+        memory_cache = MachineTranslationMemoryCache()
+        translator = self.get_translator(memory_cache=memory_cache)
+
+        with mock.patch.object(DummyTranslator, "translate") as translate:
+            translations = translator.translate(self.english_locale, self.french_locale, [StringValue("Hello world!")])
+
+        translate.assert_not_called()
+        self.assertEqual(translations, {StringValue("Hello world!"): StringValue("world! Hello")})
+        self.assertEqual(memory_cache.cache_info().database_hits, 1)
+
+    def test_changing_options_invalidates_cache(self):
+        self.get_translator().translate(self.english_locale, self.french_locale, [StringValue("Hello world!")])
+
+        translator = self.get_translator(config={**DUMMY_CONFIG, 'OPTIONS': {'FOO': 'bar'}})
+        translator.translate(self.english_locale, self.french_locale, [StringValue("Hello world!")])
+
+        self.assertEqual(self.memory_cache.cache_info().misses, 2)
+        self.assertEqual(MachineTranslation.objects.count(), 2)
+
+    def test_memory_cache_is_bounded(self):
+        translator = self.get_translator()
+        translator.translate(self.english_locale, self.french_locale, [StringValue(f"String {i}") for i in range(20)])
+
+        self.assertEqual(self.memory_cache.cache_info().currsize, 10)
+
+    def test_clear_cache(self):
+        translator = self.get_translator()
+        translator.translate(self.english_locale, self.french_locale, [StringValue("Hello world!")])
+        translator.clear_cache()
+
+        self.assertFalse(MachineTranslation.objects.exists())
+        self.assertEqual(self.memory_cache.cache_info(), (0, 0, 0, 0, 10))
+
+    @override_settings(WAGTAILLOCALIZE_MACHINE_TRANSLATOR=DUMMY_CONFIG)
+    def test_get_machine_translator(self):
+        translator = get_machine_translator()
+
+        self.assertIsInstance(translator, CachingMachineTranslator)
+        self.assertIsInstance(translator.translator, DummyTranslator)
+        self.assertEqual(translator.display_name, "Dummy translator")
+
+    @override_settings(WAGTAILLOCALIZE_MACHINE_TRANSLATOR={**DUMMY_CONFIG, 'CACHE': False})
+    def test_get_machine_translator_without_cache(self):
+        self.assertIsInstance(get_machine_translator(), DummyTranslator)
@@ -0,0 +1,166 @@
+import json
+import threading
+from unittest import mock, skipIf
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from wagtail.core.models import Locale
+
+from wagtail_localize.machine_translators import deepl
+from wagtail_localize.machine_translators.deepl import DeepLTranslator, aclose_async_clients, close_sessions
+from wagtail_localize.strings import StringValue
+
+
+class FakeDeepLServer(ThreadingHTTPServer):
+    """
+    A local HTTP server that behaves like the DeepL translate API, translating each
+    text by upper-casing it. It responds with a 429 to the first `rate_limited` requests.
+    """
+
+    def __init__(self, rate_limited=0):
+        self.requests = []
+        self.client_addresses = set()
+        self.rate_limited = rate_limited
+        self.lock = threading.Lock()
+
+        super().__init__(("127.0.0.1", 0), FakeDeepLRequestHandler)
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}/v2/translate".format(self.server_address[1])
+
+
+class FakeDeepLRequestHandler(BaseHTTPRequestHandler):
+    # Support keep-alive. Responses are written in one go with Nagle's algorithm disabled,
+    # otherwise every request on a kept-alive connection waits for a delayed ACK
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        data = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+
+        with self.server.lock:
+            self.server.requests.append(data)
+            self.server.client_addresses.add(self.client_address)
+            rate_limited = self.server.rate_limited > 0
+            self.server.rate_limited -= 1
+
+        if rate_limited:
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = json.dumps({
+            'translations': [{'text': text.upper()} for text in data['text']]
+        }).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestDeepLTranslator(TestCase):
+    def setUp(self):
+        self.english_locale = Locale.objects.get()
+        self.french_locale = Locale.objects.create(language_code="fr")
+
+    def start_server(self, **kwargs):
+        server = FakeDeepLServer(**kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.addCleanup(close_sessions)
+        return server
+
+    def test_translate(self):
+        server = self.start_server()
+        translator = DeepLTranslator({'AUTH_KEY': 'key', 'API_URL': server.url})
+        strings = [StringValue(f"string {i}") for i in range(120)]
+
+        translations = translator.translate(self.english_locale, self.french_locale, strings)
+
+        # Split into chunks of 50 strings
+        self.assertEqual(sorted(len(request['text']) for request in server.requests), [20, 50, 50])
+        self.assertEqual(server.requests[0]['source_lang'], ['EN'])
+        self.assertEqual(server.requests[0]['target_lang'], ['FR'])
+
+        # Translations are returned in the same order as the input
+        self.assertEqual(list(translations.keys()), strings)
+        self.assertEqual(translations[strings[99]], StringValue("STRING 99"))
+
+    def test_retries_when_rate_limited(self):
+        server = self.start_server(rate_limited=2)
+        translator = DeepLTranslator({'AUTH_KEY': 'key', 'API_URL': server.url})
+
+        translations = translator.translate(self.english_locale, self.french_locale, [StringValue("Hello world!")])
+
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(translations, {StringValue("Hello world!"): StringValue("HELLO WORLD!")})
+
+    def test_connections_are_reused(self):
+        server = self.start_server()
+
+        for i in range(5):
+            # get_machine_translator() creates a new translator each time
+            translator = DeepLTranslator({'AUTH_KEY': 'key', 'API_URL': server.url})
+            translator.translate(self.english_locale, self.french_locale, [StringValue(f"string {i}")])
+
+        self.assertEqual(len(server.requests), 5)
+        self.assertEqual(len(server.client_addresses), 1)
+
+    def test_atranslate_without_httpx(self):
+        server = self.start_server(rate_limited=1)
+        translator = DeepLTranslator({'AUTH_KEY': 'key', 'API_URL': server.url})
+        strings = [StringValue(f"string {i}") for i in range(120)]
+
+        with mock.patch.object(deepl, "httpx", None):
+            translations = async_to_sync(translator.atranslate)(self.english_locale, self.french_locale, strings)
+
+        # One of the three chunks was rate limited and retried
+        self.assertEqual(len(server.requests), 4)
+        self.assertTrue(all(len(request['text']) in [20, 50] for request in server.requests))
+        self.assertEqual(list(translations.keys()), strings)
+        self.assertEqual(translations[strings[99]], StringValue("STRING 99"))
+
+    @skipIf(deepl.httpx is None, "httpx is not installed")
+    def test_atranslate(self):
+        server = self.start_server(rate_limited=1)
+        translator = DeepLTranslator({'AUTH_KEY': 'key', 'API_URL': server.url})
+        strings = [StringValue(f"string {i}") for i in range(120)]
+
+        translations = async_to_sync(translator.atranslate)(self.english_locale, self.french_locale, strings)
+
+        # One of the three chunks was rate limited and retried
+        self.assertEqual(len(server.requests), 4)
+        self.assertTrue(all(len(request['text']) in [20, 50] for request in server.requests))
+        self.assertEqual(list(translations.keys()), strings)
+        self.assertEqual(translations[strings[99]], StringValue("STRING 99"))
+
+    @skipIf(deepl.httpx is None, "httpx is not installed")
+    def test_async_connections_are_reused(self):
+        server = self.start_server()
+
+        async def translate_twice():
+            try:
+                for i in range(2):
+                    # get_machine_translator() creates a new translator each time
+                    translator = DeepLTranslator({'AUTH_KEY': 'key', 'API_URL': server.url})
+                    await translator.atranslate(self.english_locale, self.french_locale, [StringValue(f"string {i}")])
+            finally:
+                await aclose_async_clients()
+
+        async_to_sync(translate_twice)()
+
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(len(server.client_addresses), 1)
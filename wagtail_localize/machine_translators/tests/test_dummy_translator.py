@@ -1,3 +1,4 @@
+from asgiref.sync import async_to_sync
 from django.test import TestCase
 from wagtail.core.models import Locale
 
@@ -21,6 +22,15 @@ class TestDummyTranslator(TestCase):
             StringValue("This is a sentence. This is another sentence."): StringValue("sentence. another is This sentence. a is This"),
         })
 
+    def test_atranslate(self):
+        translations = async_to_sync(DummyTranslator({}).atranslate)(self.english_locale, self.french_locale, [
+            StringValue("Hello world!"),
+        ])
+
+        self.assertEqual(translations, {
+            StringValue("Hello world!"): StringValue("world! Hello"),
+        })
+
     def test_translate_html(self):
         string, attrs = StringValue.from_html('<a href="https://en.wikipedia.org/wiki/World">Hello world!</a>. <b>This is a test</b>.')
 
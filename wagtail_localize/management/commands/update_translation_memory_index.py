@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from wagtail_localize.translation_memory import update_index
+
+
+class Command(BaseCommand):
+    help = "Adds any strings that aren't in the translation memory index yet."
+
+    def handle(self, **options):
+        num_indexed = update_index()
+
+        if options["verbosity"] >= 1:
+            self.stdout.write(f"Indexed {num_indexed} strings.")
@@ -0,0 +1,39 @@
+import json
+import uuid
+
+from django.db import migrations, models
+
+
+def get_content_hash(content_json):
+    # Copy of TranslationSource.get_content_hash at the time this migration was written
+    canonical_json = json.dumps(json.loads(content_json), sort_keys=True, separators=(",", ":"))
+    return uuid.uuid5(uuid.UUID("e0b361e1-4617-4f38-9d6b-10e13add23ba"), canonical_json)
+
+
+def populate_content_hash(apps, schema_editor):
+    TranslationSource = apps.get_model('wagtail_localize.TranslationSource')
+
+    for source in TranslationSource.objects.only('id', 'content_json').iterator():
+        source.content_hash = get_content_hash(source.content_json)
+        source.save(update_fields=['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_localize', '0002_translation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationsource',
+            name='content_hash',
+            field=models.UUIDField(null=True),
+        ),
+        migrations.RunPython(populate_content_hash, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='translationsource',
+            name='content_hash',
+            field=models.UUIDField(),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.0.14 on 2026-10-18 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_localize', '0003_translationsource_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='total_segments',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='translation',
+            name='translated_segments',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+    ]
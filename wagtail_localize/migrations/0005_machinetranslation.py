@@ -0,0 +1,29 @@
+# Generated by Django 3.0.14 on 2026-10-18 03:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_localize', '0004_translation_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MachineTranslation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('translator_key', models.UUIDField()),
+                ('source_hash', models.UUIDField()),
+                ('data', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('source_locale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.Locale')),
+                ('target_locale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.Locale')),
+            ],
+            options={
+                'unique_together': {('translator_key', 'source_locale', 'target_locale', 'source_hash')},
+            },
+        ),
+    ]
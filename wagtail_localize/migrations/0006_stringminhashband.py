@@ -0,0 +1,101 @@
+# Generated by Django 3.0.14 on 2026-10-18 03:23
+
+import hashlib
+import random
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Copy of the hashing code in wagtail_localize.translation_memory at the time this migration was written
+NUM_BANDS = 8
+ROWS_PER_BAND = 4
+MERSENNE_PRIME = (1 << 61) - 1
+_random = random.Random(2029)
+PERMUTATIONS = [
+    (_random.randrange(1, MERSENNE_PRIME), _random.randrange(0, MERSENNE_PRIME))
+    for i in range(NUM_BANDS * ROWS_PER_BAND)
+]
+TAG_RE = re.compile(r"<[^>]*>")
+WORD_RE = re.compile(r"\w+")
+
+
+def get_shingles(text):
+    words = WORD_RE.findall(TAG_RE.sub(" ", text).lower())
+    return set(words) | {" ".join(pair) for pair in zip(words, words[1:])}
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def get_band_hashes(text):
+    shingles = get_shingles(text)
+    if not shingles:
+        return []
+
+    hashes = [_hash(shingle) for shingle in shingles]
+    minhash = [
+        min((a * h + b) % MERSENNE_PRIME for h in hashes)
+        for a, b in PERMUTATIONS
+    ]
+
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                repr((band, minhash[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])).encode(),
+                digest_size=8,
+            ).digest(),
+            "big",
+            signed=True,
+        )
+        for band in range(NUM_BANDS)
+    ]
+
+
+def index_existing_strings(apps, schema_editor):
+    # The index is opt-in, sites that enable it later can run the update_translation_memory_index command
+    if not getattr(settings, 'WAGTAILLOCALIZE_TRANSLATION_MEMORY_INDEX', False):
+        return
+
+    String = apps.get_model('wagtail_localize.String')
+    StringMinHashBand = apps.get_model('wagtail_localize.StringMinHashBand')
+
+    bands = []
+    for string in String.objects.only('id', 'locale_id', 'data').iterator():
+        bands.extend(
+            StringMinHashBand(string_id=string.id, locale_id=string.locale_id, band_hash=band_hash)
+            for band_hash in get_band_hashes(string.data)
+        )
+
+        if len(bands) >= 1000:
+            StringMinHashBand.objects.bulk_create(bands)
+            bands = []
+
+    StringMinHashBand.objects.bulk_create(bands)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_localize', '0005_machinetranslation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StringMinHashBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band_hash', models.BigIntegerField()),
+                ('locale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.Locale')),
+                ('string', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtail_localize.String')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stringminhashband',
+            index=models.Index(fields=['locale', 'band_hash'], name='wagtail_loc_locale__f0df21_idx'),
+        ),
+        migrations.RunPython(index_existing_strings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.0.14 on 2026-10-18 03:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtail_localize', '0006_stringminhashband'),
+    ]
+
+    operations = [
+        # Add the new indexes before removing the indexes they make redundant
+        migrations.AddIndex(
+            model_name='relatedobjectsegment',
+            index=models.Index(fields=['source', 'order'], name='wagtail_loc_source__32725b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stringsegment',
+            index=models.Index(fields=['source', 'order'], name='wagtail_loc_source__7319c9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='templatesegment',
+            index=models.Index(fields=['source', 'order'], name='wagtail_loc_source__7caf45_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='translationsource',
+            index=models.Index(fields=['object', 'created_at'], name='wagtail_loc_object__fc3db1_idx'),
+        ),
+        migrations.AlterField(
+            model_name='relatedobjectsegment',
+            name='source',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='wagtail_localize.TranslationSource'),
+        ),
+        migrations.AlterField(
+            model_name='stringsegment',
+            name='source',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='wagtail_localize.TranslationSource'),
+        ),
+        migrations.AlterField(
+            model_name='templatesegment',
+            name='source',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='wagtail_localize.TranslationSource'),
+        ),
+        migrations.AlterField(
+            model_name='translationsource',
+            name='object',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sources', to='wagtail_localize.TranslatableObject'),
+        ),
+    ]
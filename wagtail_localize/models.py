@@ -7,16 +7,14 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models, transaction
 from django.db.models import (
-    Case,
-    When,
-    Value,
-    IntegerField,
     Count,
-    Sum,
+    F,
+    Max,
     Subquery,
     Exists,
     OuterRef
 )
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext as _
@@ -28,9 +26,10 @@ from modelcluster.models import (
 from wagtail.core.models import Page
 
 from .segments import StringSegmentValue, TemplateSegmentValue, RelatedObjectSegmentValue
-from .segments.extract import extract_segments
+from .segments.extract import UnchangedSegments, extract_segments, get_unchanged_paths
 from .segments.ingest import ingest_segments
 from .strings import StringValue
+from .translation_memory import index_strings, is_index_enabled
 
 
 def pk(obj):
@@ -40,6 +39,68 @@ def pk(obj):
         return obj
 
 
+# Maximum number of values to put in a single "IN" clause (SQLite allows 999 parameters per query)
+IN_CLAUSE_BATCH_SIZE = 500
+
+
+def filter_in_batches(queryset, field_name, values):
+    """
+    Yields the objects in the queryset whose field_name is one of the given values,
+    splitting the "IN" clause over multiple queries if there are lots of values.
+    """
+    values = list(values)
+
+    for i in range(0, len(values), IN_CLAUSE_BATCH_SIZE):
+        lookup = {field_name + "__in": values[i:i + IN_CLAUSE_BATCH_SIZE]}
+        yield from queryset.filter(**lookup)
+
+
+def get_or_create_many(queryset, field_name, keys, make_instance):
+    """
+    Fetches the objects in the queryset whose field_name is one of the given keys, creating
+    any that don't exist in bulk using the make_instance callable (which is given the key).
+
+    This does a fixed number of queries regardless of how many objects there are.
+
+    Returns a dict mapping each key to its object.
+    """
+    keys = list(set(keys))
+    objects = {}
+
+    def fetch(keys):
+        for obj in filter_in_batches(queryset, field_name, keys):
+            objects[getattr(obj, field_name)] = obj
+
+    fetch(keys)
+
+    missing_keys = [key for key in keys if key not in objects]
+    if missing_keys:
+        # Conflicts are ignored in case another process creates the same objects in the meantime.
+        # Primary keys aren't set on the instances when doing this, so the objects are fetched again.
+        queryset.model.objects.bulk_create(
+            [make_instance(key) for key in missing_keys], ignore_conflicts=True
+        )
+        fetch(missing_keys)
+
+    return objects
+
+
+def stream_po(metadata, entries, wrapwidth=200):
+    """
+    Yields a PO file with the given metadata and entries in chunks, without building
+    a polib.POFile in memory. This can be passed to a StreamingHttpResponse.
+
+    The output is the same as str(po), so any obsolete entries must come last.
+    """
+    # An empty POFile renders just the header and metadata
+    po = polib.POFile(wrapwidth=wrapwidth)
+    po.metadata = metadata
+    yield str(po)
+
+    for entry in entries:
+        yield "\n" + entry.__unicode__(wrapwidth)
+
+
 class TranslatableObjectManager(models.Manager):
     def get_or_create_from_instance(self, instance):
         return self.get_or_create(
@@ -57,6 +118,49 @@ class TranslatableObjectManager(models.Manager):
             ),
         )
 
+    def get_instances_many(self, objects, locales):
+        """
+        Fetches the instances of the given TranslatableObjects in each of the given locales,
+        doing one query per content type.
+
+        Returns a dict of instances keyed by (translation_key, locale_id). Objects that
+        haven't been translated into a locale are left out.
+        """
+        translation_keys_by_content_type = defaultdict(set)
+        for object in objects:
+            translation_keys_by_content_type[object.content_type_id].add(object.translation_key)
+
+        locale_ids = [pk(locale) for locale in locales]
+        instances = {}
+
+        for content_type_id, translation_keys in translation_keys_by_content_type.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+
+            for instance in filter_in_batches(
+                model._base_manager.filter(locale_id__in=locale_ids),
+                "translation_key",
+                translation_keys,
+            ):
+                instances[instance.translation_key, instance.locale_id] = instance
+
+        return instances
+
+    def get_or_create_many(self, content_types_by_translation_key):
+        """
+        Bulk version of get_or_create. Takes a dict of content types keyed by translation key.
+
+        Returns a dict of TranslatableObjects keyed by translation key.
+        """
+        return get_or_create_many(
+            self.all(),
+            "translation_key",
+            content_types_by_translation_key.keys(),
+            lambda translation_key: self.model(
+                translation_key=translation_key,
+                content_type=content_types_by_translation_key[translation_key],
+            ),
+        )
+
 
 class TranslatableObject(models.Model):
     """
@@ -129,6 +233,88 @@ class TranslationSourceQuerySet(models.QuerySet):
             locale=instance.locale,
         )
 
+    def machine_translate(self, target_locales, machine_translator=None):
+        """
+        Machine translates the strings of all of these sources that haven't been translated
+        into the target locales yet.
+
+        Each unique string is only sent to the machine translator once per target locale,
+        however many times it is used across the sources. Then a StringTranslation is created
+        for every context the string is used in.
+
+        Returns a dict mapping each target locale to the number of StringTranslations created.
+        """
+        from .machine_translators import get_machine_translator
+
+        if machine_translator is None:
+            machine_translator = get_machine_translator()
+
+        sources = list(self.select_related("locale"))
+        created = {target_locale: 0 for target_locale in target_locales}
+
+        if machine_translator is None:
+            return created
+
+        sources_by_locale = defaultdict(list)
+        for source in sources:
+            sources_by_locale[source.locale].append(source)
+
+        for source_locale, locale_sources in sources_by_locale.items():
+            # The distinct (string, context) pairs of these sources. Strings are unique by
+            # data_hash within a locale, so de-duplicating by string ID is the same thing
+            segments = set(
+                StringSegment.objects.filter(source__in=locale_sources).values_list("string_id", "context_id")
+            )
+            strings_by_id = {
+                string.id: string
+                for string in filter_in_batches(String.objects.all(), "id", {string_id for string_id, context_id in segments})
+            }
+
+            for target_locale in target_locales:
+                if target_locale == source_locale or not machine_translator.can_translate(source_locale, target_locale):
+                    continue
+
+                translated_segments = set(
+                    filter_in_batches(
+                        StringTranslation.objects.filter(locale=target_locale).values_list("translation_of_id", "context_id"),
+                        "translation_of_id",
+                        strings_by_id.keys(),
+                    )
+                )
+                missing_segments = segments - translated_segments
+                if not missing_segments:
+                    continue
+
+                # Send each string that's missing a translation once
+                strings = {
+                    strings_by_id[string_id].data: StringValue(strings_by_id[string_id].data)
+                    for string_id in sorted({string_id for string_id, context_id in missing_segments})
+                }
+                translations = machine_translator.translate(source_locale, target_locale, list(strings.values()))
+
+                translations_to_create = []
+                for string_id, context_id in missing_segments:
+                    translation = translations.get(strings[strings_by_id[string_id].data])
+
+                    if translation is not None:
+                        translations_to_create.append(StringTranslation(
+                            translation_of_id=string_id,
+                            locale=target_locale,
+                            context_id=context_id,
+                            data=translation.data,
+                        ))
+
+                with transaction.atomic():
+                    StringTranslation.objects.bulk_create(translations_to_create)
+                    Translation.objects.filter(
+                        object_id__in=[source.object_id for source in locale_sources],
+                        target_locale=target_locale,
+                    ).update_progress()
+
+                created[target_locale] += len(translations_to_create)
+
+        return created
+
 
 class TranslationSource(models.Model):
     """
@@ -136,7 +322,7 @@ class TranslationSource(models.Model):
     """
 
     object = models.ForeignKey(
-        TranslatableObject, on_delete=models.CASCADE, related_name="sources"
+        TranslatableObject, on_delete=models.CASCADE, related_name="sources", db_index=False
     )
     # object.content_type refers to the model that the TranslatableMixin was added to, however that model
     # might have child models. So specific_content_type is needed to refer to the content type that this
@@ -147,10 +333,24 @@ class TranslationSource(models.Model):
     locale = models.ForeignKey("wagtailcore.Locale", on_delete=models.CASCADE)
     object_repr = models.TextField(max_length=200)
     content_json = models.TextField()
+    # A hash of the content, used to quickly check if the content has changed since the last source
+    content_hash = models.UUIDField()
     created_at = models.DateTimeField()
 
     objects = TranslationSourceQuerySet.as_manager()
 
+    class Meta:
+        # Used for finding the latest source of an object. This also covers lookups by object
+        indexes = [models.Index(fields=["object", "created_at"])]
+
+    @classmethod
+    def get_content_hash(cls, content_json):
+        """
+        Returns a hash of the given content JSON that ignores key order and whitespace.
+        """
+        canonical_json = json.dumps(json.loads(content_json), sort_keys=True, separators=(",", ":"))
+        return uuid.uuid5(uuid.UUID("e0b361e1-4617-4f38-9d6b-10e13add23ba"), canonical_json)
+
     @classmethod
     def from_instance(cls, instance, force=False):
         # Make sure we're using the specific version of pages
@@ -167,14 +367,13 @@ class TranslationSource(models.Model):
             serializable_data = get_serializable_data_for_fields(instance)
             content_json = json.dumps(serializable_data, cls=DjangoJSONEncoder)
 
+        content_hash = cls.get_content_hash(content_json)
+
         if not force:
             # Check if the instance has changed at all since the previous revision
-            previous_revision = object.sources.order_by("created_at").last()
-            if previous_revision:
-                if json.loads(content_json) == json.loads(
-                    previous_revision.content_json
-                ):
-                    return previous_revision, False
+            previous_revision = object.sources.defer("content_json").order_by("created_at").last()
+            if previous_revision and previous_revision.content_hash == content_hash:
+                return previous_revision, False
 
         return (
             cls.objects.create(
@@ -183,6 +382,7 @@ class TranslationSource(models.Model):
                 locale=instance.locale,
                 object_repr=str(instance)[:200],
                 content_json=content_json,
+                content_hash=content_hash,
                 created_at=timezone.now(),
             ),
             True,
@@ -233,44 +433,243 @@ class TranslationSource(models.Model):
 
         return new_instance
 
+    def save(self, *args, **kwargs):
+        if self.content_json and self.content_hash is None:
+            self.content_hash = self.get_content_hash(self.content_json)
+
+        return super().save(*args, **kwargs)
+
+    def get_previous_source(self):
+        """
+        Returns the source that was created for the same object before this one, if its
+        segments have been extracted. Otherwise returns None.
+        """
+        return (
+            TranslationSource.objects.filter(
+                object_id=self.object_id,
+                locale_id=self.locale_id,
+                specific_content_type_id=self.specific_content_type_id,
+                created_at__lte=self.created_at,
+            )
+            .exclude(pk=self.pk)
+            .annotate(
+                has_string_segments=Exists(StringSegment.objects.filter(source_id=OuterRef("pk"))),
+                has_template_segments=Exists(TemplateSegment.objects.filter(source_id=OuterRef("pk"))),
+                has_related_object_segments=Exists(RelatedObjectSegment.objects.filter(source_id=OuterRef("pk"))),
+            )
+            .order_by("-created_at", "-pk")
+            .filter(
+                models.Q(has_string_segments=True)
+                | models.Q(has_template_segments=True)
+                | models.Q(has_related_object_segments=True)
+            )
+            .first()
+        )
+
+    @transaction.atomic
     def extract_segments(self):
-        for segment in extract_segments(self.as_instance()):
-            if isinstance(segment, TemplateSegmentValue):
-                TemplateSegment.from_value(self, segment)
-            elif isinstance(segment, RelatedObjectSegmentValue):
-                RelatedObjectSegment.from_value(self, segment)
+        """
+        Extracts the segments from the content of this source and saves them.
+
+        If the previous source of the object was extracted, only the fields, StreamField
+        blocks and child objects that have changed since then are extracted. The segments
+        of everything else are copied from the previous source.
+        """
+        instance = self.as_instance()
+        previous_source = self.get_previous_source()
+
+        if previous_source is None:
+            self.save_segments(extract_segments(instance))
+        else:
+            unchanged_paths = get_unchanged_paths(
+                instance.__class__,
+                json.loads(previous_source.content_json),
+                json.loads(self.content_json),
+            )
+            segments = extract_segments(instance, unchanged_paths=unchanged_paths)
+            self.save_segments(*self.copy_unchanged_segments(previous_source, segments))
+
+        # The translations of this source now have more segments to translate
+        self.translations.update_progress()
+
+    def copy_unchanged_segments(self, previous_source, segments):
+        """
+        Replaces any UnchangedSegments in the given list of segment values with copies of
+        the previous source's segments at those paths and renumbers all of the segments.
+
+        Returns the list of segment values that still need to be saved and a list of the
+        (unsaved) copied segments.
+        """
+        unchanged_paths = {
+            segment.path_components for segment in segments if isinstance(segment, UnchangedSegments)
+        }
+
+        previous_segments = defaultdict(list)
+        if unchanged_paths:
+            for model in [StringSegment, TemplateSegment, RelatedObjectSegment]:
+                for segment in model.objects.filter(source=previous_source).annotate(context_path=F("context__path")):
+                    path_components = tuple(segment.context_path.split("."))
+
+                    for i in range(1, len(path_components) + 1):
+                        if path_components[:i] in unchanged_paths:
+                            previous_segments[path_components[:i]].append(segment)
+                            break
+
+        segment_values = []
+        copied_segments = []
+        order = 1
+        for segment in segments:
+            if isinstance(segment, UnchangedSegments):
+                for copied_segment in sorted(previous_segments[segment.path_components], key=lambda segment: segment.order):
+                    copied_segment.pk = None
+                    copied_segment.source = self
+                    copied_segment.order = order
+                    copied_segments.append(copied_segment)
+                    order += 1
             else:
-                StringSegment.from_value(self, self.locale, segment)
+                segment.order = order
+                segment_values.append(segment)
+                order += 1
 
-    def export_po(self):
+        return segment_values, copied_segments
+
+    def save_segments(self, segments, copied_segments=None):
         """
-        Exports a PO file contining the source strings.
+        Saves the given segment values against this source, along with any unsaved
+        segments that were copied from another source.
+
+        All the strings, templates, contexts and segments are fetched/created in bulk
+        so the number of queries doesn't depend on the number of segments.
         """
-        # Get messages
-        messages = defaultdict(list)
+        string_segments = []
+        template_segments = []
+        related_object_segments = []
 
-        for string_segment in StringSegment.objects.filter(source=self).order_by('order').select_related("context", "string"):
-            messages[string_segment.string.data] = string_segment.context.path
+        for segment in segments:
+            if isinstance(segment, TemplateSegmentValue):
+                template_segments.append(segment)
+            elif isinstance(segment, RelatedObjectSegmentValue):
+                related_object_segments.append(segment)
+            else:
+                string_segments.append(segment)
 
-        # Build a PO file
-        po = polib.POFile(wrapwidth=200)
-        po.metadata = {
+        contexts = TranslationContext.get_or_create_many(
+            self.object_id, [segment.path for segment in segments]
+        )
+
+        segments_to_create = list(copied_segments or [])
+
+        if string_segments:
+            strings = String.get_or_create_many(
+                self.locale_id, [segment.string for segment in string_segments]
+            )
+
+            segments_to_create.extend(
+                StringSegment(
+                    source=self,
+                    context_id=contexts[segment.path].id,
+                    order=segment.order,
+                    string_id=strings[segment.string.data].id,
+                    attrs=json.dumps(segment.attrs),
+                )
+                for segment in string_segments
+            )
+
+        if template_segments:
+            templates = Template.get_or_create_many(template_segments)
+
+            segments_to_create.extend(
+                TemplateSegment(
+                    source=self,
+                    context_id=contexts[segment.path].id,
+                    order=segment.order,
+                    template_id=templates[Template.get_uuid(segment)].id,
+                )
+                for segment in template_segments
+            )
+
+        if related_object_segments:
+            objects = TranslatableObject.objects.get_or_create_many({
+                segment.translation_key: segment.content_type
+                for segment in related_object_segments
+            })
+
+            segments_to_create.extend(
+                RelatedObjectSegment(
+                    source=self,
+                    context_id=contexts[segment.path].id,
+                    order=segment.order,
+                    object_id=objects[segment.translation_key].pk,
+                )
+                for segment in related_object_segments
+            )
+
+        # Skip any segments that were saved by a previous extraction of this source
+        for model, key_fields in [
+            (StringSegment, ("context_id", "order", "string_id", "attrs")),
+            (TemplateSegment, ("context_id", "order", "template_id")),
+            (RelatedObjectSegment, ("context_id", "order", "object_id")),
+        ]:
+            model_segments = [segment for segment in segments_to_create if isinstance(segment, model)]
+            if not model_segments:
+                continue
+
+            existing_segments = set(model.objects.filter(source=self).values_list(*key_fields))
+
+            new_segments = {}
+            for segment in model_segments:
+                key = tuple(getattr(segment, field) for field in key_fields)
+
+                if key not in existing_segments:
+                    new_segments[key] = segment
+
+            model.objects.bulk_create(new_segments.values())
+
+    def get_po_metadata(self):
+        return {
             "POT-Creation-Date": str(timezone.now()),
             "MIME-Version": "1.0",
             "Content-Type": "text/plain; charset=utf-8",
         }
 
-        for text, context in messages.items():
-            po.append(
-                polib.POEntry(
-                    msgid=text,
-                    msgctxt=context,
-                    msgstr="",
-                )
+    def get_po_entries(self):
+        """
+        Yields a POEntry for each source string.
+        """
+        string_segments = (
+            StringSegment.objects.filter(source=self)
+            .unique_strings()
+            .select_related("context", "string")
+            .iterator()
+        )
+
+        for string_segment in string_segments:
+            yield polib.POEntry(
+                msgid=string_segment.string.data,
+                msgctxt=string_segment.context.path,
+                msgstr="",
             )
 
+    def export_po(self):
+        """
+        Exports a PO file contining the source strings.
+        """
+        po = polib.POFile(wrapwidth=200)
+        po.metadata = self.get_po_metadata()
+
+        for entry in self.get_po_entries():
+            po.append(entry)
+
         return po
 
+    def stream_po(self):
+        """
+        Exports a PO file contining the source strings as an iterator of chunks of text.
+
+        Unlike export_po, this never holds the whole file in memory.
+        """
+        return stream_po(self.get_po_metadata(), self.get_po_entries())
+
     @transaction.atomic
     def create_or_update_translation(self, locale, user=None, publish=True, copy_parent_pages=False, string_translation_fallback_to_source=False):
         """
@@ -278,90 +677,158 @@ class TranslationSource(models.Model):
         based on the content of this source and the translated strings
         currently in translation memory.
         """
+        translations, errors = self.create_or_update_translations(
+            [locale],
+            user=user,
+            publish=publish,
+            copy_parent_pages=copy_parent_pages,
+            string_translation_fallback_to_source=string_translation_fallback_to_source,
+        )
+
+        if errors:
+            raise errors[locale]
+
+        return translations[locale]
+
+    def create_or_update_translations(self, locales, user=None, publish=True, copy_parent_pages=False, string_translation_fallback_to_source=False):
+        """
+        Creates/updates translations of the object into each of the specified
+        locales.
+
+        The source instance and segments are only fetched once, and the translated
+        strings for all of the locales are fetched in a single query.
+
+        Each locale is saved in its own savepoint, so an error in one locale doesn't
+        prevent the others from being saved. Returns a tuple of two dicts keyed by
+        locale: the (translation, created) tuples of the locales that succeeded, and
+        the exceptions raised for the locales that failed.
+        """
         original = self.as_instance()
-        created = False
 
         # Only pages can be saved as draft
         if not publish and not isinstance(original, Page):
             raise CannotSaveDraftError
 
-        try:
-            translation = self.get_translated_instance(locale)
-        except models.ObjectDoesNotExist:
-            if isinstance(original, Page):
-                translation = original.copy_for_translation(locale, copy_parents=copy_parent_pages)
-            else:
-                translation = original.copy_for_translation(locale)
-
-            created = True
-
-        # Copy synchronised fields
-        for field in getattr(translation, 'translatable_fields', []):
-            if field.is_synchronized(original):
-                # TODO: Use Django to set the field so the attname is correct
-                setattr(
-                    translation, field.field_name, getattr(original, field.field_name)
-                )
-
-        # Fetch all translated segments
-        string_segments = (
+        string_segments = list(
             StringSegment.objects.filter(source=self)
-            .annotate_translation(locale)
             .select_related("context", "string")
         )
 
-        template_segments = (
+        # Fetch the translations of these strings into all of the locales
+        string_translations = {
+            (translation_of_id, context_id, locale_id): data
+            for translation_of_id, context_id, locale_id, data in StringTranslation.objects.filter(
+                translation_of_id__in=StringSegment.objects.filter(source=self).values("string_id"),
+                context_id__in=StringSegment.objects.filter(source=self).values("context_id"),
+                locale_id__in=[pk(locale) for locale in locales],
+            ).values_list("translation_of_id", "context_id", "locale_id", "data")
+        }
+
+        template_segments = []
+        for template_segment in (
             TemplateSegment.objects.filter(source=self)
             .select_related("template")
             .select_related("context")
-        )
+        ):
+            template = template_segment.template
+            template_segments.append(
+                TemplateSegmentValue(
+                    template_segment.context.path,
+                    template.template_format,
+                    template.template,
+                    template.string_count,
+                    order=template_segment.order,
+                )
+            )
 
-        related_object_segments = (
+        related_object_segments = list(
             RelatedObjectSegment.objects.filter(source=self)
             .select_related("object")
             .select_related("context")
         )
 
-        segments = []
+        # Fetch the translations of all related objects up front so that ingestion
+        # doesn't need to look each one up individually
+        related_object_instances = TranslatableObject.objects.get_instances_many(
+            [related_object_segment.object for related_object_segment in related_object_segments],
+            locales,
+        )
 
-        for string_segment in string_segments:
-            if string_segment.translation:
-                string = StringValue(string_segment.translation)
-            elif string_translation_fallback_to_source:
-                string = StringValue(string_segment.string.data)
-            else:
-                raise MissingTranslationError(string_segment, locale)
+        translations = {}
+        errors = {}
 
-            segment_value = StringSegmentValue(
-                string_segment.context.path,
-                string,
-                attrs=json.loads(string_segment.attrs)
-            ).with_order(string_segment.order)
+        for locale in locales:
+            try:
+                with transaction.atomic():
+                    # Fill in the translations of each string
+                    segments = []
 
-            segments.append(segment_value)
+                    for string_segment in string_segments:
+                        translation = string_translations.get((string_segment.string_id, string_segment.context_id, pk(locale)))
 
-        for template_segment in template_segments:
-            template = template_segment.template
-            segment_value = TemplateSegmentValue(
-                template_segment.context.path,
-                template.template_format,
-                template.template,
-                template.string_count,
-                order=template_segment.order,
-            )
-            segments.append(segment_value)
+                        if translation:
+                            string = StringValue(translation)
+                        elif string_translation_fallback_to_source:
+                            string = StringValue(string_segment.string.data)
+                        else:
+                            raise MissingTranslationError(string_segment, locale)
 
-        for related_object_segment in related_object_segments:
-            if not related_object_segment.object.has_translation(locale):
-                raise MissingRelatedObjectError(related_object_segment, locale)
+                        segment_value = StringSegmentValue(
+                            string_segment.context.path,
+                            string,
+                            attrs=json.loads(string_segment.attrs)
+                        ).with_order(string_segment.order)
 
-            segment_value = RelatedObjectSegmentValue(
-                related_object_segment.context.path,
-                related_object_segment.object.content_type,
-                related_object_segment.object.translation_key,
-                order=related_object_segment.order,
-            )
-            segments.append(segment_value)
+                        segments.append(segment_value)
+
+                    segments.extend(template_segments)
+
+                    for related_object_segment in related_object_segments:
+                        instance = related_object_instances.get((related_object_segment.object.translation_key, pk(locale)))
+
+                        if instance is None:
+                            raise MissingRelatedObjectError(related_object_segment, locale)
+
+                        segment_value = RelatedObjectSegmentValue(
+                            related_object_segment.context.path,
+                            ContentType.objects.get_for_id(related_object_segment.object.content_type_id),
+                            related_object_segment.object.translation_key,
+                            instance=instance,
+                            order=related_object_segment.order,
+                        )
+                        segments.append(segment_value)
+
+                    translations[locale] = self._save_translation(original, locale, segments, user=user, publish=publish, copy_parent_pages=copy_parent_pages)
+
+            except Exception as e:
+                errors[locale] = e
+
+        return translations, errors
+
+    def _save_translation(self, original, locale, segments, user=None, publish=True, copy_parent_pages=False):
+        """
+        Creates/updates the translation of the object into the specified locale
+        from the given translated segments.
+        """
+        created = False
+
+        try:
+            translation = self.get_translated_instance(locale)
+        except models.ObjectDoesNotExist:
+            if isinstance(original, Page):
+                translation = original.copy_for_translation(locale, copy_parents=copy_parent_pages)
+            else:
+                translation = original.copy_for_translation(locale)
+
+            created = True
+
+        # Copy synchronised fields
+        for field in getattr(translation, 'translatable_fields', []):
+            if field.is_synchronized(original):
+                # TODO: Use Django to set the field so the attname is correct
+                setattr(
+                    translation, field.field_name, getattr(original, field.field_name)
+                )
 
         # Ingest all translated segments
         ingest_segments(original, translation, self.locale, locale, segments)
@@ -432,6 +899,60 @@ class StringNotUsedInContext(POImportWarning):
         return f"<StringNotUsedInContext {self.index} '{self.string}' '{self.context}'>"
 
 
+class TranslationQuerySet(models.QuerySet):
+    @staticmethod
+    def _count_segments(segments):
+        # Counts the given segments in a subquery. Grouping by source makes the database
+        # return a single row containing the count
+        return Coalesce(
+            Subquery(
+                segments.order_by().values("source_id").annotate(count=Count("pk")).values("count")
+            ),
+            0,
+        )
+
+    def _get_progress_expressions(self):
+        required_segments = StringSegment.objects.filter(source_id=OuterRef("source_id"))
+        translated_segments = required_segments.annotate(
+            is_translated=Exists(
+                StringTranslation.objects.filter(
+                    translation_of_id=OuterRef("string_id"),
+                    context_id=OuterRef("context_id"),
+                    locale_id=OuterRef(OuterRef("target_locale_id")),
+                )
+            )
+        ).filter(is_translated=True)
+
+        return self._count_segments(required_segments), self._count_segments(translated_segments)
+
+    def annotate_progress(self):
+        """
+        Adds 'total_segments_count' and 'translated_segments_count' fields to the
+        translations, containing the number of segments in the source and the number
+        of those segments that have been translated into the target locale.
+
+        This fetches the progress of all of the translations in a single query.
+        """
+        total_segments, translated_segments = self._get_progress_expressions()
+
+        return self.annotate(
+            total_segments_count=total_segments,
+            translated_segments_count=translated_segments,
+        )
+
+    def update_progress(self):
+        """
+        Recalculates the cached 'total_segments' and 'translated_segments' fields
+        of the translations with a single UPDATE query.
+        """
+        total_segments, translated_segments = self._get_progress_expressions()
+
+        return self.update(
+            total_segments=total_segments,
+            translated_segments=translated_segments,
+        )
+
+
 class Translation(models.Model):
     """
     Manages the translation of an object into a locale.
@@ -463,11 +984,25 @@ class Translation(models.Model):
     destination_last_updated_at = models.DateTimeField(null=True)
     enabled = models.BooleanField(default=True)
 
+    # The progress of this translation, cached so it can be displayed without needing to count
+    # the segments. These are kept up to date by TranslationQuerySet.update_progress() whenever
+    # the source or the translated strings change. Null if it hasn't been calculated yet.
+    total_segments = models.PositiveIntegerField(null=True, editable=False)
+    translated_segments = models.PositiveIntegerField(null=True, editable=False)
+
+    objects = TranslationQuerySet.as_manager()
+
     class Meta:
         unique_together = [
             ('object', 'target_locale'),
         ]
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        # The source may have changed
+        Translation.objects.filter(pk=self.pk).update_progress()
+
     def get_progress(self):
         """
         Returns the current progress of translating this Translation.
@@ -475,31 +1010,17 @@ class Translation(models.Model):
         - The total number of segments in the source that need to be translated
         - The number of segments that have been translated into the locale
         """
-        # Get QuerySet of Segments that need to be translated
-        required_segments = StringSegment.objects.filter(source_id=self.source_id)
+        # Use the progress from annotate_progress() if this instance was fetched with it
+        if hasattr(self, "total_segments_count") and hasattr(self, "translated_segments_count"):
+            return self.total_segments_count, self.translated_segments_count
 
-        # Annotate each Segment with a flag that indicates whether the segment is translated
-        # into the locale
-        required_segments = required_segments.annotate(
-            is_translated=Exists(
-                StringTranslation.objects.filter(
-                    translation_of_id=OuterRef("string_id"),
-                    context_id=OuterRef("context_id"),
-                    locale_id=self.target_locale_id,
-                )
-            )
-        )
+        # Then the cached progress, as of when this instance was loaded
+        if self.total_segments is not None and self.translated_segments is not None:
+            return self.total_segments, self.translated_segments
 
-        # Count the total number of segments and the number of translated segments
-        aggs = required_segments.annotate(
-            is_translated_i=Case(
-                When(is_translated=True, then=Value(1)),
-                default=Value(0),
-                output_field=IntegerField(),
-            )
-        ).aggregate(total_segments=Count("pk"), translated_segments=Sum("is_translated_i"))
-
-        return aggs["total_segments"], aggs["translated_segments"]
+        return Translation.objects.filter(pk=self.pk).annotate_progress().values_list(
+            "total_segments_count", "translated_segments_count"
+        ).get()
 
     def get_status_display(self):
         """
@@ -511,39 +1032,32 @@ class Translation(models.Model):
         else:
             return _("Waiting for translations")
 
-    def export_po(self):
+    def get_po_metadata(self):
+        return {
+            "POT-Creation-Date": str(timezone.now()),
+            "MIME-Version": "1.0",
+            "Content-Type": "text/plain; charset=utf-8",
+            "X-WagtailLocalize-TranslationID": str(self.uuid),
+        }
+
+    def get_po_entries(self):
         """
-        Exports a PO file contining the source strings and translations.
+        Yields a POEntry for each source string and its translation, followed by obsolete
+        entries for any strings that were translated on an older version of the object.
         """
-        # Get messages
-        messages = defaultdict(list)
-
         string_segments = (
             StringSegment.objects.filter(source=self.source)
-            .order_by('order')
+            .unique_strings()
             .select_related("context", "string")
             .annotate_translation(self.target_locale)
+            .iterator()
         )
 
         for string_segment in string_segments:
-            messages[string_segment.string.data] = (string_segment.context.path, string_segment.translation)
-
-        # Build a PO file
-        po = polib.POFile(wrapwidth=200)
-        po.metadata = {
-            "POT-Creation-Date": str(timezone.now()),
-            "MIME-Version": "1.0",
-            "Content-Type": "text/plain; charset=utf-8",
-            "X-WagtailLocalize-TranslationID": str(self.uuid),
-        }
-
-        for text, (context, translation) in messages.items():
-            po.append(
-                polib.POEntry(
-                    msgid=text,
-                    msgctxt=context,
-                    msgstr=translation or "",
-                )
+            yield polib.POEntry(
+                msgid=string_segment.string.data,
+                msgctxt=string_segment.context.path,
+                msgstr=string_segment.translation or "",
             )
 
         # Add any obsolete segments that have translations for future reference
@@ -557,68 +1071,197 @@ class Translation(models.Model):
             .select_related("translation_of", "context")
             .iterator()
         ):
-            po.append(
-                polib.POEntry(
-                    msgid=translation.translation_of.data,
-                    msgstr=translation.data or "",
-                    msgctxt=translation.context.path,
-                    obsolete=True,
-                )
+            yield polib.POEntry(
+                msgid=translation.translation_of.data,
+                msgstr=translation.data or "",
+                msgctxt=translation.context.path,
+                obsolete=True,
             )
 
+    def export_po(self):
+        """
+        Exports a PO file contining the source strings and translations.
+        """
+        po = polib.POFile(wrapwidth=200)
+        po.metadata = self.get_po_metadata()
+
+        for entry in self.get_po_entries():
+            po.append(entry)
+
         return po
 
+    def stream_po(self):
+        """
+        Exports a PO file contining the source strings and translations as an iterator
+        of chunks of text.
+
+        Unlike export_po, this never holds the whole file in memory.
+        """
+        return stream_po(self.get_po_metadata(), self.get_po_entries())
+
     @transaction.atomic
-    def import_po(self, po, delete=False):
+    def prefill_from_memory(self, fallback="most_recent"):
         """
-        Imports translations from a PO file.
+        Creates a StringTranslation for each segment of the source that hasn't been translated
+        in its own context, but whose string has been translated into the target locale in
+        another context. See StringSegmentQuerySet.annotate_translation for the fallbacks.
+
+        Returns the number of StringTranslations that were created.
         """
-        seen_translation_ids = set()
+        segments = (
+            StringSegment.objects.filter(source_id=self.source_id)
+            .annotate(
+                has_translation=Exists(
+                    StringTranslation.objects.filter(
+                        translation_of_id=OuterRef("string_id"),
+                        locale_id=self.target_locale_id,
+                        context_id=OuterRef("context_id"),
+                    )
+                )
+            )
+            .filter(has_translation=False)
+            .annotate_translation(self.target_locale_id, fallback=fallback)
+            .filter(translation__isnull=False)
+            .values_list("string_id", "context_id", "translation")
+        )
 
-        if 'X-WagtailLocalize-TranslationID' in po.metadata and po.metadata['X-WagtailLocalize-TranslationID'] != str(self.uuid):
-            return
+        translations_to_create = {
+            (string_id, context_id): StringTranslation(
+                translation_of_id=string_id,
+                locale_id=self.target_locale_id,
+                context_id=context_id,
+                data=data,
+            )
+            for string_id, context_id, data in segments
+        }
 
-        for index, entry in enumerate(po):
-            try:
-                string = String.objects.get(locale_id=self.source.locale_id, data=entry.msgid)
-                context = TranslationContext.objects.get(object_id=self.source.object_id, path=entry.msgctxt)
+        StringTranslation.objects.bulk_create(translations_to_create.values(), ignore_conflicts=True)
+        Translation.objects.filter(object_id=self.object_id, target_locale_id=self.target_locale_id).update_progress()
 
-                # Ignore blank strings
-                if not entry.msgstr:
-                    continue
+        return len(translations_to_create)
 
-                # Ignore if the string has never appeared in a version of this object
-                if not StringSegment.objects.filter(string=string, context=context).exists():
-                    yield StringNotUsedInContext(index, entry.msgid, entry.msgctxt)
-                    continue
+    def import_po(self, po, delete=False):
+        """
+        Imports translations from a PO file.
 
-                string_translation, created = string.translations.get_or_create(
-                    locale_id=self.target_locale_id,
-                    context=context,
-                    defaults={
-                        "data": entry.msgstr,
-                        "updated_at": timezone.now(),
-                    },
-                )
+        Yields a POImportWarning for each entry that couldn't be imported.
 
-                seen_translation_ids.add(string_translation.id)
+        All the strings, contexts and existing translations are looked up in bulk
+        and the changes are saved with a fixed number of queries, so this doesn't
+        slow down too much on large PO files.
+        """
+        if 'X-WagtailLocalize-TranslationID' in po.metadata and po.metadata['X-WagtailLocalize-TranslationID'] != str(self.uuid):
+            return
 
-                if not created:
-                    # Update the string_translation only if it has changed
-                    if string_translation.data != entry.msgstr:
-                        string_translation.data = entry.msgstr
-                        string_translation.updated_at = timezone.now()
-                        string_translation.save()
+        # Look up all the strings and contexts referenced in the PO file
+        string_ids_by_hash = dict(
+            filter_in_batches(
+                String.objects.filter(locale_id=self.source.locale_id).values_list("data_hash", "id"),
+                "data_hash",
+                {String.get_data_hash(entry.msgid) for entry in po},
+            )
+        )
+        context_ids_by_path_id = dict(
+            filter_in_batches(
+                TranslationContext.objects.filter(object_id=self.source.object_id).values_list("path_id", "id"),
+                "path_id",
+                {TranslationContext.get_path_id(entry.msgctxt) for entry in po if entry.msgctxt is not None},
+            )
+        )
 
-            except TranslationContext.DoesNotExist:
-                yield UnknownContext(index, entry.msgctxt)
+        warnings = []
+        entries = []
 
-            except String.DoesNotExist:
-                yield UnknownString(index, entry.msgid)
+        for index, entry in enumerate(po):
+            string_id = string_ids_by_hash.get(String.get_data_hash(entry.msgid))
+            if string_id is None:
+                warnings.append(UnknownString(index, entry.msgid))
+                continue
+
+            context_id = None
+            if entry.msgctxt is not None:
+                context_id = context_ids_by_path_id.get(TranslationContext.get_path_id(entry.msgctxt))
+
+            if context_id is None:
+                warnings.append(UnknownContext(index, entry.msgctxt))
+                continue
+
+            # Ignore blank strings
+            if not entry.msgstr:
+                continue
+
+            entries.append((index, entry, (string_id, context_id)))
+
+        # Find which of the strings have appeared in each context in a version of this object
+        used_string_contexts = set(
+            filter_in_batches(
+                StringSegment.objects.filter(context_id__in=set(context_ids_by_path_id.values())).values_list("string_id", "context_id").distinct(),
+                "string_id",
+                {string_id for index, entry, (string_id, context_id) in entries},
+            )
+        )
 
-        # Delete any translations that weren't mentioned
-        if delete:
-            StringTranslation.objects.filter(context__object=self.object, locale=self.target_locale).exclude(id__in=seen_translation_ids).delete()
+        translations = {}
+        for index, entry, string_context in entries:
+            # Ignore if the string has never appeared in a version of this object
+            if string_context not in used_string_contexts:
+                warnings.append(StringNotUsedInContext(index, entry.msgid, entry.msgctxt))
+                continue
+
+            # If the same string/context appears more than once, the last one wins
+            translations[string_context] = entry
+
+        # Yield the warnings in the same order as the entries they are for
+        warnings.sort(key=lambda warning: warning.index)
+
+        with transaction.atomic():
+            existing_translations = {
+                (string_translation.translation_of_id, string_translation.context_id): string_translation
+                for string_translation in StringTranslation.objects.filter(context__object=self.object, locale=self.target_locale)
+            }
+
+            now = timezone.now()
+            translations_to_create = []
+            translations_to_update = []
+
+            for string_context, entry in translations.items():
+                string_translation = existing_translations.get(string_context)
+
+                if string_translation is None:
+                    string_id, context_id = string_context
+                    translations_to_create.append(
+                        StringTranslation(
+                            translation_of_id=string_id,
+                            locale_id=self.target_locale_id,
+                            context_id=context_id,
+                            data=entry.msgstr,
+                            updated_at=now,
+                        )
+                    )
+
+                # Update the string_translation only if it has changed
+                elif string_translation.data != entry.msgstr:
+                    string_translation.data = entry.msgstr
+                    string_translation.updated_at = now
+                    translations_to_update.append(string_translation)
+
+            # Delete any translations that weren't mentioned
+            if delete:
+                ids_to_delete = [
+                    string_translation.id
+                    for string_context, string_translation in existing_translations.items()
+                    if string_context not in translations
+                ]
+
+                for i in range(0, len(ids_to_delete), IN_CLAUSE_BATCH_SIZE):
+                    StringTranslation.objects.filter(id__in=ids_to_delete[i:i + IN_CLAUSE_BATCH_SIZE]).delete()
+
+            StringTranslation.objects.bulk_create(translations_to_create)
+            StringTranslation.objects.bulk_update(translations_to_update, ["data", "updated_at"])
+
+            Translation.objects.filter(object_id=self.object_id, target_locale_id=self.target_locale_id).update_progress()
+
+        yield from warnings
 
     def save_target(self, user=None, publish=True):
         """
@@ -678,6 +1321,36 @@ class String(models.Model):
 
         return string
 
+    @classmethod
+    def get_or_create_many(cls, locale, stringvalues):
+        """
+        Bulk version of from_value. Returns a dict of Strings keyed by their data.
+        """
+        data_by_hash = {
+            cls.get_data_hash(stringvalue.data): stringvalue.data
+            for stringvalue in stringvalues
+        }
+
+        created_hashes = set()
+
+        def make_string(data_hash):
+            created_hashes.add(data_hash)
+            return cls(locale_id=pk(locale), data_hash=data_hash, data=data_by_hash[data_hash])
+
+        strings = get_or_create_many(
+            cls.objects.filter(locale_id=pk(locale)),
+            "data_hash",
+            data_by_hash.keys(),
+            make_string,
+        )
+
+        # Add new strings to the translation memory index. This is done here as bulk_create
+        # doesn't call save()
+        if created_hashes and is_index_enabled():
+            index_strings([strings[data_hash] for data_hash in created_hashes if data_hash in strings])
+
+        return {string.data: string for string in strings.values()}
+
     def as_value(self):
         return StringValue(self.data)
 
@@ -685,12 +1358,32 @@ class String(models.Model):
         if self.data and self.data_hash is None:
             self.data_hash = self.get_data_hash(self.data)
 
-        return super().save(*args, **kwargs)
+        adding = self._state.adding
+        result = super().save(*args, **kwargs)
+
+        if adding and is_index_enabled():
+            index_strings([self])
+
+        return result
 
     class Meta:
         unique_together = [("locale", "data_hash")]
 
 
+class StringMinHashBand(models.Model):
+    """
+    An entry in the translation memory index. Each String has a row for each band of
+    its MinHash signature. See wagtail_localize.translation_memory.
+    """
+
+    string = models.ForeignKey(String, on_delete=models.CASCADE, related_name="+")
+    locale = models.ForeignKey("wagtailcore.Locale", on_delete=models.CASCADE, related_name="+")
+    band_hash = models.BigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["locale", "band_hash"])]
+
+
 class TranslationContext(models.Model):
     object = models.ForeignKey(
         TranslatableObject, on_delete=models.CASCADE, related_name="+"
@@ -707,6 +1400,26 @@ class TranslationContext(models.Model):
     def get_path_id(cls, path):
         return uuid.uuid5(uuid.UUID("fcab004a-2b50-11ea-978f-2e728ce88125"), path)
 
+    @classmethod
+    def get_or_create_many(cls, object_id, paths):
+        """
+        Fetches/creates the contexts for the given paths on an object in bulk.
+
+        Returns a dict of TranslationContexts keyed by their path.
+        """
+        paths_by_id = {cls.get_path_id(path): path for path in paths}
+
+        contexts = get_or_create_many(
+            cls.objects.filter(object_id=object_id),
+            "path_id",
+            paths_by_id.keys(),
+            lambda path_id: cls(
+                object_id=object_id, path_id=path_id, path=paths_by_id[path_id]
+            ),
+        )
+
+        return {context.path: context for context in contexts.values()}
+
     def save(self, *args, **kwargs):
         if self.path and self.path_id is None:
             self.path_id = self.get_path_id(self.path)
@@ -748,6 +1461,28 @@ class StringTranslation(models.Model):
     class Meta:
         unique_together = [("locale", "translation_of", "context")]
 
+    def get_affected_translations(self):
+        """
+        Returns a queryset of the Translations whose progress depends on this string translation.
+        """
+        return Translation.objects.filter(
+            target_locale_id=self.locale_id,
+            source__stringsegment__string_id=self.translation_of_id,
+            source__stringsegment__context_id=self.context_id,
+        )
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+
+        if adding:
+            self.get_affected_translations().update_progress()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.get_affected_translations().update_progress()
+        return result
+
     @classmethod
     def from_text(cls, translation_of, locale, context, data):
         segment, created = cls.objects.get_or_create(
@@ -760,6 +1495,27 @@ class StringTranslation(models.Model):
         return segment
 
 
+class MachineTranslation(models.Model):
+    """
+    A translation of a string that was made by a machine translator.
+
+    These are keyed by the hash of the source string and a key identifying the machine
+    translator's configuration. This means that strings only need to be sent to the
+    machine translator once, and changing the translator class or its options won't
+    return translations made with the old configuration.
+    """
+
+    translator_key = models.UUIDField()
+    source_locale = models.ForeignKey("wagtailcore.Locale", on_delete=models.CASCADE, related_name="+")
+    target_locale = models.ForeignKey("wagtailcore.Locale", on_delete=models.CASCADE, related_name="+")
+    source_hash = models.UUIDField()
+    data = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [("translator_key", "source_locale", "target_locale", "source_hash")]
+
+
 class Template(models.Model):
     BASE_UUID_NAMESPACE = uuid.UUID("4599eabc-3f8e-41a9-be61-95417d26a8cd")
 
@@ -769,11 +1525,14 @@ class Template(models.Model):
     string_count = models.PositiveIntegerField()
 
     @classmethod
-    def from_value(cls, template_value):
+    def get_uuid(cls, template_value):
         uuid_namespace = uuid.uuid5(cls.BASE_UUID_NAMESPACE, template_value.format)
+        return uuid.uuid5(uuid_namespace, template_value.template)
 
+    @classmethod
+    def from_value(cls, template_value):
         template, created = cls.objects.get_or_create(
-            uuid=uuid.uuid5(uuid_namespace, template_value.template),
+            uuid=cls.get_uuid(template_value),
             defaults={
                 "template": template_value.template,
                 "template_format": template_value.format,
@@ -783,33 +1542,113 @@ class Template(models.Model):
 
         return template
 
+    @classmethod
+    def get_or_create_many(cls, template_values):
+        """
+        Bulk version of from_value. Returns a dict of Templates keyed by their UUID.
+        """
+        template_values_by_uuid = {
+            cls.get_uuid(template_value): template_value
+            for template_value in template_values
+        }
+
+        def make_instance(template_uuid):
+            template_value = template_values_by_uuid[template_uuid]
+            return cls(
+                uuid=template_uuid,
+                template=template_value.template,
+                template_format=template_value.format,
+                string_count=template_value.string_count,
+            )
+
+        return get_or_create_many(
+            cls.objects.all(), "uuid", template_values_by_uuid.keys(), make_instance
+        )
+
 
 class BaseSegment(models.Model):
-    source = models.ForeignKey(TranslationSource, on_delete=models.CASCADE)
+    source = models.ForeignKey(TranslationSource, on_delete=models.CASCADE, db_index=False)
     context = models.ForeignKey(TranslationContext, on_delete=models.PROTECT,)
     order = models.PositiveIntegerField()
 
     class Meta:
         abstract = True
+        # Segments are always fetched by source in order. This also covers lookups by source
+        indexes = [models.Index(fields=["source", "order"])]
 
 
 class StringSegmentQuerySet(models.QuerySet):
-    def annotate_translation(self, locale):
+    def annotate_translation(self, locale, fallback=None):
         """
         Adds a 'translation' field to the segments containing the
         text content of the segment translated into the specified
         locale.
+
+        By default, only translations made for the segment's context are
+        used. If fallback is set, segments that haven't been translated in
+        their context use a translation of the same string from any other
+        context instead. This can be:
+
+         - "most_recent": the most recently updated translation
+         - "most_frequent": the translation used in the most contexts
         """
-        return self.annotate(
-            translation=Subquery(
-                StringTranslation.objects.filter(
-                    translation_of_id=OuterRef("string_id"),
-                    locale_id=pk(locale),
-                    context_id=OuterRef("context_id"),
-                ).values("data")
+        translation = Subquery(
+            StringTranslation.objects.filter(
+                translation_of_id=OuterRef("string_id"),
+                locale_id=pk(locale),
+                context_id=OuterRef("context_id"),
+            ).values("data")
+        )
+
+        if fallback is None:
+            return self.annotate(translation=translation)
+
+        other_translations = StringTranslation.objects.filter(
+            translation_of_id=OuterRef("string_id"),
+            locale_id=pk(locale),
+        )
+
+        if fallback == "most_recent":
+            other_translation = other_translations.order_by("-updated_at", "-id").values("data")[:1]
+        elif fallback == "most_frequent":
+            other_translation = (
+                other_translations.values("data")
+                .annotate(uses=Count("id"), last_updated_at=Max("updated_at"))
+                .order_by("-uses", "-last_updated_at")
+                .values("data")[:1]
             )
+        else:
+            raise ValueError(f"Unrecognised fallback '{fallback}'")
+
+        return self.annotate(
+            translation=Coalesce(translation, Subquery(other_translation))
         )
 
+    def unique_strings(self):
+        """
+        Filters the segments down to one per string, ordered by where each
+        string first appears.
+
+        If a string is used more than once, the segment of its last use is
+        the one that is kept.
+        """
+        return self.filter(
+            ~Exists(
+                StringSegment.objects.filter(
+                    source_id=OuterRef("source_id"),
+                    string_id=OuterRef("string_id"),
+                    order__gt=OuterRef("order"),
+                )
+            )
+        ).annotate(
+            first_order=Subquery(
+                StringSegment.objects.filter(
+                    source_id=OuterRef("source_id"),
+                    string_id=OuterRef("string_id"),
+                ).order_by("order").values("order")[:1]
+            )
+        ).order_by("first_order")
+
 
 class StringSegment(BaseSegment):
     string = models.ForeignKey(
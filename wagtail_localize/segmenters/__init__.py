@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+DEFAULT_SEGMENTER = 'wagtail_localize.segmenters.beautifulsoup.BeautifulSoupSegmenter'
+
+
+def get_segmenter_config():
+    config = getattr(settings, 'WAGTAILLOCALIZE_SEGMENTER', None) or {}
+
+    return {
+        'CLASS': config.get('CLASS', DEFAULT_SEGMENTER),
+        'OPTIONS': config.get('OPTIONS', {}),
+    }
+
+
+def get_segmenter():
+    config = get_segmenter_config()
+
+    # Raises ImportError
+    segmenter_class = import_string(config['CLASS'])
+
+    return segmenter_class(config['OPTIONS'])
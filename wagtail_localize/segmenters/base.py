@@ -0,0 +1,12 @@
+class BaseSegmenter:
+    """
+    Splits an HTML fragment into a template and a list of translatable strings.
+    """
+    def __init__(self, options):
+        self.options = options
+
+    def extract_strings(self, html):
+        """
+        Returns a 2-tuple of the template and a list of (StringValue, attrs) tuples.
+        """
+        raise NotImplementedError
@@ -0,0 +1,173 @@
+from bs4 import BeautifulSoup, NavigableString
+
+from wagtail_localize.strings import INLINE_TAGS, StringValue, lstrip_keep, rstrip_keep
+
+from .base import BaseSegmenter
+
+
+class BeautifulSoupSegmenter(BaseSegmenter):
+    """
+    The reference segmenter. Parses the HTML with BeautifulSoup, marks each
+    translatable string with a <text> tag, then re-parses each string to
+    extract its attributes.
+    """
+
+    def extract_strings(self, html):
+        """
+        See wagtail_localize.strings.extract_strings.
+        """
+        soup = BeautifulSoup(html, "html.parser")
+
+        def wrap(elements):
+            """
+            Wraps the given elements with a <text> tag
+
+            The elements must be contiguous siblings or this might screw up the tree.
+            """
+            elements = list(elements)
+
+            # Skip if there are no tags to wrap
+            # We can get here after filters below have been applied
+            if len(elements) == 0:
+                return
+
+            # If there is a single element and that is an inline tag, wrap just the contents.
+            # We only care about inline tags that wrap only part of a segment
+            if (
+                len(elements) == 1
+                and not isinstance(elements[0], NavigableString)
+                and elements[0].name in INLINE_TAGS
+            ):
+                wrap(elements[0].children)
+                return
+
+            def ignore_if_at_end(element):
+                """
+                Returns True if the given element should be ignored if it is at one of the ends
+                """
+                if isinstance(element, NavigableString):
+                    return False
+
+                # Ignore if there are no text nodes
+                # This will exclude both <br> tags and empty inline tags
+                if not any(
+                    isinstance(desc, NavigableString) for desc in element.descendants
+                ):
+                    return True
+
+                return False
+
+            if ignore_if_at_end(elements[0]):
+                wrap(elements[1:])
+                return
+
+            if ignore_if_at_end(elements[-1]):
+                wrap(elements[:-1])
+                return
+
+            value = "".join(
+                element.output_ready()
+                if isinstance(element, NavigableString)
+                else str(element)
+                for element in elements
+            )
+
+            if value and not value.isspace():
+                # Create <text> tag
+                elements[0].insert_before(soup.new_tag("text", value=value))
+
+                # Remove elements
+                for element in elements:
+                    element.replaceWith("")
+
+        def walk(element):
+            """
+            Walks the tree in depth first search post-order.
+
+            When it encounters an element that could be extracted, it wraps it with
+            a <text> tag. These are extracted in the next stage (because we want to
+            preserve order of occurance).
+
+            For example:
+
+            <p>
+                Foo
+                <ul>
+                  <li>Bar</li>
+                </ul>
+                Baz
+            </p>
+
+            Is transformed to:
+
+            <p>
+                <text>Foo</text>
+                <ul>
+                  <li><text><b>Bar</b></text></li>
+                </ul>
+                <text>Baz</text>
+            </p>
+            """
+            if isinstance(element, NavigableString):
+                return False, False
+
+            has_block = False
+            has_wrap = False
+            buffer = []
+
+            for child in element.children:
+                child_has_wrap, is_block = walk(child)
+
+                if child_has_wrap:
+                    has_wrap = True
+
+                if is_block:
+                    has_block = True
+
+                    if buffer:
+                        wrap(buffer)
+                        buffer = []
+                        has_wrap = True
+
+                else:
+                    if not child_has_wrap:
+                        buffer.append(child)
+
+            if buffer and has_block:
+                wrap(buffer)
+                buffer = []
+                has_wrap = True
+
+            if element.name not in INLINE_TAGS:
+                if buffer:
+                    wrap(buffer)
+                    has_wrap = True
+
+                return has_wrap, True
+
+            return has_wrap, False
+
+        walk(soup)
+
+        # Now extract strings from the <text> tags
+        strings = []
+        for element in soup.descendants:
+            if element.name == "text":
+                text = element.attrs.pop("value")
+
+                # Strip leading and trailing whitespace. We keep the values and reinsert them
+                # into the template
+                # This is probably not necessary, but just to be on the safe side
+                text, prefix = lstrip_keep(text)
+                text, suffix = rstrip_keep(text)
+
+                element.attrs["position"] = len(strings)
+                strings.append(StringValue.from_html(text))
+
+                if prefix:
+                    element.insert_before(prefix)
+
+                if suffix:
+                    element.insert_after(suffix)
+
+        return str(soup), strings
@@ -0,0 +1,131 @@
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from wagtail_localize.strings import StringValue
+
+from . import get_segmenter, get_segmenter_config
+
+
+CacheInfo = namedtuple("CacheInfo", ["memory_hits", "cache_hits", "misses", "currsize", "maxsize"])
+
+DEFAULT_MAX_SIZE = 1000
+
+
+class SegmentationCache:
+    """
+    A bounded, thread-safe LRU cache of the results of splitting rich text into a template
+    and strings, keyed by a digest of the HTML and the segmenter configuration.
+
+    If a Django cache alias is given, results that aren't in memory are looked up there
+    too so they can be shared between processes.
+
+    This also counts how many results were found in memory, found in the Django cache or
+    had to be extracted by the segmenter.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAX_SIZE, cache_alias=None):
+        self.maxsize = maxsize
+        self.cache_alias = cache_alias
+        self.lock = threading.Lock()
+        self.clear()
+
+    def get_key(self, segmenter_config, html):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps(segmenter_config, sort_keys=True, separators=(",", ":"), default=str).encode())
+        digest.update(b"\0")
+        digest.update(html.encode())
+        return "wagtail_localize:segments:" + digest.hexdigest()
+
+    def extract_strings(self, html):
+        """
+        Returns the same as BaseSegmenter.extract_strings, using a cached result if there is one.
+        """
+        key = self.get_key(get_segmenter_config(), html)
+
+        with self.lock:
+            result = self.results.get(key)
+            if result is not None:
+                self.results.move_to_end(key)
+                self.memory_hits += 1
+
+        if result is None and self.cache_alias is not None:
+            result = caches[self.cache_alias].get(key)
+            if result is not None:
+                self.set(key, result)
+                with self.lock:
+                    self.cache_hits += 1
+
+        if result is None:
+            template, strings = get_segmenter().extract_strings(html)
+            result = (template, [(string.data, attrs) for string, attrs in strings])
+
+            self.set(key, result)
+            if self.cache_alias is not None:
+                caches[self.cache_alias].set(key, result)
+
+            with self.lock:
+                self.misses += 1
+
+        # Callers may modify the attrs, so they are copied to keep the cached result intact
+        template, strings = result
+        return template, [(StringValue(data), copy.deepcopy(attrs)) for data, attrs in strings]
+
+    def set(self, key, result):
+        if not self.maxsize:
+            return
+
+        with self.lock:
+            self.results[key] = result
+            self.results.move_to_end(key)
+
+            while len(self.results) > self.maxsize:
+                self.results.popitem(last=False)
+
+    def cache_info(self):
+        return CacheInfo(self.memory_hits, self.cache_hits, self.misses, len(self.results), self.maxsize)
+
+    def clear(self):
+        """
+        Clears the in-memory cache and its statistics. The Django cache isn't cleared.
+        """
+        with self.lock:
+            self.results = OrderedDict()
+            self.memory_hits = 0
+            self.cache_hits = 0
+            self.misses = 0
+
+
+_segmentation_cache = None
+_segmentation_cache_config = None
+
+
+def get_segmentation_cache():
+    """
+    Returns the SegmentationCache configured by the WAGTAILLOCALIZE_SEGMENTATION_CACHE setting,
+    or None if it's been disabled by setting it, or its MAX_SIZE, to False, None or 0. Setting
+    it to True uses the defaults.
+    """
+    global _segmentation_cache, _segmentation_cache_config
+
+    config = getattr(settings, 'WAGTAILLOCALIZE_SEGMENTATION_CACHE', {})
+    if config is True:
+        config = {}
+
+    if config is None or config is False or not config.get('MAX_SIZE', DEFAULT_MAX_SIZE):
+        return
+
+    # The cache is only rebuilt if the setting is changed
+    if _segmentation_cache is None or config != _segmentation_cache_config:
+        _segmentation_cache = SegmentationCache(
+            maxsize=config.get('MAX_SIZE', DEFAULT_MAX_SIZE),
+            cache_alias=config.get('CACHE_ALIAS'),
+        )
+        _segmentation_cache_config = dict(config)
+
+    return _segmentation_cache
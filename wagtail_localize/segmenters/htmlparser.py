@@ -0,0 +1,485 @@
+from collections import Counter
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from bs4.builder import HTMLTreeBuilder
+from bs4.dammit import EntitySubstitution
+
+from wagtail_localize.strings import INLINE_TAGS, StringValue, lstrip_keep, rstrip_keep
+
+from .base import BaseSegmenter
+from .beautifulsoup import BeautifulSoupSegmenter
+
+
+# These are taken from BeautifulSoup so the tree we build matches the one that the
+# BeautifulSoupSegmenter would have built with the same version of BeautifulSoup
+VOID_ELEMENTS = HTMLTreeBuilder.empty_element_tags
+CDATA_LIST_ATTRIBUTES = HTMLTreeBuilder.DEFAULT_CDATA_LIST_ATTRIBUTES
+ASCII_SPACES = BeautifulSoup.ASCII_SPACES
+
+# Tags that BeautifulSoup treats specially when parsing or rendering (whitespace
+# preservation, unescaped content). We don't bother reimplementing those rules,
+# any fragment that contains one of these is handed to the BeautifulSoupSegmenter.
+# "text" is in here as that is the tag we use in templates.
+UNSUPPORTED_TAGS = {"pre", "textarea", "script", "style", "text"}
+
+
+class UnsupportedHTML(Exception):
+    pass
+
+
+def escape_text(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def render_attrs(attrs):
+    # Matches BeautifulSoup's "minimal" formatter
+    rendered = []
+    for key, value in sorted(attrs.items()):
+        if value is None:
+            rendered.append(" " + key)
+            continue
+
+        if isinstance(value, (list, tuple)):
+            value = " ".join(value)
+        elif not isinstance(value, str):
+            value = str(value)
+
+        value = escape_text(value)
+
+        if '"' in value:
+            if "'" in value:
+                value = '"' + value.replace('"', "&quot;") + '"'
+            else:
+                value = "'" + value + "'"
+        else:
+            value = '"' + value + '"'
+
+        rendered.append(" " + key + "=" + value)
+
+    return "".join(rendered)
+
+
+class Element:
+    __slots__ = ["name", "attrs", "children", "placeholders", "replaced"]
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.children = []
+
+        # Populated by HTMLParserSegmenter.wrap. Placeholders are keyed by the index of
+        # the child they are inserted before. Replaced is a set of child indexes.
+        self.placeholders = None
+        self.replaced = None
+
+    def has_text(self):
+        for child in self.children:
+            if isinstance(child, str) or child.has_text():
+                return True
+
+        return False
+
+    def render(self, out):
+        out.append("<" + self.name + render_attrs(self.attrs))
+
+        if not self.children and self.name in VOID_ELEMENTS:
+            out.append("/>")
+            return
+
+        out.append(">")
+        for child in self.children:
+            if isinstance(child, str):
+                out.append(escape_text(child))
+            else:
+                child.render(out)
+        out.append("</" + self.name + ">")
+
+
+class TreeBuilder(HTMLParser):
+    """
+    Builds a lightweight tree from the events emitted by Python's HTMLParser.
+
+    This follows the same rules that BeautifulSoup's "html.parser" tree builder
+    follows so the resulting tree has exactly the same shape.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.root = Element("[document]", {})
+        self.stack = [self.root]
+        self.data = []
+
+        # See BeautifulSoupHTMLParser.already_closed_empty_element
+        self.already_closed_empty_element = []
+
+    def end_data(self):
+        if self.data:
+            data = "".join(self.data)
+            self.data = []
+
+            # Whitespace-only strings are collapsed into a single character
+            if not data.strip(ASCII_SPACES):
+                data = "\n" if "\n" in data else " "
+
+            self.stack[-1].children.append(data)
+
+    def pop_to_tag(self, name):
+        # Note: If the tag isn't open, this closes everything
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].name == name:
+                del self.stack[i:]
+                return
+
+        del self.stack[1:]
+
+    def handle_starttag(self, name, attrs, handle_empty_element=True):
+        if name in UNSUPPORTED_TAGS:
+            raise UnsupportedHTML
+
+        attr_dict = {}
+        for key, value in attrs:
+            attr_dict[key] = "" if value is None else value
+
+        # Split "class"-type attributes into lists
+        list_attributes = CDATA_LIST_ATTRIBUTES.get("*", []) + CDATA_LIST_ATTRIBUTES.get(name, [])
+        for key in list_attributes:
+            if key in attr_dict:
+                attr_dict[key] = attr_dict[key].split()
+
+        self.end_data()
+        element = Element(name, attr_dict)
+        self.stack[-1].children.append(element)
+        self.stack.append(element)
+
+        if handle_empty_element and name in VOID_ELEMENTS:
+            self.handle_endtag(name, check_already_closed=False)
+            self.already_closed_empty_element.append(name)
+
+    def handle_startendtag(self, name, attrs):
+        self.handle_starttag(name, attrs, handle_empty_element=False)
+        self.handle_endtag(name)
+
+    def handle_endtag(self, name, check_already_closed=True):
+        if check_already_closed and name in self.already_closed_empty_element:
+            self.already_closed_empty_element.remove(name)
+        else:
+            self.end_data()
+            self.pop_to_tag(name)
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_charref(self, name):
+        # See BeautifulSoupHTMLParser.handle_charref
+        if name.startswith("x") or name.startswith("X"):
+            real_name = int(name[1:], 16)
+        else:
+            real_name = int(name)
+
+        data = None
+        if real_name < 256:
+            try:
+                data = bytearray([real_name]).decode("windows-1252")
+            except UnicodeDecodeError:
+                pass
+
+        if not data:
+            try:
+                data = chr(real_name)
+            except (ValueError, OverflowError):
+                pass
+
+        self.handle_data(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(character if character is not None else "&" + name)
+
+    def handle_comment(self, data):
+        raise UnsupportedHTML
+
+    def handle_decl(self, data):
+        raise UnsupportedHTML
+
+    def unknown_decl(self, data):
+        raise UnsupportedHTML
+
+    def handle_pi(self, data):
+        raise UnsupportedHTML
+
+    def parse(self, html):
+        self.feed(html)
+        self.close()
+        self.end_data()
+        return self.root
+
+
+class Segment:
+    __slots__ = ["element", "indexes"]
+
+    def __init__(self, element, indexes):
+        self.element = element
+        self.indexes = indexes
+
+    def get_nodes(self):
+        children = self.element.children
+        return [children[index] for index in self.indexes]
+
+    def render_string(self):
+        """
+        Renders the HTML of the string, replacing attributes with ids.
+
+        Produces the same output as re-parsing the HTML with StringValue.from_html.
+        """
+        attrs = {}
+        counter = Counter()
+
+        def render(element, out):
+            if element.attrs:
+                counter[element.name] += 1
+                element_id = element.name + str(counter[element.name])
+                # Note: Re-parsing puts the attributes in the order they were rendered
+                attrs[element_id] = dict(sorted(element.attrs.items()))
+                # The id is escaped like any other attribute, in case the tag name is unusual
+                out.append("<" + element.name + render_attrs({"id": element_id}))
+            else:
+                out.append("<" + element.name)
+
+            if not element.children and element.name in VOID_ELEMENTS:
+                out.append("/>")
+                return
+
+            out.append(">")
+            for child in element.children:
+                if isinstance(child, str):
+                    out.append(escape_text(child))
+                else:
+                    render(child, out)
+            out.append("</" + element.name + ">")
+
+        out = []
+        text_run = []
+
+        def end_text_run():
+            # Sibling strings in the segment become a single string when re-parsed
+            if text_run:
+                data = "".join(text_run)
+                text_run.clear()
+
+                if not data.strip(ASCII_SPACES):
+                    data = "\n" if "\n" in data else " "
+
+                out.append(escape_text(data))
+
+        for node in self.get_nodes():
+            if isinstance(node, str):
+                text_run.append(node)
+            else:
+                end_text_run()
+                render(node, out)
+
+        end_text_run()
+
+        html = "".join(out)
+        html, prefix = lstrip_keep(html)
+        html, suffix = rstrip_keep(html)
+        return StringValue(html), attrs
+
+
+class HTMLParserSegmenter(BaseSegmenter):
+    """
+    A faster segmenter that produces exactly the same output as the BeautifulSoupSegmenter.
+
+    The HTML is tokenised once using Python's HTMLParser (which BeautifulSoup also
+    uses) into a lightweight tree. The template and strings are then rendered in
+    a single walk over that tree, without modifying it or re-parsing any strings.
+
+    HTML that contains comments, declarations, or tags that BeautifulSoup has special
+    whitespace/escaping rules for is passed to the BeautifulSoupSegmenter instead.
+    """
+
+    def extract_strings(self, html):
+        try:
+            root = TreeBuilder().parse(html)
+        except UnsupportedHTML:
+            return BeautifulSoupSegmenter(self.options).extract_strings(html)
+
+        # BeautifulSoup allows void elements to gain children if they are closed twice
+        # (eg, <br><br/>). Leave that to BeautifulSoup as well.
+        if any_void_element_has_children(root):
+            return BeautifulSoupSegmenter(self.options).extract_strings(html)
+
+        self.walk(root)
+
+        template = []
+        strings = []
+        self.render_template(root, template, strings)
+        return "".join(template), strings
+
+    def wrap(self, element, indexes):
+        """
+        Marks the given children of the element as a translatable string.
+
+        This follows the same rules as the wrap function in the BeautifulSoupSegmenter.
+        """
+        if not indexes:
+            return
+
+        children = element.children
+
+        # If there is a single element and that is an inline tag, wrap just the contents.
+        if len(indexes) == 1:
+            child = children[indexes[0]]
+            if not isinstance(child, str) and child.name in INLINE_TAGS:
+                self.wrap(child, list(range(len(child.children))))
+                return
+
+        # Ignore elements at either end that don't contain any text (such as <br> tags)
+        first = children[indexes[0]]
+        if not isinstance(first, str) and not first.has_text():
+            self.wrap(element, indexes[1:])
+            return
+
+        last = children[indexes[-1]]
+        if not isinstance(last, str) and not last.has_text():
+            self.wrap(element, indexes[:-1])
+            return
+
+        out = []
+        for index in indexes:
+            child = children[index]
+            if isinstance(child, str):
+                out.append(escape_text(child))
+            else:
+                child.render(out)
+        value = "".join(out)
+
+        if value and not value.isspace():
+            if element.placeholders is None:
+                element.placeholders = {}
+                element.replaced = set()
+
+            element.placeholders[indexes[0]] = (value, Segment(element, indexes))
+            element.replaced.update(indexes)
+
+    def walk(self, element):
+        """
+        Walks the tree in depth first search post-order, wrapping any text.
+
+        Returns two booleans, whether anything was wrapped inside the element, and
+        whether the element is a block element.
+        """
+        has_block = False
+        has_wrap = False
+        buffer = []
+
+        for index, child in enumerate(element.children):
+            if isinstance(child, str):
+                buffer.append(index)
+                continue
+
+            child_has_wrap, is_block = self.walk(child)
+
+            if child_has_wrap:
+                has_wrap = True
+
+            if is_block:
+                has_block = True
+
+                if buffer:
+                    self.wrap(element, buffer)
+                    buffer = []
+                    has_wrap = True
+
+            elif not child_has_wrap:
+                buffer.append(index)
+
+        if buffer and has_block:
+            self.wrap(element, buffer)
+            buffer = []
+            has_wrap = True
+
+        if element.name not in INLINE_TAGS:
+            if buffer:
+                self.wrap(element, buffer)
+                has_wrap = True
+
+            return has_wrap, True
+
+        return has_wrap, False
+
+    def render_template(self, element, out, strings):
+        placeholders = element.placeholders
+        replaced = element.replaced
+
+        for index, child in enumerate(element.children):
+            if placeholders is not None and index in placeholders:
+                value, segment = placeholders[index]
+
+                # Strip leading and trailing whitespace, keeping it in the template
+                value, prefix = lstrip_keep(value)
+                value, suffix = rstrip_keep(value)
+
+                out.append(prefix + '<text position="' + str(len(strings)) + '"></text>' + suffix)
+                strings.append(segment.render_string())
+
+            if replaced is not None and index in replaced:
+                continue
+
+            if isinstance(child, str):
+                out.append(escape_text(child))
+                continue
+
+            out.append("<" + child.name + render_attrs(child.attrs))
+
+            if not child.children and child.name in VOID_ELEMENTS:
+                out.append("/>")
+                continue
+
+            out.append(">")
+            self.render_template(child, out, strings)
+            out.append("</" + child.name + ">")
+
+
+def any_void_element_has_children(element):
+    for child in element.children:
+        if isinstance(child, str):
+            continue
+
+        if child.children and (child.name in VOID_ELEMENTS or any_void_element_has_children(child)):
+            return True
+
+    return False
+
+
+def restore_attrs(html, attrs):
+    """
+    Renders a string that was extracted by a segmenter, putting back the attributes
+    that were replaced with ids.
+
+    Produces the same output as StringValue.render_soup. Raises UnsupportedHTML if
+    the string needs to be rendered with BeautifulSoup instead.
+    """
+    root = TreeBuilder().parse(html)
+
+    if any_void_element_has_children(root):
+        raise UnsupportedHTML
+
+    def walk(element):
+        for child in element.children:
+            if not isinstance(child, str):
+                if 'id' in child.attrs:
+                    child.attrs = attrs[child.attrs['id']]
+
+                walk(child)
+
+    walk(root)
+
+    out = []
+    for child in root.children:
+        if isinstance(child, str):
+            out.append(escape_text(child))
+        else:
+            child.render(out)
+
+    return "".join(out)
@@ -0,0 +1,114 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from wagtail_localize.segmenters import get_segmenter
+from wagtail_localize.segmenters.beautifulsoup import BeautifulSoupSegmenter
+from wagtail_localize.segmenters.cache import SegmentationCache, get_segmentation_cache
+from wagtail_localize.strings import extract_strings
+
+
+HTML = '<p>Hello <a href="https://example.com" class="foo bar">world</a>!</p><p>Second paragraph</p>'
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "wagtail-localize-segmentation-cache-tests",
+    }
+}
+
+
+class TestSegmentationCache(TestCase):
+    def test_extract_strings(self):
+        segmentation_cache = SegmentationCache(maxsize=10)
+
+        with mock.patch.object(BeautifulSoupSegmenter, "extract_strings", wraps=get_segmenter().extract_strings) as segmenter_extract_strings:
+            result = segmentation_cache.extract_strings(HTML)
+            self.assertEqual(segmentation_cache.extract_strings(HTML), result)
+
+        self.assertEqual(result, get_segmenter().extract_strings(HTML))
+        self.assertEqual(segmenter_extract_strings.call_count, 1)
+        self.assertEqual(segmentation_cache.cache_info(), (1, 0, 1, 1, 10))
+
+    def test_attrs_are_copied(self):
+        segmentation_cache = SegmentationCache()
+
+        template, strings = segmentation_cache.extract_strings(HTML)
+        strings[0][1]["a1"]["class"].append("baz")
+        strings[0][1]["a1"]["href"] = "https://changed.example.com"
+
+        template, strings = segmentation_cache.extract_strings(HTML)
+        self.assertEqual(strings[0][1]["a1"], {"class": ["foo", "bar"], "href": "https://example.com"})
+
+    def test_is_bounded(self):
+        segmentation_cache = SegmentationCache(maxsize=2)
+
+        for i in range(3):
+            segmentation_cache.extract_strings(f"<p>Paragraph {i}</p>")
+
+        self.assertEqual(segmentation_cache.cache_info().currsize, 2)
+
+        # The oldest result was evicted
+        segmentation_cache.extract_strings("<p>Paragraph 0</p>")
+        self.assertEqual(segmentation_cache.cache_info().misses, 4)
+
+    def test_segmenter_config_is_part_of_key(self):
+        segmentation_cache = SegmentationCache()
+        segmentation_cache.extract_strings(HTML)
+
+        with override_settings(WAGTAILLOCALIZE_SEGMENTER={'CLASS': 'wagtail_localize.segmenters.htmlparser.HTMLParserSegmenter'}):
+            segmentation_cache.extract_strings(HTML)
+
+        self.assertEqual(segmentation_cache.cache_info().misses, 2)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_django_cache(self):
+        SegmentationCache(cache_alias="default").extract_strings(HTML)
+
+        # A new process would start with an empty memory cache
+        segmentation_cache = SegmentationCache(cache_alias="default")
+
+        with mock.patch.object(BeautifulSoupSegmenter, "extract_strings") as segmenter_extract_strings:
+            result = segmentation_cache.extract_strings(HTML)
+
+        segmenter_extract_strings.assert_not_called()
+        self.assertEqual(result, get_segmenter().extract_strings(HTML))
+        self.assertEqual(segmentation_cache.cache_info(), (0, 1, 0, 1, 1000))
+
+    def test_clear(self):
+        segmentation_cache = SegmentationCache(maxsize=10)
+        segmentation_cache.extract_strings(HTML)
+        segmentation_cache.clear()
+
+        self.assertEqual(segmentation_cache.cache_info(), (0, 0, 0, 0, 10))
+
+    @override_settings(WAGTAILLOCALIZE_SEGMENTATION_CACHE={'MAX_SIZE': 5})
+    def test_get_segmentation_cache(self):
+        segmentation_cache = get_segmentation_cache()
+
+        self.assertEqual(segmentation_cache.maxsize, 5)
+        self.assertIs(get_segmentation_cache(), segmentation_cache)
+
+    @override_settings(WAGTAILLOCALIZE_SEGMENTATION_CACHE=True)
+    def test_get_segmentation_cache_enabled(self):
+        segmentation_cache = get_segmentation_cache()
+
+        self.assertEqual(segmentation_cache.maxsize, 1000)
+        self.assertIsNone(segmentation_cache.cache_alias)
+        self.assertEqual(extract_strings(HTML), get_segmenter().extract_strings(HTML))
+
+    @override_settings(WAGTAILLOCALIZE_SEGMENTATION_CACHE=False)
+    def test_get_segmentation_cache_disabled(self):
+        self.assertIsNone(get_segmentation_cache())
+
+        with mock.patch.object(BeautifulSoupSegmenter, "extract_strings", wraps=get_segmenter().extract_strings) as segmenter_extract_strings:
+            extract_strings(HTML)
+            extract_strings(HTML)
+
+        self.assertEqual(segmenter_extract_strings.call_count, 2)
+
+    def test_get_segmentation_cache_disabled_by_max_size(self):
+        for config in [None, {'MAX_SIZE': None}, {'MAX_SIZE': 0}]:
+            with self.subTest(config=config), override_settings(WAGTAILLOCALIZE_SEGMENTATION_CACHE=config):
+                self.assertIsNone(get_segmentation_cache())
+                self.assertEqual(extract_strings(HTML), get_segmenter().extract_strings(HTML))
@@ -0,0 +1,107 @@
+from django.test import TestCase, override_settings
+
+from wagtail_localize.segmenters import get_segmenter
+from wagtail_localize.segmenters.beautifulsoup import BeautifulSoupSegmenter
+from wagtail_localize.segmenters.htmlparser import Element, HTMLParserSegmenter, Segment
+from wagtail_localize.strings import StringValue
+
+
+TEST_HTML = [
+    '<h1>This is a heading</h1><p>This is a paragraph. &lt;foo&gt; <b>Bold text</b></p><ul><li><a href="http://example.com">This is a link</a>.</li></ul>',
+    '<p><b>Bread</b>\xa0is a\xa0<a href="https://en.wikipedia.org/wiki/Staple_food">staple food</a>\xa0prepared from a\xa0<a href="https://en.wikipedia.org/wiki/Dough">dough</a></p>',
+    """
+    <h1>Foo bar baz</h1>
+    <p>This is a paragraph. <b>This is some bold <i>and now italic</i></b> text</p>
+    <p>&lt;script&gt; this should be interpreted as text.</p>
+    <ul>
+        <li>List item one</li>
+        <li><b>List item two</li>
+    </ul>
+    <img src="foo" alt="This bit isn't translatable">
+    """,
+    "<p><i>Foo <p>Bar</p></i></p>",
+    "<p><b>Foo <i>Bar<br/>Baz</i></b></p>",
+    "<p><i><br/>Foo</i></p>",
+    "<p><i>Foo</i><br/></p>",
+    "<p><i></i>Foo</p>",
+    # Whitespace, entities and character references
+    "<p>  Foo  <b>Bar</b>\n\n<i>Baz</i>  </p>",
+    "<p>&nbsp;Fish &amp; chips &foo &#147;quoted&#148; &#x41;</p>",
+    # Attributes that need quoting and multi-valued attributes
+    '<p><a href="/?a=1&amp;b=2" title=\'Say "hello"\' class=" foo  bar ">Link</a> <span data-x="It\'s &quot;quoted&quot;" hidden>Span</span></p>',
+    # Non-contiguous text around an inline tag that contains a block
+    "<p><b>Foo</b> <i><div>Bar</div></i> <b>Baz</b><div>Qux</div></p>",
+    # Unclosed and mismatched tags
+    "<p><b>Foo</i>Bar</b></p><div>Baz",
+    "Text at the top level <b>with some bold</b>",
+    "",
+]
+
+UNSUPPORTED_HTML = [
+    "<p>Foo <!-- A comment --> bar</p>",
+    "<pre>  Foo   <b>bar</b>  </pre>",
+    "<p>Foo</p><script>var a = 1 < 2;</script>",
+    "<p>Foo<br><br/>Bar</p>",
+]
+
+
+class TestHTMLParserSegmenter(TestCase):
+    maxDiff = None
+
+    def assertSameAsBeautifulSoup(self, html):
+        expected_template, expected_strings = BeautifulSoupSegmenter({}).extract_strings(html)
+        template, strings = HTMLParserSegmenter({}).extract_strings(html)
+
+        self.assertEqual(template, expected_template)
+        self.assertEqual(
+            [(string.data, attrs) for string, attrs in strings],
+            [(string.data, attrs) for string, attrs in expected_strings],
+        )
+
+        # Attributes must be in the same order so they serialise to the same JSON
+        self.assertEqual(
+            [list(attrs.items()) for string, attrs in strings],
+            [list(attrs.items()) for string, attrs in expected_strings],
+        )
+
+    def test_same_output_as_beautifulsoup(self):
+        for html in TEST_HTML:
+            with self.subTest(html=html):
+                self.assertSameAsBeautifulSoup(html)
+
+    def test_unsupported_html_falls_back_to_beautifulsoup(self):
+        for html in UNSUPPORTED_HTML:
+            with self.subTest(html=html):
+                self.assertSameAsBeautifulSoup(html)
+
+    def test_render_string_escapes_ids(self):
+        # HTMLParser allows quotes, "<" and "&" in tag names, and these end up in the ids
+        for name in ['b"x', "b'x", 'b"\'x', "b<x", "b&x"]:
+            with self.subTest(name=name):
+                element = Element(name, {"class": ["foo"]})
+                element.children.append("Bar")
+                paragraph = Element("p", {})
+                paragraph.children.extend(["Foo ", element])
+
+                html = []
+                element.render(html)
+
+                self.assertEqual(
+                    Segment(paragraph, [0, 1]).render_string(),
+                    StringValue.from_html("Foo " + "".join(html)),
+                )
+
+
+class TestGetSegmenter(TestCase):
+    def test_default(self):
+        self.assertIsInstance(get_segmenter(), BeautifulSoupSegmenter)
+
+    @override_settings(WAGTAILLOCALIZE_SEGMENTER={
+        'CLASS': 'wagtail_localize.segmenters.htmlparser.HTMLParserSegmenter',
+        'OPTIONS': {'foo': 'bar'},
+    })
+    def test_from_settings(self):
+        segmenter = get_segmenter()
+
+        self.assertIsInstance(segmenter, HTMLParserSegmenter)
+        self.assertEqual(segmenter.options, {'foo': 'bar'})
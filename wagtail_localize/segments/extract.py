@@ -1,3 +1,8 @@
+import json
+from collections import defaultdict
+from functools import lru_cache
+
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
 
 from modelcluster.fields import ParentalKey
@@ -11,55 +16,55 @@ from wagtail_localize.segments import (
     TemplateSegmentValue,
     RelatedObjectSegmentValue,
 )
+from wagtail_localize.segments.types import BaseValue
 
+from ..fields import BaseTranslatableField
+from .registry import BlockHandlerRegistry
 from ..strings import extract_strings
 
 
+# Functions that extract segments from each type of StreamField block. These are called with the
+# StreamFieldSegmentExtractor, the block and the block's value and return a list of segments.
+# Blocks that implement get_translatable_segments() don't need to be registered.
+block_extractors = BlockHandlerRegistry(
+    method_name="get_translatable_segments",
+    method_handler=lambda extractor, block_type, block_value: block_type.get_translatable_segments(block_value),
+)
+
+register_block_extractor = block_extractors.register
+
+
 class StreamFieldSegmentExtractor:
     def __init__(self, field):
         self.field = field
 
     def handle_block(self, block_type, block_value):
-        if hasattr(block_type, "get_translatable_segments"):
-            return block_type.get_translatable_segments(block_value)
-
-        elif isinstance(block_type, (blocks.CharBlock, blocks.TextBlock)):
-            return [StringSegmentValue("", block_value)]
-
-        elif isinstance(block_type, blocks.RichTextBlock):
-            template, strings = extract_strings(block_value.source)
-
-            return [TemplateSegmentValue("", "html", template, len(strings))] + [
-                StringSegmentValue("", string, attrs=attrs) for string, attrs in strings
-            ]
-
-        elif isinstance(block_type, blocks.ChooserBlock):
-            return self.handle_related_object_block(block_value)
-
-        elif isinstance(block_type, blocks.StructBlock):
-            return self.handle_struct_block(block_value)
-
-        elif isinstance(block_type, blocks.ListBlock):
-            return self.handle_list_block(block_value)
-
-        elif isinstance(block_type, blocks.StreamBlock):
-            return self.handle_stream_block(block_value)
-
-        elif isinstance(block_type, (blocks.ChoiceBlock, EmbedBlock)):
-            return []
+        handler = block_extractors.get_handler(block_type.__class__)
 
-        else:
+        if handler is None:
             raise Exception(
                 "Unrecognised StreamField block type '{}'. Have you implemented get_translatable_segments on this class?".format(
                     block_type.__class__.__name__
                 )
             )
 
+        return handler(self, block_type, block_value)
+
+    def handle_text_block(self, block_value):
+        return [StringSegmentValue("", block_value)]
+
+    def handle_rich_text_block(self, block_value):
+        template, strings = extract_strings(block_value.source)
+
+        return [TemplateSegmentValue("", "html", template, len(strings))] + [
+            StringSegmentValue("", string, attrs=attrs) for string, attrs in strings
+        ]
+
     def handle_related_object_block(self, related_object):
         if related_object is None or not isinstance(related_object, TranslatableMixin):
             return []
 
-        return RelatedObjectSegmentValue.from_instance("", related_object)
+        return [RelatedObjectSegmentValue.from_instance("", related_object)]
 
     def handle_struct_block(self, struct_block):
         segments = []
@@ -77,10 +82,14 @@ class StreamFieldSegmentExtractor:
         # TODO
         return []
 
-    def handle_stream_block(self, stream_block):
+    def handle_stream_block(self, stream_block, unchanged_block_ids=frozenset()):
         segments = []
 
         for block in stream_block:
+            if block.id in unchanged_block_ids:
+                segments.append(UnchangedSegments(block.id))
+                continue
+
             segments.extend(
                 segment.wrap(block.id)
                 for segment in self.handle_block(block.block, block.value)
@@ -89,81 +98,317 @@ class StreamFieldSegmentExtractor:
         return segments
 
 
-def extract_segments(instance):
+register_block_extractor(blocks.CharBlock, lambda extractor, block_type, block_value: extractor.handle_text_block(block_value))
+register_block_extractor(blocks.TextBlock, lambda extractor, block_type, block_value: extractor.handle_text_block(block_value))
+register_block_extractor(blocks.RichTextBlock, lambda extractor, block_type, block_value: extractor.handle_rich_text_block(block_value))
+register_block_extractor(blocks.ChooserBlock, lambda extractor, block_type, block_value: extractor.handle_related_object_block(block_value))
+register_block_extractor(blocks.StructBlock, lambda extractor, block_type, block_value: extractor.handle_struct_block(block_value))
+register_block_extractor(blocks.ListBlock, lambda extractor, block_type, block_value: extractor.handle_list_block(block_value))
+register_block_extractor(blocks.StreamBlock, lambda extractor, block_type, block_value: extractor.handle_stream_block(block_value))
+register_block_extractor(blocks.ChoiceBlock, lambda extractor, block_type, block_value: [])
+register_block_extractor(EmbedBlock, lambda extractor, block_type, block_value: [])
+
+
+def extract_segments_from_custom_field(field, instance):
+    return [
+        segment.wrap(field.name)
+        for segment in field.get_translatable_segments(
+            field.value_from_object(instance)
+        )
+    ]
+
+
+def extract_segments_from_streamfield(field, instance, unchanged_paths=frozenset()):
+    return [
+        segment.wrap(field.name)
+        for segment in StreamFieldSegmentExtractor(field).handle_stream_block(
+            field.value_from_object(instance),
+            unchanged_block_ids={path[0] for path in unchanged_paths if len(path) == 1},
+        )
+    ]
+
+
+def extract_segments_from_richtextfield(field, instance):
+    template, strings = extract_strings(field.value_from_object(instance))
+
+    field_segments = [TemplateSegmentValue("", "html", template, len(strings))] + [
+        StringSegmentValue("", string, attrs=attrs) for string, attrs in strings
+    ]
+
+    return [segment.wrap(field.name) for segment in field_segments]
+
+
+def extract_segments_from_text_field(field, instance):
+    return [StringSegmentValue(field.name, field.value_from_object(instance))]
+
+
+class UnchangedSegments(BaseValue):
+    """
+    Stands in for all of the segments at, or beneath, its path when that part of the
+    content hasn't changed since the previous source was extracted.
+
+    These are returned by extract_segments() when it's given unchanged paths. They must
+    be replaced with copies of the previous source's segments at that path.
+    """
+
+    __slots__ = ()
+
+    def clone(self):
+        return UnchangedSegments(self.path_components, order=self.order)
+
+    def is_empty(self):
+        return False
+
+    def __eq__(self, other):
+        return isinstance(other, UnchangedSegments) and self.path_components == other.path_components
+
+    def __repr__(self):
+        return "<UnchangedSegments {}>".format(self.path)
+
+
+def get_sub_paths(paths, component):
+    """
+    Returns the paths beneath the given first path component, with that component removed.
+    """
+    return frozenset(path[1:] for path in paths if path[0] == component)
+
+
+class PendingTranslationKey:
+    """
+    Stands in for the translation_key of an object referenced by a ForeignKey that
+    hasn't been loaded yet.
+
+    These are replaced with the real translation keys by resolve_translation_keys(),
+    which looks them up with one query per model.
+    """
+
+    __slots__ = ("model", "pk")
+
+    def __init__(self, model, pk):
+        self.model = model
+        self.pk = pk
+
+
+def extract_segments_from_foreign_key(field, instance):
+    related_id = getattr(instance, field.attname)
+
+    if related_id is None:
+        return []
+
+    # Use the related instance if it's already been loaded, otherwise only its
+    # translation key is needed so avoid fetching the whole object
+    if field.is_cached(instance):
+        return [RelatedObjectSegmentValue.from_instance(field.name, getattr(instance, field.name))]
+
+    model = field.related_model.get_translation_model()
+    return [
+        RelatedObjectSegmentValue(
+            field.name,
+            ContentType.objects.get_for_model(model),
+            PendingTranslationKey(field.related_model, related_id),
+        )
+    ]
+
+
+def extract_segments_from_child_relation(field, instance, unchanged_paths=frozenset()):
+    manager = getattr(instance, field.name)
+    segments = []
+
+    for child_instance in manager.all():
+        translation_key = str(child_instance.translation_key)
+        child_unchanged_paths = get_sub_paths(unchanged_paths, translation_key)
+
+        if () in child_unchanged_paths:
+            segments.append(UnchangedSegments(translation_key))
+        else:
+            segments.extend(
+                segment.wrap(translation_key)
+                for segment in collect_segments(child_instance, child_unchanged_paths)
+            )
+
+    return [segment.wrap(field.name) for segment in segments]
+
+
+def get_field_extractor(field):
+    """
+    Returns the function that extracts segments from the given model field, or None
+    if the field doesn't contain anything translatable.
+    """
+    if hasattr(field, "get_translatable_segments"):
+        return extract_segments_from_custom_field
+
+    elif isinstance(field, StreamField):
+        return extract_segments_from_streamfield
+
+    elif isinstance(field, RichTextField):
+        return extract_segments_from_richtextfield
+
+    elif isinstance(field, (models.TextField, models.CharField)):
+        if not field.choices:
+            return extract_segments_from_text_field
+
+    elif isinstance(field, (models.ForeignKey)) and issubclass(
+        field.related_model, TranslatableMixin
+    ):
+        return extract_segments_from_foreign_key
+
+    elif (
+        isinstance(field, (models.ManyToOneRel))
+        and isinstance(field.remote_field, ParentalKey)
+        and issubclass(field.related_model, TranslatableMixin)
+    ):
+        return extract_segments_from_child_relation
+
+
+@lru_cache(maxsize=None)
+def get_extraction_plan(model):
+    """
+    Returns a list of (translatable_field, field, extractor) tuples describing how
+    to extract segments from instances of the given model.
+
+    This is cached per model so that the fields and the function that handles each
+    one are only looked up once.
+    """
+    plan = []
+
+    for translatable_field in getattr(model, 'translatable_fields', []):
+        # Skip fields that are never translated, like SynchronizedField
+        if type(translatable_field).is_translated is BaseTranslatableField.is_translated:
+            continue
+
+        field = translatable_field.get_field(model)
+        extractor = get_field_extractor(field)
+
+        if extractor is not None:
+            plan.append((translatable_field, field, extractor))
+
+    return plan
+
+
+def collect_segments(instance, unchanged_paths=frozenset()):
+    """
+    Extracts the segments from the given instance without resolving the translation
+    keys of related objects or numbering them. Use extract_segments() instead.
+    """
     segments = []
 
-    for translatable_field in getattr(instance, 'translatable_fields', []):
+    for translatable_field, field, extractor in get_extraction_plan(instance.__class__):
         if not translatable_field.is_translated(instance):
             continue
 
-        field = translatable_field.get_field(instance.__class__)
+        field_unchanged_paths = get_sub_paths(unchanged_paths, field.name)
 
-        if hasattr(field, "get_translatable_segments"):
-            segments.extend(
-                segment.wrap(field.name)
-                for segment in field.get_translatable_segments(
-                    field.value_from_object(instance)
-                )
-            )
+        if () in field_unchanged_paths:
+            segments.append(UnchangedSegments(field.name))
+        elif field_unchanged_paths:
+            segments.extend(extractor(field, instance, unchanged_paths=field_unchanged_paths))
+        else:
+            segments.extend(extractor(field, instance))
+
+    return segments
 
-        elif isinstance(field, StreamField):
-            segments.extend(
-                segment.wrap(field.name)
-                for segment in StreamFieldSegmentExtractor(field).handle_stream_block(
-                    field.value_from_object(instance)
-                )
-            )
 
-        elif isinstance(field, RichTextField):
-            template, strings = extract_strings(field.value_from_object(instance))
+def get_unchanged_paths(model, old_data, new_data):
+    """
+    Compares two versions of the serialized content of an instance of the given model
+    and returns the paths of the segments that would be extracted unchanged from both.
 
-            field_segments = [TemplateSegmentValue("", "html", template, len(strings))] + [
-                StringSegmentValue("", string, attrs=attrs) for string, attrs in strings
-            ]
+    This compares each translatable field, the blocks of StreamFields by id and child
+    objects by translation key. For example, a path of ('body', '<block id>') means that
+    the segments of that block don't need to be extracted again.
+    """
+    paths = set()
 
-            segments.extend(segment.wrap(field.name) for segment in field_segments)
+    for translatable_field, field, extractor in get_extraction_plan(model):
+        if field.name not in old_data or field.name not in new_data:
+            continue
 
-        elif isinstance(field, (models.TextField, models.CharField)):
-            if not field.choices:
-                segments.append(
-                    StringSegmentValue(field.name, field.value_from_object(instance))
+        old_value = old_data[field.name]
+        new_value = new_data[field.name]
+
+        if old_value == new_value:
+            paths.add((field.name,))
+
+        elif extractor is extract_segments_from_streamfield:
+            old_blocks = {
+                block["id"]: block
+                for block in (json.loads(old_value) if isinstance(old_value, str) else old_value or [])
+                if block.get("id")
+            }
+
+            for block in (json.loads(new_value) if isinstance(new_value, str) else new_value or []):
+                if block.get("id") and old_blocks.get(block["id"]) == block:
+                    paths.add((field.name, block["id"]))
+
+        elif extractor is extract_segments_from_child_relation:
+            old_children = {
+                child["translation_key"]: child
+                for child in old_value or []
+                if child.get("translation_key")
+            }
+
+            for child in new_value or []:
+                old_child = old_children.get(child.get("translation_key"))
+                if old_child is None:
+                    continue
+
+                if old_child == child:
+                    paths.add((field.name, str(child["translation_key"])))
+                    continue
+
+                paths.update(
+                    (field.name, str(child["translation_key"])) + path
+                    for path in get_unchanged_paths(field.related_model, old_child, child)
                 )
 
-        elif isinstance(field, (models.ForeignKey)) and issubclass(
-            field.related_model, TranslatableMixin
-        ):
-            related_instance = getattr(instance, field.name)
+    return paths
 
-            if related_instance:
-                segments.append(
-                    RelatedObjectSegmentValue.from_instance(field.name, related_instance)
-                )
 
-        elif (
-            isinstance(field, (models.ManyToOneRel))
-            and isinstance(field.remote_field, ParentalKey)
-            and issubclass(field.related_model, TranslatableMixin)
-        ):
-            manager = getattr(instance, field.name)
-
-            for child_instance in manager.all():
-                segments.extend(
-                    segment.wrap(str(child_instance.translation_key)).wrap(field.name)
-                    for segment in extract_segments(child_instance)
-                )
+def resolve_translation_keys(segments):
+    """
+    Replaces any PendingTranslationKey on the given RelatedObjectSegmentValues with
+    the actual translation key of the object, doing one query per related model.
 
-    class Counter:
-        def __init__(self):
-            self.value = 0
+    Segments that reference objects that no longer exist are made empty.
+    """
+    from ..models import filter_in_batches
 
-        def next(self):
-            self.value += 1
-            return self.value
+    pending_by_model = defaultdict(list)
+    for segment in segments:
+        if isinstance(segment, RelatedObjectSegmentValue) and isinstance(segment.translation_key, PendingTranslationKey):
+            pending_by_model[segment.translation_key.model].append(segment)
 
-    counter = Counter()
+    for model, model_segments in pending_by_model.items():
+        translation_keys = dict(
+            filter_in_batches(
+                model._base_manager.values_list("pk", "translation_key"),
+                "pk",
+                {segment.translation_key.pk for segment in model_segments},
+            )
+        )
 
-    return [
-        segment.with_order(counter.next())
-        for segment in segments
-        if not segment.is_empty()
-    ]
+        for segment in model_segments:
+            segment.translation_key = translation_keys.get(segment.translation_key.pk)
+
+            if segment.translation_key is None:
+                segment.content_type = None
+
+
+def extract_segments(instance, unchanged_paths=frozenset()):
+    """
+    Extracts the segments from the given instance.
+
+    The segments at any of the given unchanged paths (see get_unchanged_paths()) aren't
+    extracted. An UnchangedSegments value is returned in their place instead.
+    """
+    segments = collect_segments(instance, {tuple(path) for path in unchanged_paths})
+    resolve_translation_keys(segments)
+
+    segments = [segment for segment in segments if not segment.is_empty()]
+
+    # All of these segments were created by this extraction, so they can be numbered
+    # without needing to be cloned by .with_order()
+    for order, segment in enumerate(segments, 1):
+        segment.order = order
+
+    return segments
@@ -1,5 +1,3 @@
-from collections import defaultdict
-
 from django.db import models
 
 from wagtail.core import blocks
@@ -8,6 +6,76 @@ from wagtail.core.rich_text import RichText
 
 from wagtail_localize.strings import restore_strings
 
+from .registry import BlockHandlerRegistry
+
+
+class SegmentPathTrie:
+    """
+    Groups segments by the components of their paths.
+
+    This allows segments to be routed to the fields/blocks that they belong to
+    without unwrapping them at every level. The segments aren't copied unless
+    get_segments() is called.
+    """
+
+    __slots__ = ("depth", "segments", "children")
+
+    def __init__(self, depth=0):
+        self.depth = depth
+
+        # (path components, segment) pairs of all segments at or under this node, in their original order
+        self.segments = []
+
+        # Child nodes keyed by path component, in order of first appearance
+        self.children = {}
+
+    @classmethod
+    def from_segments(cls, segments):
+        root = cls()
+
+        for segment in segments:
+            root.add(segment.path_components, segment)
+
+        return root
+
+    def add(self, components, segment):
+        node = self
+
+        while True:
+            node.segments.append((components, segment))
+
+            if len(components) == node.depth:
+                break
+
+            component = components[node.depth]
+            child = node.children.get(component)
+            if child is None:
+                child = node.children[component] = SegmentPathTrie(node.depth + 1)
+
+            node = child
+
+    def values(self):
+        """
+        Returns the segments at or under this node. Note that their paths haven't
+        been changed so are still relative to the root.
+        """
+        return [segment for components, segment in self.segments]
+
+    def get_segments(self):
+        """
+        Returns copies of the segments at or under this node with paths relative
+        to this node. These are the same as the segments would be if they had been
+        unwrapped down to this level.
+        """
+        segments = []
+
+        for components, segment in self.segments:
+            segment = segment.clone()
+            segment.path_components = components[self.depth:]
+            segments.append(segment)
+
+        return segments
+
 
 def organise_template_segments(segments):
     # The first segment is always the template, followed by the texts in order of their position
@@ -20,129 +88,129 @@ def organise_template_segments(segments):
     )
 
 
-def handle_related_object(related_object, src_locale, tgt_locale, segments):
+def handle_related_object(src_locale, tgt_locale, segments):
     # FIXME: Check that segments is a single item list
     related_object_value = segments[0]
     return related_object_value.get_instance(tgt_locale)
 
 
+# Functions that write translated segments into each type of StreamField block. These are called
+# with the StreamFieldSegmentsWriter, the block, the block's value and a SegmentPathTrie node
+# containing the segments for that block, and return the translated value. Blocks that implement
+# restore_translated_segments() don't need to be registered.
+block_writers = BlockHandlerRegistry(
+    method_name="restore_translated_segments",
+    method_handler=lambda writer, block_type, block_value, node: block_type.restore_translated_segments(block_value, node.get_segments()),
+)
+
+register_block_writer = block_writers.register
+
+
 class StreamFieldSegmentsWriter:
     def __init__(self, field, src_locale, tgt_locale):
         self.field = field
         self.src_locale = src_locale
         self.tgt_locale = tgt_locale
 
-    def handle_block(self, block_type, block_value, segments):
-        if hasattr(block_type, "restore_translated_segments"):
-            return block_type.restore_translated_segments(block_value, segments)
-
-        elif isinstance(block_type, (blocks.CharBlock, blocks.TextBlock)):
-            return segments[0].render_text()
-
-        elif isinstance(block_type, blocks.RichTextBlock):
-            format, template, strings = organise_template_segments(segments)
-            assert format == "html"
-            return RichText(restore_strings(template, strings))
+    def handle_block(self, block_type, block_value, node):
+        handler = block_writers.get_handler(block_type.__class__)
 
-        elif isinstance(block_type, blocks.ChooserBlock):
-            return self.handle_related_object_block(block_value, segments)
-
-        elif isinstance(block_type, blocks.StructBlock):
-            return self.handle_struct_block(block_value, segments)
-
-        elif isinstance(block_type, blocks.ListBlock):
-            return self.handle_list_block(block_value, segments)
-
-        elif isinstance(block_type, blocks.StreamBlock):
-            return self.handle_stream_block(block_value, segments)
-
-        else:
+        if handler is None:
             raise Exception(
                 "Unrecognised StreamField block type '{}'. Have you implemented restore_translated_segments() on this class?".format(
                     block_type.__class__.__name__
                 )
             )
 
-    def handle_related_object_block(self, related_object, segments):
-        return handle_related_object(
-            related_object, self.src_locale, self.tgt_locale, segments
-        )
+        return handler(self, block_type, block_value, node)
 
-    def handle_struct_block(self, struct_block, segments):
-        segments_by_field = defaultdict(list)
+    def handle_text_block(self, block_value, node):
+        return node.values()[0].render_text()
 
-        for segment in segments:
-            field_name, segment = segment.unwrap()
-            segments_by_field[field_name].append(segment)
-
-        for field_name, segments in segments_by_field.items():
-            if segments:
-                block_type = struct_block.block.child_blocks[field_name]
-                block_value = struct_block[field_name]
-                struct_block[field_name] = self.handle_block(
-                    block_type, block_value, segments
-                )
+    def handle_rich_text_block(self, block_value, node):
+        format, template, strings = organise_template_segments(node.values())
+        assert format == "html"
+        return RichText(restore_strings(template, strings))
+
+    def handle_related_object_block(self, related_object, node):
+        return handle_related_object(self.src_locale, self.tgt_locale, node.values())
+
+    def handle_struct_block(self, struct_block, node):
+        # Write into a copy so the original value can be reused for other locales
+        struct_block = blocks.StructValue(struct_block.block, list(struct_block.items()))
+
+        for field_name, field_node in node.children.items():
+            block_type = struct_block.block.child_blocks[field_name]
+            block_value = struct_block[field_name]
+            struct_block[field_name] = self.handle_block(
+                block_type, block_value, field_node
+            )
 
         return struct_block
 
-    def handle_list_block(self, list_block, segments):
+    def handle_list_block(self, list_block, node):
         # TODO
         pass
 
-    def get_stream_block_child_data(self, stream_block, block_uuid):
+    def handle_stream_block(self, stream_block, node):
+        # Build a new StreamValue so the original value can be reused for other locales
+        # Each child is matched to its segments by looking up its ID in the children of the
+        # node, rather than searching the stream for each block ID, so this is linear in the
+        # number of blocks. Nested streams are indexed the same way when they're recursed into
+        stream_data = []
         for stream_child in stream_block:
-            if stream_child.id == block_uuid:
-                return stream_child
+            value = stream_child.value
 
-    def handle_stream_block(self, stream_block, segments):
-        segments_by_block = defaultdict(list)
+            block_node = node.children.get(stream_child.id)
+            if block_node is not None:
+                value = self.handle_block(stream_child.block, value, block_node)
 
-        for segment in segments:
-            block_uuid, segment = segment.unwrap()
-            segments_by_block[block_uuid].append(segment)
+            stream_data.append((stream_child.block_type, value, stream_child.id))
+
+        return blocks.StreamValue(stream_block.stream_block, stream_data)
 
-        for block_uuid, segments in segments_by_block.items():
-            block = self.get_stream_block_child_data(stream_block, block_uuid)
-            block.value = self.handle_block(block.block, block.value, segments)
 
-        return stream_block
+register_block_writer(blocks.CharBlock, lambda writer, block_type, block_value, node: writer.handle_text_block(block_value, node))
+register_block_writer(blocks.TextBlock, lambda writer, block_type, block_value, node: writer.handle_text_block(block_value, node))
+register_block_writer(blocks.RichTextBlock, lambda writer, block_type, block_value, node: writer.handle_rich_text_block(block_value, node))
+register_block_writer(blocks.ChooserBlock, lambda writer, block_type, block_value, node: writer.handle_related_object_block(block_value, node))
+register_block_writer(blocks.StructBlock, lambda writer, block_type, block_value, node: writer.handle_struct_block(block_value, node))
+register_block_writer(blocks.ListBlock, lambda writer, block_type, block_value, node: writer.handle_list_block(block_value, node))
+register_block_writer(blocks.StreamBlock, lambda writer, block_type, block_value, node: writer.handle_stream_block(block_value, node))
 
 
 def ingest_segments(original_obj, translated_obj, src_locale, tgt_locale, segments):
-    # Get segments by field name
-    segments_by_field_name = defaultdict(list)
-    for segment in segments:
-        field_name, segment = segment.unwrap()
-        segments_by_field_name[field_name].append(segment)
+    ingest_segment_trie(original_obj, translated_obj, src_locale, tgt_locale, SegmentPathTrie.from_segments(segments))
+
 
-    for field_name, field_segments in segments_by_field_name.items():
+def ingest_segment_trie(original_obj, translated_obj, src_locale, tgt_locale, node):
+    for field_name, field_node in node.children.items():
         field = translated_obj.__class__._meta.get_field(field_name)
 
         if hasattr(field, "restore_translated_segments"):
             value = field.value_from_object(original_obj)
-            new_value = field.restore_translated_segments(value, field_segments)
+            new_value = field.restore_translated_segments(value, field_node.get_segments())
             setattr(translated_obj, field_name, new_value)
 
         elif isinstance(field, StreamField):
             data = field.value_from_object(original_obj)
-            StreamFieldSegmentsWriter(
+            data = StreamFieldSegmentsWriter(
                 field, src_locale, tgt_locale
-            ).handle_stream_block(data, field_segments)
+            ).handle_stream_block(data, field_node)
             setattr(translated_obj, field_name, data)
 
         elif isinstance(field, RichTextField):
-            format, template, strings = organise_template_segments(field_segments)
+            format, template, strings = organise_template_segments(field_node.values())
             assert format == "html"
             html = restore_strings(template, strings)
             setattr(translated_obj, field_name, html)
 
         elif isinstance(field, (models.TextField, models.CharField)):
-            setattr(translated_obj, field_name, field_segments[0].render_text())
+            setattr(translated_obj, field_name, field_node.values()[0].render_text())
 
         elif isinstance(field, models.ForeignKey):
-            related_original = getattr(original_obj, field_name)
             related_translated = handle_related_object(
-                related_original, src_locale, tgt_locale, field_segments
+                src_locale, tgt_locale, field_node.values()
             )
             setattr(translated_obj, field_name, related_translated)
 
@@ -150,13 +218,7 @@ def ingest_segments(original_obj, translated_obj, src_locale, tgt_locale, segmen
             original_manager = getattr(original_obj, field_name)
             translated_manager = getattr(translated_obj, field_name)
 
-            segments_by_child = defaultdict(list)
-
-            for segment in field_segments:
-                child_translation_key, segment = segment.unwrap()
-                segments_by_child[child_translation_key].append(segment)
-
-            for child_translation_key, child_segments in segments_by_child.items():
+            for child_translation_key, child_node in field_node.children.items():
                 original_child_object = original_manager.filter(
                     translation_key=child_translation_key
                 ).first()
@@ -170,11 +232,11 @@ def ingest_segments(original_obj, translated_obj, src_locale, tgt_locale, segmen
                     # adding new inline objects manually.
                     continue
 
-                ingest_segments(
+                ingest_segment_trie(
                     original_child_object,
                     translated_child_object,
                     src_locale,
                     tgt_locale,
-                    child_segments,
+                    child_node,
                 )
                 translated_child_object.save()
@@ -0,0 +1,63 @@
+class BlockHandlerRegistry:
+    """
+    Maps StreamField block classes to the functions that handle them.
+
+    Handlers are found by walking the MRO of the block class, so a handler that
+    is registered for a block class is also used for its subclasses unless they
+    have a handler of their own. The result of each lookup is cached per block
+    class.
+
+    Block classes that define a method called method_name always use
+    method_handler instead. This allows blocks to handle themselves (for example,
+    by implementing get_translatable_segments) without being registered.
+    """
+
+    def __init__(self, method_name=None, method_handler=None):
+        self.method_name = method_name
+        self.method_handler = method_handler
+        self.handlers = {}
+        self.cache = {}
+
+    def register(self, block_class, handler=None):
+        """
+        Registers a handler for the given block class and its subclasses.
+
+        Can be used as a decorator:
+
+        >>> @block_extractors.register(MyBlock)
+        ... def extract_my_block(extractor, block_type, block_value):
+        ...     return [StringSegmentValue("", block_value.text)]
+        """
+        if handler is None:
+            def decorator(handler):
+                self.register(block_class, handler)
+                return handler
+
+            return decorator
+
+        self.handlers[block_class] = handler
+        self.cache.clear()
+
+        return handler
+
+    def get_handler(self, block_class):
+        """
+        Returns the handler for the given block class, or None if there isn't one.
+        """
+        try:
+            return self.cache[block_class]
+        except KeyError:
+            pass
+
+        handler = None
+
+        if self.method_name is not None and hasattr(block_class, self.method_name):
+            handler = self.method_handler
+        else:
+            for cls in block_class.__mro__:
+                if cls in self.handlers:
+                    handler = self.handlers[cls]
+                    break
+
+        self.cache[block_class] = handler
+        return handler
@@ -0,0 +1,84 @@
+from django.test import TestCase
+from wagtail.core import blocks
+
+from wagtail_localize.segments import StringSegmentValue
+from wagtail_localize.segments.extract import StreamFieldSegmentExtractor, block_extractors
+from wagtail_localize.segments.ingest import SegmentPathTrie, StreamFieldSegmentsWriter, block_writers
+from wagtail_localize.segments.registry import BlockHandlerRegistry
+from wagtail_localize.test.models import TestPage
+
+
+class TestBlockHandlerRegistry(TestCase):
+    def test_get_handler(self):
+        registry = BlockHandlerRegistry()
+        handler = registry.register(blocks.CharBlock, lambda: "char")
+
+        self.assertIs(registry.get_handler(blocks.CharBlock), handler)
+        self.assertIsNone(registry.get_handler(blocks.TextBlock))
+
+    def test_subclasses_use_handler_of_nearest_base_class(self):
+        registry = BlockHandlerRegistry()
+        text_handler = registry.register(blocks.TextBlock, lambda: "text")
+        field_handler = registry.register(blocks.FieldBlock, lambda: "field")
+
+        self.assertIs(registry.get_handler(blocks.BlockQuoteBlock), text_handler)
+        self.assertIs(registry.get_handler(blocks.URLBlock), field_handler)
+
+    def test_register_clears_cache(self):
+        registry = BlockHandlerRegistry()
+        text_handler = registry.register(blocks.TextBlock, lambda: "text")
+        self.assertIs(registry.get_handler(blocks.BlockQuoteBlock), text_handler)
+
+        blockquote_handler = registry.register(blocks.BlockQuoteBlock, lambda: "blockquote")
+        self.assertIs(registry.get_handler(blocks.BlockQuoteBlock), blockquote_handler)
+
+    def test_register_as_decorator(self):
+        registry = BlockHandlerRegistry()
+
+        @registry.register(blocks.CharBlock)
+        def handler():
+            return "char"
+
+        self.assertIs(registry.get_handler(blocks.CharBlock), handler)
+
+    def test_method_takes_precedence(self):
+        class CustomCharBlock(blocks.CharBlock):
+            def get_translatable_segments(self, value):
+                return []
+
+        def method_handler():
+            return "method"
+
+        registry = BlockHandlerRegistry(method_name="get_translatable_segments", method_handler=method_handler)
+        registry.register(blocks.CharBlock, lambda: "char")
+
+        self.assertIs(registry.get_handler(CustomCharBlock), method_handler)
+
+
+class ShoutyBlock(blocks.Block):
+    pass
+
+
+class TestRegisterThirdPartyBlock(TestCase):
+    def setUp(self):
+        block_extractors.register(ShoutyBlock, lambda extractor, block_type, block_value: [StringSegmentValue("", block_value.lower())])
+        block_writers.register(ShoutyBlock, lambda writer, block_type, block_value, node: node.get_segments()[0].render_text().upper())
+
+    def tearDown(self):
+        del block_extractors.handlers[ShoutyBlock]
+        block_extractors.cache.clear()
+        del block_writers.handlers[ShoutyBlock]
+        block_writers.cache.clear()
+
+    def test_extract(self):
+        extractor = StreamFieldSegmentExtractor(TestPage.test_streamfield.field)
+        segments = extractor.handle_block(ShoutyBlock(), "HELLO WORLD")
+
+        self.assertEqual(segments, [StringSegmentValue("", "hello world")])
+
+    def test_ingest(self):
+        writer = StreamFieldSegmentsWriter(TestPage.test_streamfield.field, None, None)
+        node = SegmentPathTrie.from_segments([StringSegmentValue("shouty", "bonjour le monde")]).children["shouty"]
+        value = writer.handle_block(ShoutyBlock(), "HELLO WORLD", node)
+
+        self.assertEqual(value, "BONJOUR LE MONDE")
@@ -1,17 +1,20 @@
 import uuid
 import unittest
+from unittest import mock
 
+from django.contrib.contenttypes.models import ContentType
 from django.test import TestCase
 
 from wagtail.core.blocks import StreamValue
 from wagtail.core.models import Page
+from wagtail.snippets.blocks import SnippetChooserBlock
 
 from wagtail_localize.segments import (
     StringSegmentValue,
     TemplateSegmentValue,
     RelatedObjectSegmentValue,
 )
-from wagtail_localize.segments.extract import extract_segments
+from wagtail_localize.segments.extract import StreamFieldSegmentExtractor, extract_segments, get_extraction_plan
 from wagtail_localize.strings import StringValue
 from wagtail_localize.test.models import (
     TestPage,
@@ -104,6 +107,47 @@ class TestSegmentExtraction(TestCase):
             segments, [RelatedObjectSegmentValue.from_instance("test_snippet", test_snippet)]
         )
 
+    def test_snippet_is_not_loaded(self):
+        test_snippet = TestSnippet.objects.create(field="Test content")
+        page = TestPage.objects.get(id=make_test_page(test_snippet=test_snippet).id)
+
+        # Only the snippet's translation key is fetched (the other query fetches the child objects)
+        ContentType.objects.get_for_model(TestSnippet)
+        with self.assertNumQueries(2):
+            segments = extract_segments(page)
+
+        self.assertFalse(TestPage.test_snippet.field.is_cached(page))
+        self.assertEqual(
+            segments, [RelatedObjectSegmentValue.from_instance("test_snippet", test_snippet)]
+        )
+
+    def test_deleted_snippet(self):
+        test_snippet = TestSnippet.objects.create(field="Test content")
+        page = TestPage.objects.get(id=make_test_page(test_snippet=test_snippet).id)
+        TestSnippet.objects.filter(id=test_snippet.id).delete()
+
+        self.assertEqual(extract_segments(page), [])
+
+    def test_snippet_hidden_by_default_manager(self):
+        test_snippet = TestSnippet.objects.create(field="Test content")
+        page = TestPage.objects.get(id=make_test_page(test_snippet=test_snippet).id)
+
+        # A default manager that filters out the snippet mustn't stop it from being extracted
+        with mock.patch.object(TestSnippet._meta, "default_manager", TestSnippet.objects.none()):
+            segments = extract_segments(page)
+
+        self.assertEqual(segments, [RelatedObjectSegmentValue.from_instance("test_snippet", test_snippet)])
+
+    def test_snippet_chooser_block(self):
+        test_snippet = TestSnippet.objects.create(field="Test content")
+        extractor = StreamFieldSegmentExtractor(TestPage.test_streamfield.field)
+
+        self.assertEqual(
+            extractor.handle_block(SnippetChooserBlock(TestSnippet), test_snippet),
+            [RelatedObjectSegmentValue.from_instance("", test_snippet)],
+        )
+        self.assertEqual(extractor.handle_block(SnippetChooserBlock(TestSnippet), None), [])
+
     def test_childobjects(self):
         page = make_test_page()
         page.test_childobjects.add(TestChildObject(field="Test content"))
@@ -143,6 +187,25 @@ class TestSegmentExtraction(TestCase):
         )
 
 
+class TestExtractionPlan(TestCase):
+    def test_extraction_plan(self):
+        plan = get_extraction_plan(TestPage)
+
+        field_names = [field.name for translatable_field, field, extractor in plan]
+
+        self.assertIn("test_charfield", field_names)
+        self.assertIn("test_streamfield", field_names)
+        self.assertIn("test_snippet", field_names)
+        self.assertIn("test_childobjects", field_names)
+
+        # Synchronized fields are never extracted
+        self.assertNotIn("test_synchronized_charfield", field_names)
+
+    def test_extraction_plan_is_cached(self):
+        self.assertIs(get_extraction_plan(TestPage), get_extraction_plan(TestPage))
+        self.assertIsNot(get_extraction_plan(TestPage), get_extraction_plan(TestSnippet))
+
+
 def make_test_page_with_streamfield_block(block_id, block_type, block_value, **kwargs):
     stream_data = [{"id": block_id, "type": block_type, "value": block_value}]
 
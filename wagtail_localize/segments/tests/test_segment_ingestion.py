@@ -1,5 +1,6 @@
 import uuid
 import unittest
+from unittest import mock
 
 from django.test import TestCase
 
@@ -11,7 +12,7 @@ from wagtail_localize.segments import (
     TemplateSegmentValue,
     RelatedObjectSegmentValue,
 )
-from wagtail_localize.segments.ingest import ingest_segments
+from wagtail_localize.segments.ingest import SegmentPathTrie, StreamFieldSegmentsWriter, ingest_segments
 from wagtail_localize.strings import StringValue
 from wagtail_localize.test.models import TestPage, TestSnippet, TestChildObject
 
@@ -636,3 +637,72 @@ class TestSegmentIngestionWithStreamField(TestCase):
                 }
             ],
         )
+
+
+class TestSegmentPathTrie(TestCase):
+    def setUp(self):
+        self.segments = [
+            StringSegmentValue("test_streamfield.block-1.field_a", "A"),
+            StringSegmentValue("test_charfield", "Char"),
+            StringSegmentValue("test_streamfield.block-2", "B"),
+            StringSegmentValue("test_streamfield.block-1.field_b", "C"),
+        ]
+        self.trie = SegmentPathTrie.from_segments(self.segments)
+
+    def test_children(self):
+        self.assertEqual(list(self.trie.children.keys()), ["test_streamfield", "test_charfield"])
+        self.assertEqual(list(self.trie.children["test_streamfield"].children.keys()), ["block-1", "block-2"])
+
+    def test_values(self):
+        self.assertEqual(
+            self.trie.children["test_streamfield"].children["block-1"].values(),
+            [self.segments[0], self.segments[3]],
+        )
+
+    def test_get_segments_matches_unwrap(self):
+        block_node = self.trie.children["test_streamfield"].children["block-1"]
+
+        expected = []
+        for segment in [self.segments[0], self.segments[3]]:
+            field_name, segment = segment.unwrap()
+            block_id, segment = segment.unwrap()
+            expected.append(segment)
+
+        self.assertEqual(block_node.get_segments(), expected)
+        self.assertEqual([segment.path for segment in block_node.get_segments()], ["field_a", "field_b"])
+        self.assertEqual(block_node.children["field_a"].get_segments()[0].path, "")
+
+        # The original segments are untouched
+        self.assertEqual(self.segments[0].path, "test_streamfield.block-1.field_a")
+
+
+class TestStreamFieldIngestionScaling(TestCase):
+    def test_each_block_is_only_looked_at_once(self):
+        num_blocks = 2000
+        stream_block = TestPage.test_streamfield.field.stream_block
+        stream_value = StreamValue(
+            stream_block,
+            [
+                {"id": "block-{}".format(i), "type": "test_charblock", "value": "Block {}".format(i)}
+                for i in range(num_blocks)
+            ],
+            is_lazy=True,
+        )
+        segments = [
+            StringSegmentValue("block-{}".format(i), "Bloc {}".format(i), order=i)
+            for i in range(num_blocks)
+        ]
+
+        writer = StreamFieldSegmentsWriter(TestPage.test_streamfield.field, None, None)
+
+        with mock.patch.object(StreamValue, "__getitem__", autospec=True, side_effect=StreamValue.__getitem__) as getitem:
+            translated_value = writer.handle_stream_block(stream_value, SegmentPathTrie.from_segments(segments))
+
+        # Each block is matched to its segments by its ID, so the stream is iterated over once
+        # (plus the lookup that ends the iteration) rather than being searched for each block
+        self.assertLessEqual(getitem.call_count, num_blocks + 1)
+
+        self.assertEqual(
+            [child.value for child in translated_value],
+            ["Bloc {}".format(i) for i in range(num_blocks)],
+        )
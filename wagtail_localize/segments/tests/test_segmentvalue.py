@@ -61,3 +61,17 @@ class TestStringSegmentValue(TestCase):
             segment.render_html(),
             'This is some text. &lt;foo&gt; <b>Bold text</b> <a href="http://changed-example.com">A link and some more <b>Bold text</b></a>',
         )
+
+    def test_path_components(self):
+        segment = StringSegmentValue("foo.bar", "Some text")
+
+        self.assertEqual(segment.path_components, ("foo", "bar"))
+        self.assertFalse(hasattr(segment, "__dict__"))
+
+        wrapped = segment.wrap("baz.qux")
+        self.assertEqual(wrapped.path_components, ("baz", "qux", "foo", "bar"))
+        self.assertEqual(wrapped.path, "baz.qux.foo.bar")
+
+        segment.path = "new.path"
+        self.assertEqual(segment.path_components, ("new", "path"))
+        self.assertEqual(StringSegmentValue("", "Some text").path_components, ())
@@ -3,11 +3,35 @@ from django.contrib.contenttypes.models import ContentType
 from wagtail_localize.strings import StringValue
 
 
+def split_path(path):
+    """
+    Converts a dotted path string into a tuple of components.
+    """
+    if isinstance(path, tuple):
+        return path
+
+    return tuple(path.split(".")) if path else ()
+
+
 class BaseValue:
+    # Segment values are created in large numbers so they use __slots__ to save memory.
+    # The path is stored as a tuple of components so that wrapping/unwrapping doesn't
+    # need to build new strings. It's only converted to a dotted string when accessed
+    # through the .path property
+    __slots__ = ("path_components", "order")
+
     def __init__(self, path, order=0):
-        self.path = path
+        self.path_components = split_path(path)
         self.order = order
 
+    @property
+    def path(self):
+        return ".".join(self.path_components)
+
+    @path.setter
+    def path(self, path):
+        self.path_components = split_path(path)
+
     def clone(self):
         """
         Clones this segment. Must be overridden in subclass.
@@ -32,13 +56,13 @@ class BaseValue:
         >>> s.wrap('wrapped')
         StringSegmentValue('wrapped.field', 'foo')
         """
-        new_path = base_path
+        clone = self.clone()
 
-        if self.path:
-            new_path += "." + self.path
+        if "." in base_path:
+            clone.path_components = split_path(base_path) + self.path_components
+        else:
+            clone.path_components = (base_path,) + self.path_components
 
-        clone = self.clone()
-        clone.path = new_path
         return clone
 
     def unwrap(self):
@@ -51,15 +75,18 @@ class BaseValue:
         >>> s.unwrap()
         'wrapped', StringSegmentValue('field', 'foo')
         """
-        first_component, *remaining_components = self.path.split(".")
-        new_path = ".".join(remaining_components)
-
         clone = self.clone()
-        clone.path = new_path
-        return first_component, clone
+
+        if not self.path_components:
+            return "", clone
+
+        clone.path_components = self.path_components[1:]
+        return self.path_components[0], clone
 
 
 class StringSegmentValue(BaseValue):
+    __slots__ = ("string", "attrs")
+
     def __init__(self, path, string, attrs=None, **kwargs):
         if isinstance(string, str):
             string = StringValue.from_plaintext(string)
@@ -71,7 +98,7 @@ class StringSegmentValue(BaseValue):
 
     def clone(self):
         return StringSegmentValue(
-            self.path, self.string, attrs=self.attrs, order=self.order
+            self.path_components, self.string, attrs=self.attrs, order=self.order
         )
 
     @classmethod
@@ -91,7 +118,7 @@ class StringSegmentValue(BaseValue):
     def __eq__(self, other):
         return (
             isinstance(other, StringSegmentValue)
-            and self.path == other.path
+            and self.path_components == other.path_components
             and self.string == other.string
             and self.attrs == other.attrs
         )
@@ -101,6 +128,8 @@ class StringSegmentValue(BaseValue):
 
 
 class TemplateSegmentValue(BaseValue):
+    __slots__ = ("format", "template", "string_count")
+
     def __init__(self, path, format, template, string_count, **kwargs):
         self.format = format
         self.template = template
@@ -110,7 +139,7 @@ class TemplateSegmentValue(BaseValue):
 
     def clone(self):
         return TemplateSegmentValue(
-            self.path, self.format, self.template, self.string_count, order=self.order
+            self.path_components, self.format, self.template, self.string_count, order=self.order
         )
 
     def is_empty(self):
@@ -119,7 +148,7 @@ class TemplateSegmentValue(BaseValue):
     def __eq__(self, other):
         return (
             isinstance(other, TemplateSegmentValue)
-            and self.path == other.path
+            and self.path_components == other.path_components
             and self.format == other.format
             and self.template == other.template
             and self.string_count == other.string_count
@@ -132,10 +161,16 @@ class TemplateSegmentValue(BaseValue):
 
 
 class RelatedObjectSegmentValue(BaseValue):
-    def __init__(self, path, content_type, translation_key, **kwargs):
+    __slots__ = ("content_type", "translation_key", "instance")
+
+    def __init__(self, path, content_type, translation_key, instance=None, **kwargs):
         self.content_type = content_type
         self.translation_key = translation_key
 
+        # The translated instance, if it has already been fetched. This allows the
+        # instances of many segments to be looked up in bulk before ingestion
+        self.instance = instance
+
         super().__init__(path, **kwargs)
 
     @classmethod
@@ -148,13 +183,16 @@ class RelatedObjectSegmentValue(BaseValue):
     def get_instance(self, locale):
         from ..models import pk
 
+        if self.instance is not None and self.instance.locale_id == pk(locale):
+            return self.instance
+
         return self.content_type.get_object_for_this_type(
             translation_key=self.translation_key, locale_id=pk(locale)
         )
 
     def clone(self):
         return RelatedObjectSegmentValue(
-            self.path, self.content_type, self.translation_key, order=self.order
+            self.path_components, self.content_type, self.translation_key, instance=self.instance, order=self.order
         )
 
     def is_empty(self):
@@ -163,7 +201,7 @@ class RelatedObjectSegmentValue(BaseValue):
     def __eq__(self, other):
         return (
             isinstance(other, RelatedObjectSegmentValue)
-            and self.path == other.path
+            and self.path_components == other.path_components
             and self.content_type == other.content_type
             and self.translation_key == other.translation_key
         )
@@ -1,13 +1,21 @@
+import uuid
 from collections import Counter
+from functools import lru_cache
 
 from django.utils.html import escape
 
 from bs4 import BeautifulSoup, NavigableString
 
+from .segmenters import get_segmenter
+
 
 # List of tags that are allowed in segments
 INLINE_TAGS = ["a", "abbr", "acronym", "b", "code", "em", "i", "strong", "br"]
 
+# Characters that BeautifulSoup would change when re-rendering a string
+UNSAFE_CHARS = {ord(char): None for char in "<>&"}
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
 
 def lstrip_keep(text):
     """
@@ -125,7 +133,16 @@ class StringValue:
         return soup
 
     def render_html(self, attrs):
-        return str(self.render_soup(attrs))
+        # Strings without any markup or entities don't need to be parsed
+        if self.data.translate(UNSAFE_CHARS) == self.data and self.data.strip(ASCII_SPACES):
+            return self.data
+
+        from .segmenters.htmlparser import UnsupportedHTML, restore_attrs
+
+        try:
+            return restore_attrs(self.data, attrs)
+        except UnsupportedHTML:
+            return str(self.render_soup(attrs))
 
     def __eq__(self, other):
         return (
@@ -171,169 +188,62 @@ def extract_strings(html):
             "Bar",
             "<b>Baz</b>",
         ]
-    """
-    soup = BeautifulSoup(html, "html.parser")
-
-    def wrap(elements):
-        """
-        Wraps the given elements with a <text> tag
-
-        The elements must be contiguous siblings or this might screw up the tree.
-        """
-        elements = list(elements)
-
-        # Skip if there are no tags to wrap
-        # We can get here after filters below have been applied
-        if len(elements) == 0:
-            return
-
-        # If there is a single element and that is an inline tag, wrap just the contents.
-        # We only care about inline tags that wrap only part of a segment
-        if (
-            len(elements) == 1
-            and not isinstance(elements[0], NavigableString)
-            and elements[0].name in INLINE_TAGS
-        ):
-            wrap(elements[0].children)
-            return
-
-        def ignore_if_at_end(element):
-            """
-            Returns True if the given element should be ignored if it is at one of the ends
-            """
-            if isinstance(element, NavigableString):
-                return False
-
-            # Ignore if there are no text nodes
-            # This will exclude both <br> tags and empty inline tags
-            if not any(
-                isinstance(desc, NavigableString) for desc in element.descendants
-            ):
-                return True
-
-            return False
-
-        if ignore_if_at_end(elements[0]):
-            wrap(elements[1:])
-            return
-
-        if ignore_if_at_end(elements[-1]):
-            wrap(elements[:-1])
-            return
-
-        value = "".join(
-            element.output_ready()
-            if isinstance(element, NavigableString)
-            else str(element)
-            for element in elements
-        )
-
-        if value and not value.isspace():
-            # Create <text> tag
-            elements[0].insert_before(soup.new_tag("text", value=value))
-
-            # Remove elements
-            for element in elements:
-                element.replaceWith("")
-
-    def walk(element):
-        """
-        Walks the tree in depth first search post-order.
-
-        When it encounters an element that could be extracted, it wraps it with
-        a <text> tag. These are extracted in the next stage (because we want to
-        preserve order of occurance).
-
-        For example:
-
-        <p>
-            Foo
-            <ul>
-              <li>Bar</li>
-            </ul>
-            Baz
-        </p>
 
-        Is transformed to:
-
-        <p>
-            <text>Foo</text>
-            <ul>
-              <li><text><b>Bar</b></text></li>
-            </ul>
-            <text>Baz</text>
-        </p>
-        """
-        if isinstance(element, NavigableString):
-            return False, False
-
-        has_block = False
-        has_wrap = False
-        buffer = []
-
-        for child in element.children:
-            child_has_wrap, is_block = walk(child)
-
-            if child_has_wrap:
-                has_wrap = True
+    The segmenter that does this can be changed with the WAGTAILLOCALIZE_SEGMENTER setting.
+    Results are cached by the content of the HTML (see WAGTAILLOCALIZE_SEGMENTATION_CACHE).
+    """
+    from .segmenters.cache import get_segmentation_cache
 
-            if is_block:
-                has_block = True
+    segmentation_cache = get_segmentation_cache()
 
-                if buffer:
-                    wrap(buffer)
-                    buffer = []
-                    has_wrap = True
+    if segmentation_cache is None:
+        return get_segmenter().extract_strings(html)
 
-            else:
-                if not child_has_wrap:
-                    buffer.append(child)
+    return segmentation_cache.extract_strings(html)
 
-        if buffer and has_block:
-            wrap(buffer)
-            buffer = []
-            has_wrap = True
 
-        if element.name not in INLINE_TAGS:
-            if buffer:
-                wrap(buffer)
-                has_wrap = True
+class CompiledTemplate:
+    """
+    A template that has been split up into chunks of HTML with a string to be
+    inserted between each one.
+    """
+    def __init__(self, chunks, positions):
+        # There is always one more chunk than there are positions
+        self.chunks = chunks
+        self.positions = positions
 
-            return has_wrap, True
+    @classmethod
+    def compile(cls, template):
+        soup = BeautifulSoup(template, "html.parser")
+        marker = uuid.uuid4().hex
+        positions = []
 
-        return has_wrap, False
+        for text_element in soup.findAll("text"):
+            positions.append(int(text_element.get("position")))
+            text_element.replaceWith(marker)
 
-    walk(soup)
+        return cls(str(soup).split(marker), positions)
 
-    # Now extract strings from the <text> tags
-    strings = []
-    for element in soup.descendants:
-        if element.name == "text":
-            text = element.attrs.pop("value")
+    def render(self, strings):
+        html = [self.chunks[0]]
 
-            # Strip leading and trailing whitespace. We keep the values and reinsert them
-            # into the template
-            # This is probably not necessary, but just to be on the safe side
-            text, prefix = lstrip_keep(text)
-            text, suffix = rstrip_keep(text)
+        for position, chunk in zip(self.positions, self.chunks[1:]):
+            string, attrs = strings[position]
+            html.append(string.render_html(attrs))
+            html.append(chunk)
 
-            element.attrs["position"] = len(strings)
-            strings.append(StringValue.from_html(text))
+        return "".join(html)
 
-            if prefix:
-                element.insert_before(prefix)
 
-            if suffix:
-                element.insert_after(suffix)
+@lru_cache(maxsize=1000)
+def compile_template(template):
+    """
+    Compiles the given template, caching the result.
 
-    return str(soup), strings
+    Templates are content-addressed (see Template.uuid) so they can be cached by their content.
+    """
+    return CompiledTemplate.compile(template)
 
 
 def restore_strings(template, strings):
-    soup = BeautifulSoup(template, "html.parser")
-
-    for text_element in soup.findAll("text"):
-        string, attrs = strings[int(text_element.get("position"))]
-        text_element.replaceWith(string.render_soup(attrs))
-
-    return str(soup)
+    return compile_template(template).render(strings)
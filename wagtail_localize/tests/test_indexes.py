@@ -0,0 +1,62 @@
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+from wagtail.core.models import Locale
+
+from wagtail_localize.models import StringSegment, Translation, TranslationSource
+
+from .test_translation_model import create_test_page
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "Query plans are only checked on SQLite")
+class TestQueryPlans(TestCase):
+    """
+    Checks that the hot queries use the composite indexes. With only a few rows, PostgreSQL
+    is free to ignore indexes so these are only checked against SQLite's query planner.
+    """
+
+    def setUp(self):
+        self.fr_locale = Locale.objects.create(language_code="fr")
+        self.page = create_test_page(
+            title="Test page",
+            slug="test-slug",
+            test_charfield="Test content",
+            test_textfield="More test content",
+        )
+        self.source = TranslationSource.objects.get()
+
+    def get_index_name(self, model, fields):
+        return next(index.name for index in model._meta.indexes if index.fields == fields)
+
+    def test_annotate_translation(self):
+        plan = (
+            StringSegment.objects.filter(source=self.source)
+            .order_by("order")
+            .annotate_translation(self.fr_locale)
+            .explain()
+        )
+
+        self.assertIn(self.get_index_name(StringSegment, ["source", "order"]), plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+        # Translations are looked up with an index rather than scanning the table
+        self.assertNotIn("SCAN", plan)
+
+    def test_annotate_progress(self):
+        translation = Translation.objects.create(
+            object=self.source.object,
+            target_locale=self.fr_locale,
+            source=self.source,
+        )
+
+        plan = Translation.objects.filter(pk=translation.pk).annotate_progress().explain()
+
+        self.assertIn(self.get_index_name(StringSegment, ["source", "order"]), plan)
+        self.assertNotIn("SCAN", plan)
+
+    def test_latest_source(self):
+        plan = self.source.object.sources.defer("content_json").order_by("-created_at")[:1].explain()
+
+        self.assertIn(self.get_index_name(TranslationSource, ["object", "created_at"]), plan)
+        self.assertNotIn("TEMP B-TREE", plan)
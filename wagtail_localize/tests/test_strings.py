@@ -1,7 +1,9 @@
+from unittest import mock
+
 from django import VERSION as DJANGO_VERSION
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-from wagtail_localize.strings import StringValue, extract_strings, restore_strings
+from wagtail_localize.strings import StringValue, extract_strings, restore_strings, compile_template
 
 
 class TestStringValueFromHTML(TestCase):
@@ -78,6 +80,46 @@ class TestRenderHTML(TestCase):
             '<b>Bread</b> is a <a href="https://en.wikipedia.org/wiki/Dough">dough</a> prepared from a <a href="https://en.wikipedia.org/wiki/Staple_food">staple food</a> of <a href="https://en.wikipedia.org/wiki/Flour">flour</a> and <a href="https://en.wikipedia.org/wiki/Water">water</a>',
         )
 
+    def test_render_html_matches_render_soup(self):
+        attrs = {
+            'a1': {'href': 'https://en.wikipedia.org/wiki/Dough?a=1&b=2'},
+            'span1': {'class': ['foo', 'bar'], 'title': 'Say "hello"'},
+        }
+
+        for data in [
+            'Plain text',
+            'Text with &amp; entities&nbsp;',
+            '<b>Bread</b> is a <a id="a1">dough</a>',
+            '<span id="span1">Foo<br>bar</span> <i>baz',
+            '<a id="a1">Foo <!-- comment --> bar</a>',
+            '   ',
+        ]:
+            with self.subTest(data=data):
+                string = StringValue(data)
+                self.assertEqual(string.render_html(attrs), str(string.render_soup(attrs)))
+
+    def test_render_html_without_markup(self):
+        string = StringValue("Hello world")
+
+        # Strings without markup or entities are returned without being parsed
+        with mock.patch.object(StringValue, "render_soup") as render_soup:
+            with mock.patch("wagtail_localize.segmenters.htmlparser.restore_attrs") as restore_attrs:
+                self.assertEqual(string.render_html({}), "Hello world")
+
+        render_soup.assert_not_called()
+        restore_attrs.assert_not_called()
+
+    def test_render_html_escapes_special_characters(self):
+        for data, expected in [
+            ("&", "&amp;"),
+            ("<>", "&lt;&gt;"),
+            ("a & b", "a &amp; b"),
+        ]:
+            with self.subTest(data=data):
+                string = StringValue(data)
+                self.assertEqual(string.render_html({}), expected)
+                self.assertEqual(string.render_html({}), str(string.render_soup({})))
+
 
 class TestStringRenderText(TestCase):
     def test_string_render_text(self):
@@ -214,6 +256,13 @@ class TextExtractStrings(TestCase):
         self.assertEqual(strings, [StringValue.from_html("Foo")])
 
 
+@override_settings(WAGTAILLOCALIZE_SEGMENTER={
+    'CLASS': 'wagtail_localize.segmenters.htmlparser.HTMLParserSegmenter',
+})
+class TextExtractStringsWithHTMLParserSegmenter(TextExtractStrings):
+    pass
+
+
 class TestRestoreStrings(TestCase):
     def test_restore_strings(self):
         html = restore_strings(
@@ -269,3 +318,33 @@ class TestRestoreStrings(TestCase):
             """,
             html,
         )
+
+
+class TestCompileTemplate(TestCase):
+    def test_compile_template(self):
+        compiled = compile_template('<h1><text position="0"></text></h1><p><b><text position="1"></text></b> <img src="foo"></p>')
+
+        self.assertEqual(compiled.chunks, ['<h1>', '</h1><p><b>', '</b> <img src="foo"/></p>'])
+        self.assertEqual(compiled.positions, [0, 1])
+
+        self.assertEqual(
+            compiled.render([
+                (StringValue('Foo'), {}),
+                (StringValue('<a id="a1">Bar</a>'), {'a1': {'href': 'http://example.com'}}),
+            ]),
+            '<h1>Foo</h1><p><b><a href="http://example.com">Bar</a></b> <img src="foo"/></p>',
+        )
+
+    def test_positions_out_of_order(self):
+        compiled = compile_template('<p><text position="1"></text></p><p><text position="0"></text></p>')
+
+        self.assertEqual(compiled.positions, [1, 0])
+        self.assertEqual(
+            compiled.render([(StringValue('Foo'), {}), (StringValue('Bar'), {})]),
+            '<p>Bar</p><p>Foo</p>',
+        )
+
+    def test_compiled_templates_are_cached(self):
+        template = '<p><text position="0"></text></p>'
+
+        self.assertIs(compile_template(template), compile_template(template))
@@ -0,0 +1,198 @@
+import random
+from io import StringIO
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from wagtail.core.models import Locale
+
+from wagtail_localize.models import String, StringMinHashBand, StringTranslation, TranslationContext, TranslatableObject
+from wagtail_localize.strings import StringValue
+from wagtail_localize.translation_memory import (
+    CANDIDATES_PER_MATCH,
+    NUM_BANDS,
+    TranslationMemoryMatch,
+    find_similar_strings,
+    get_band_hashes,
+    get_shingles,
+    get_similarity,
+    update_index,
+)
+from wagtail_localize.test.models import TestPage
+
+
+PARAGRAPH = "Our editors change one word in a paragraph and the whole string is untranslated again, which means that it has to be translated from scratch."
+
+WORDS = [
+    "about", "after", "again", "below", "could", "every", "first", "found", "great", "house", "large",
+    "learn", "never", "other", "place", "plant", "point", "right", "small", "sound", "spell", "still",
+    "study", "their", "there", "these", "thing", "think", "three", "water", "where", "which", "world",
+    "would", "write", "page", "site", "text", "blog", "news", "event", "story", "image", "title",
+]
+
+
+def random_sentence(rng):
+    return " ".join(rng.choice(WORDS) for i in range(rng.randint(8, 30))).capitalize() + "."
+
+
+class TestMinHash(TestCase):
+    def test_get_shingles(self):
+        self.assertEqual(
+            get_shingles('Read <b>more</b> news'),
+            {"read", "more", "news", "read more", "more news"},
+        )
+        self.assertEqual(get_shingles(""), set())
+
+    def test_get_similarity(self):
+        self.assertEqual(get_similarity(get_shingles("Read more"), get_shingles("read MORE")), 1.0)
+        self.assertEqual(get_similarity(get_shingles("Read more"), get_shingles("Read less")), 0.2)
+        self.assertEqual(get_similarity(set(), set()), 0.0)
+
+    def test_band_hashes(self):
+        band_hashes = get_band_hashes(PARAGRAPH)
+
+        self.assertEqual(len(band_hashes), NUM_BANDS)
+        self.assertEqual(band_hashes, get_band_hashes(PARAGRAPH.upper()))
+        self.assertTrue(all(-2 ** 63 <= band_hash < 2 ** 63 for band_hash in band_hashes))
+        self.assertEqual(get_band_hashes("..."), [])
+
+    def test_similar_text_shares_bands(self):
+        edited = PARAGRAPH.replace("whole", "entire")
+
+        self.assertTrue(set(get_band_hashes(PARAGRAPH)) & set(get_band_hashes(edited)))
+
+
+@override_settings(WAGTAILLOCALIZE_TRANSLATION_MEMORY_INDEX=True)
+class TestFindSimilarStrings(TestCase):
+    def setUp(self):
+        self.locale = Locale.objects.get()
+        self.fr_locale = Locale.objects.create(language_code="fr")
+        self.de_locale = Locale.objects.create(language_code="de")
+
+        self.object = TranslatableObject.objects.create(
+            translation_key=TestPage().translation_key,
+            content_type=ContentType.objects.get_for_model(TestPage),
+        )
+        self.context = TranslationContext.objects.create(object=self.object, path="test_textfield")
+
+    def test_strings_are_indexed_when_created(self):
+        string = String.from_value(self.locale, StringValue(PARAGRAPH))
+        self.assertEqual(StringMinHashBand.objects.filter(string=string).count(), NUM_BANDS)
+
+        strings = String.get_or_create_many(self.locale, [StringValue(PARAGRAPH), StringValue("Read more")])
+        self.assertEqual(StringMinHashBand.objects.filter(string=strings["Read more"]).count(), NUM_BANDS)
+
+        # Existing strings aren't indexed again
+        self.assertEqual(StringMinHashBand.objects.filter(string=string).count(), NUM_BANDS)
+
+    def test_indexing_cost(self):
+        rng = random.Random(42)
+        String.get_or_create_many(self.locale, [StringValue(random_sentence(rng)) for i in range(100)])
+
+        # Each new string adds one row per band
+        self.assertEqual(StringMinHashBand.objects.count(), 100 * NUM_BANDS)
+
+    @override_settings(WAGTAILLOCALIZE_TRANSLATION_MEMORY_INDEX=False)
+    def test_strings_arent_indexed_when_disabled(self):
+        String.from_value(self.locale, StringValue(PARAGRAPH))
+        String.get_or_create_many(self.locale, [StringValue("Read more")])
+
+        self.assertFalse(StringMinHashBand.objects.exists())
+        self.assertEqual(find_similar_strings(self.locale, PARAGRAPH), [])
+
+    def test_update_index(self):
+        with override_settings(WAGTAILLOCALIZE_TRANSLATION_MEMORY_INDEX=False):
+            string = String.from_value(self.locale, StringValue(PARAGRAPH))
+            String.get_or_create_many(self.locale, [StringValue("Read more"), StringValue("...")])
+
+        String.from_value(self.locale, StringValue("Read less"))
+
+        self.assertEqual(update_index(batch_size=1), 3)
+        self.assertEqual(StringMinHashBand.objects.count(), 3 * NUM_BANDS)
+        self.assertEqual(find_similar_strings(self.locale, PARAGRAPH)[0].string, string)
+
+        # Strings are only indexed once
+        self.assertEqual(update_index(), 1)
+        self.assertEqual(StringMinHashBand.objects.count(), 3 * NUM_BANDS)
+
+    def test_update_translation_memory_index_command(self):
+        with override_settings(WAGTAILLOCALIZE_TRANSLATION_MEMORY_INDEX=False):
+            String.from_value(self.locale, StringValue(PARAGRAPH))
+
+        stdout = StringIO()
+        call_command("update_translation_memory_index", stdout=stdout)
+
+        self.assertEqual(stdout.getvalue(), "Indexed 1 strings.\n")
+        self.assertEqual(StringMinHashBand.objects.count(), NUM_BANDS)
+
+    def test_find_similar_strings(self):
+        string = String.from_value(self.locale, StringValue(PARAGRAPH))
+        String.from_value(self.locale, StringValue("Something completely different, about news and blogs."))
+        fr_translation = StringTranslation.objects.create(translation_of=string, locale=self.fr_locale, context=self.context, data="Nos éditeurs...")
+        StringTranslation.objects.create(translation_of=string, locale=self.de_locale, context=self.context, data="Unsere Redakteure...")
+
+        edited = PARAGRAPH.replace("whole", "entire")
+        matches = find_similar_strings(self.locale, edited, target_locale=self.fr_locale)
+
+        self.assertEqual(matches, [
+            TranslationMemoryMatch(string, get_similarity(get_shingles(PARAGRAPH), get_shingles(edited)), [fr_translation]),
+        ])
+        self.assertGreater(matches[0].similarity, 0.8)
+
+        # Without a target locale, the translations into all locales are returned
+        self.assertEqual(len(find_similar_strings(self.locale, edited)[0].translations), 2)
+
+    def test_other_locales_are_ignored(self):
+        String.from_value(self.fr_locale, StringValue(PARAGRAPH))
+
+        self.assertEqual(find_similar_strings(self.locale, PARAGRAPH), [])
+
+    def test_top_k(self):
+        rng = random.Random(42)
+        strings = [random_sentence(rng) for i in range(200)]
+        String.get_or_create_many(self.locale, [StringValue(data) for data in strings])
+
+        text = strings[0] + " Extra"
+        matches = find_similar_strings(self.locale, text, limit=3, min_similarity=0)
+
+        self.assertLessEqual(len(matches), 3)
+        self.assertEqual(matches[0].string.data, strings[0])
+        self.assertEqual(
+            [match.similarity for match in matches],
+            sorted([match.similarity for match in matches], reverse=True),
+        )
+
+
+@override_settings(WAGTAILLOCALIZE_TRANSLATION_MEMORY_INDEX=True)
+class TestFindSimilarStringsScaling(TestCase):
+    """
+    Checks that the work done by a lookup doesn't grow with the number of indexed strings, as
+    only the strings that share the most bands with the text are ranked.
+    """
+
+    def test_number_of_candidates_is_bounded(self):
+        locale = Locale.objects.get()
+        rng = random.Random(42)
+        # Lots of edits of the same paragraph, which will all be candidates
+        words = PARAGRAPH.split()
+        edits = [
+            " ".join(words[:i % len(words)] + [rng.choice(WORDS)] + words[i % len(words) + 1:])
+            for i in range(200)
+        ]
+        strings = [PARAGRAPH] + edits + [random_sentence(rng) for i in range(800)]
+        String.get_or_create_many(locale, [StringValue(data) for data in strings])
+
+        # Make sure there are more candidates than will be ranked
+        num_candidates = (
+            StringMinHashBand.objects.filter(locale=locale, band_hash__in=get_band_hashes(PARAGRAPH))
+            .values("string_id").distinct().count()
+        )
+        self.assertGreater(num_candidates, 2 * CANDIDATES_PER_MATCH)
+
+        with mock.patch("wagtail_localize.translation_memory.get_similarity", side_effect=get_similarity) as get_similarity_mock:
+            with self.assertNumQueries(3):
+                matches = find_similar_strings(locale, PARAGRAPH, limit=2, min_similarity=0)
+
+        self.assertLessEqual(get_similarity_mock.call_count, 2 * CANDIDATES_PER_MATCH)
+        self.assertEqual(matches[0].string.data, PARAGRAPH)
@@ -1,6 +1,10 @@
+from datetime import timedelta
+from unittest import mock
+
 import polib
 from django.test import TestCase
 from django.utils import timezone
+from wagtail.core.blocks import StreamValue
 from wagtail.core.models import Page, Locale
 
 from wagtail_localize.models import (
@@ -151,6 +155,64 @@ class TestGetProgress(TestCase):
         progress = self.translation.get_progress()
         self.assertEqual(progress, (2, 0))
 
+    def test_annotate_progress(self):
+        de_locale = Locale.objects.create(language_code="de")
+        de_translation = Translation.objects.create(
+            object=self.source.object,
+            target_locale=de_locale,
+            source=self.source,
+        )
+
+        StringTranslation.objects.create(
+            translation_of=self.test_content_string,
+            context=self.test_charfield_context,
+            locale=de_locale,
+            data="Testinhalt",
+        )
+
+        with self.assertNumQueries(1):
+            progress = {
+                translation.id: (translation.total_segments_count, translation.translated_segments_count)
+                for translation in Translation.objects.annotate_progress()
+            }
+
+        self.assertEqual(progress, {
+            self.translation.id: (2, 0),
+            de_translation.id: (2, 1),
+        })
+
+    def test_get_progress_uses_annotated_progress(self):
+        translation = Translation.objects.annotate_progress().get(pk=self.translation.pk)
+
+        # Make sure the annotation is used rather than the cached progress
+        translation.total_segments = translation.translated_segments = None
+
+        with self.assertNumQueries(0):
+            self.assertEqual(translation.get_progress(), (2, 0))
+
+    def test_cached_progress_is_updated(self):
+        self.translation.refresh_from_db()
+        self.assertEqual((self.translation.total_segments, self.translation.translated_segments), (2, 0))
+
+        string_translation = StringTranslation.objects.create(
+            translation_of=self.test_content_string,
+            context=self.test_charfield_context,
+            locale=self.fr_locale,
+            data="Contenu de test",
+        )
+
+        self.translation.refresh_from_db()
+        self.assertEqual((self.translation.total_segments, self.translation.translated_segments), (2, 1))
+
+        # The cached progress is used by get_progress
+        with self.assertNumQueries(0):
+            self.assertEqual(self.translation.get_progress(), (2, 1))
+
+        string_translation.delete()
+
+        self.translation.refresh_from_db()
+        self.assertEqual((self.translation.total_segments, self.translation.translated_segments), (2, 0))
+
 
 class TestExportPO(TestCase):
     def setUp(self):
@@ -235,6 +297,70 @@ class TestExportPO(TestCase):
 
         # Obsolete strings that never had a translation don't get exported
 
+    def test_export_po_with_duplicate_strings(self):
+        page = create_test_page(
+            title="Test page",
+            slug="test-page-with-duplicates",
+            test_streamfield=StreamValue(
+                TestPage.test_streamfield.field.stream_block,
+                [
+                    {"id": "block-1", "type": "test_charblock", "value": "Duplicated string"},
+                    {"id": "block-2", "type": "test_charblock", "value": "Another string"},
+                    {"id": "block-3", "type": "test_charblock", "value": "Duplicated string"},
+                ],
+                is_lazy=True,
+            ),
+        )
+        source = TranslationSource.from_instance(page)[0]
+        source.extract_segments()
+        translation = Translation.objects.create(
+            object=source.object,
+            target_locale=self.fr_locale,
+            source=source,
+        )
+
+        po = translation.export_po()
+
+        # Each string is exported once, in order of first appearance, with the context of its last appearance
+        self.assertEqual(
+            [(entry.msgid, entry.msgctxt) for entry in po],
+            [
+                ("Duplicated string", "test_streamfield.block-3"),
+                ("Another string", "test_streamfield.block-2"),
+            ],
+        )
+
+    def test_stream_po(self):
+        StringTranslation.objects.create(
+            translation_of=String.objects.get(data="This is some test content"),
+            context=TranslationContext.objects.get(path="test_charfield"),
+            locale=self.fr_locale,
+            data="Contenu de test",
+        )
+        StringTranslation.objects.create(
+            translation_of=String.from_value(self.en_locale, StringValue("This is an obsolete string")),
+            context=TranslationContext.objects.get(path="test_charfield"),
+            locale=self.fr_locale,
+            data="Ceci est une chaîne obsolète",
+        )
+
+        now = timezone.now()
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            chunks = list(self.translation.stream_po())
+            po = self.translation.export_po()
+
+        self.assertEqual("".join(chunks), str(po))
+
+        # Streamed output can be parsed back
+        streamed_po = polib.pofile("".join(chunks))
+        self.assertEqual(
+            [(entry.msgid, entry.msgstr, entry.obsolete) for entry in streamed_po],
+            [
+                ("This is some test content", "Contenu de test", False),
+                ("This is an obsolete string", "Ceci est une chaîne obsolète", True),
+            ],
+        )
+
 
 class TestImportPO(TestCase):
     def setUp(self):
@@ -334,6 +460,98 @@ class TestImportPO(TestCase):
         # Should delete both the translations
         self.assertFalse(StringTranslation.objects.exists())
 
+    def test_import_po_updates_existing_translations(self):
+        StringTranslation.objects.create(
+            translation_of=String.objects.get(data="This is some test content"),
+            context=TranslationContext.objects.get(path="test_charfield"),
+            locale=self.fr_locale,
+            data="Contenu de test",
+        )
+
+        po = polib.POFile(wrapwidth=200)
+        po.metadata = {
+            "POT-Creation-Date": str(timezone.now()),
+            "MIME-Version": "1.0",
+            "Content-Type": "text/plain; charset=utf-8",
+            "X-WagtailLocalize-TranslationID": str(self.translation.uuid),
+        }
+
+        po.append(
+            polib.POEntry(
+                msgid="This is some test content",
+                msgctxt="test_charfield",
+                msgstr="Contenu de test mis à jour",
+            )
+        )
+
+        # If an entry is repeated, the last one wins
+        po.append(
+            polib.POEntry(
+                msgid="This is some test content",
+                msgctxt="test_charfield",
+                msgstr="Contenu de test mis à jour encore",
+            )
+        )
+
+        warnings = list(self.translation.import_po(po))
+        self.assertEqual(warnings, [])
+
+        translation = StringTranslation.objects.get()
+        self.assertEqual(translation.data, "Contenu de test mis à jour encore")
+
+    def test_import_po_number_of_queries(self):
+        page = create_test_page(
+            title="Test page",
+            slug="test-page-with-lots-of-strings",
+            test_streamfield=StreamValue(
+                TestPage.test_streamfield.field.stream_block,
+                [
+                    {"id": "block-{}".format(i), "type": "test_charblock", "value": "String {}".format(i)}
+                    for i in range(100)
+                ],
+                is_lazy=True,
+            ),
+        )
+        source = TranslationSource.from_instance(page)[0]
+        translation = Translation.objects.create(
+            object=source.object,
+            target_locale=self.fr_locale,
+            source=source,
+        )
+
+        po = translation.export_po()
+        for entry in po:
+            entry.msgstr = entry.msgid.replace("String", "Chaîne")
+
+        # Lookups (3), existing translations (1), create (1), progress (1) and the savepoint (2)
+        with self.assertNumQueries(8):
+            warnings = list(translation.import_po(po))
+
+        self.assertEqual(warnings, [])
+        self.assertEqual(StringTranslation.objects.filter(locale=self.fr_locale).count(), 100)
+        self.assertEqual(
+            StringTranslation.objects.get(context__path="test_streamfield.block-42").data,
+            "Chaîne 42",
+        )
+
+        # Update half of the translations
+        for entry in po[:50]:
+            entry.msgstr += " (mise à jour)"
+
+        # Lookups (3), existing translations (1), update (1), progress (1) and the savepoint (2)
+        with self.assertNumQueries(8):
+            warnings = list(translation.import_po(po))
+
+        self.assertEqual(warnings, [])
+        self.assertEqual(
+            StringTranslation.objects.get(context__path="test_streamfield.block-0").data,
+            "Chaîne 0 (mise à jour)",
+        )
+        self.assertEqual(
+            StringTranslation.objects.get(context__path="test_streamfield.block-99").data,
+            "Chaîne 99",
+        )
+
     def test_import_po_with_invalid_translation_id(self):
         po = polib.POFile(wrapwidth=200)
         po.metadata = {
@@ -566,3 +784,108 @@ class TestSaveTarget(TestCase):
 
         with self.assertRaises(CannotSaveDraftError):
             translation.save_target(publish=False)
+
+
+class TestTranslationMemoryReuse(TestCase):
+    def setUp(self):
+        self.fr_locale = Locale.objects.create(language_code="fr")
+
+        self.page = create_test_page(
+            title="Test page",
+            slug="test-slug",
+            test_charfield="Test content",
+            test_textfield="More test content"
+        )
+        self.source = TranslationSource.objects.get()
+        self.translation = Translation.objects.create(
+            object=self.source.object,
+            target_locale=self.fr_locale,
+            source=self.source,
+        )
+
+        self.test_charfield_context = TranslationContext.objects.get(path="test_charfield")
+        self.test_content_string = String.objects.get(data="Test content")
+
+        # The same string is used in some snippets, which gives it some other contexts
+        self.snippet_contexts = []
+        for i in range(3):
+            snippet_source, created = TranslationSource.from_instance(TestSnippet.objects.create(field="Test content"))
+            snippet_source.extract_segments()
+            self.snippet_contexts.append(TranslationContext.objects.get(object_id=snippet_source.object_id, path="field"))
+
+    def translate(self, context, data, updated_at):
+        string_translation = StringTranslation.objects.create(
+            translation_of=self.test_content_string,
+            context=context,
+            locale=self.fr_locale,
+            data=data,
+        )
+
+        # updated_at is set by auto_now, so it has to be changed with an update
+        StringTranslation.objects.filter(id=string_translation.id).update(updated_at=updated_at)
+
+    def get_translations(self, **kwargs):
+        return dict(
+            StringSegment.objects.filter(source=self.source)
+            .annotate_translation(self.fr_locale, **kwargs)
+            .values_list("string__data", "translation")
+        )
+
+    def test_translations_from_other_contexts_arent_used_by_default(self):
+        self.translate(self.snippet_contexts[0], "Contenu de test", timezone.now())
+
+        self.assertEqual(self.get_translations(), {
+            "Test content": None,
+            "More test content": None,
+        })
+
+    def test_most_recent_fallback(self):
+        now = timezone.now()
+        self.translate(self.snippet_contexts[0], "Contenu de test", now - timedelta(days=1))
+        self.translate(self.snippet_contexts[1], "Contenu du test", now)
+
+        with self.assertNumQueries(1):
+            translations = self.get_translations(fallback="most_recent")
+
+        self.assertEqual(translations, {
+            "Test content": "Contenu du test",
+            "More test content": None,
+        })
+
+    def test_most_frequent_fallback(self):
+        now = timezone.now()
+        self.translate(self.snippet_contexts[0], "Contenu de test", now - timedelta(days=2))
+        self.translate(self.snippet_contexts[1], "Contenu de test", now - timedelta(days=1))
+        self.translate(self.snippet_contexts[2], "Contenu du test", now)
+
+        with self.assertNumQueries(1):
+            translations = self.get_translations(fallback="most_frequent")
+
+        self.assertEqual(translations["Test content"], "Contenu de test")
+
+    def test_translation_in_context_takes_precedence(self):
+        now = timezone.now()
+        self.translate(self.test_charfield_context, "Contenu de test", now - timedelta(days=1))
+        self.translate(self.snippet_contexts[0], "Contenu du test", now)
+
+        self.assertEqual(self.get_translations(fallback="most_recent")["Test content"], "Contenu de test")
+
+    def test_unrecognised_fallback(self):
+        with self.assertRaises(ValueError):
+            self.get_translations(fallback="best")
+
+    def test_prefill_from_memory(self):
+        self.translate(self.snippet_contexts[0], "Contenu de test", timezone.now())
+
+        self.assertEqual(self.translation.prefill_from_memory(), 1)
+
+        string_translation = StringTranslation.objects.get(context=self.test_charfield_context)
+        self.assertEqual(string_translation.translation_of, self.test_content_string)
+        self.assertEqual(string_translation.locale, self.fr_locale)
+        self.assertEqual(string_translation.data, "Contenu de test")
+
+        self.translation.refresh_from_db()
+        self.assertEqual((self.translation.total_segments, self.translation.translated_segments), (2, 1))
+
+        # Segments that already have a translation are skipped
+        self.assertEqual(self.translation.prefill_from_memory(), 0)
@@ -1,4 +1,5 @@
 import json
+from unittest import mock
 
 from django.contrib.contenttypes.models import ContentType
 from django.test import TestCase
@@ -17,10 +18,13 @@ from wagtail_localize.models import (
     StringSegment,
     TemplateSegment,
     RelatedObjectSegment,
+    TranslatableObject,
+    Translation,
 )
+from wagtail_localize.machine_translators.dummy import DummyTranslator
 from wagtail_localize.segments import TemplateSegmentValue, RelatedObjectSegmentValue
-from wagtail_localize.segments.extract import extract_segments
-from wagtail_localize.strings import StringValue
+from wagtail_localize.segments.extract import extract_segments, get_unchanged_paths
+from wagtail_localize.strings import StringValue, extract_strings
 from wagtail_localize.test.models import TestPage, TestSnippet
 
 
@@ -137,6 +141,30 @@ class TestFromInstance(TestCase):
         self.assertFalse(created)
         self.assertEqual(source, new_source)
 
+    def test_reuses_existing_source_if_only_json_formatting_changed(self):
+        source = TranslationSource.objects.create(
+            object_id=self.snippet.translation_key,
+            specific_content_type=ContentType.objects.get_for_model(TestSnippet),
+            locale=self.snippet.locale,
+            content_json=json.dumps(
+                {
+                    "locale": self.snippet.locale_id,
+                    "translation_key": str(self.snippet.translation_key),
+                    "field": "This is some test content",
+                    "pk": self.snippet.pk,
+                },
+                indent=4,
+            ),
+            created_at=timezone.now(),
+        )
+
+        self.assertEqual(source.content_hash, TranslationSource.get_content_hash(source.content_json))
+
+        new_source, created = TranslationSource.from_instance(self.snippet)
+
+        self.assertFalse(created)
+        self.assertEqual(source, new_source)
+
     def test_creates_new_source_if_forced(self):
         source = TranslationSource.objects.create(
             object_id=self.snippet.translation_key,
@@ -234,6 +262,241 @@ class TestExportPO(TestCase):
         self.assertEqual(po[0].msgstr, "")
         self.assertFalse(po[0].obsolete)
 
+    def test_stream_po(self):
+        now = timezone.now()
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            chunks = list(self.source.stream_po())
+            po = self.source.export_po()
+
+        self.assertEqual("".join(chunks), str(po))
+
+
+class TestExtractSegments(TestCase):
+    def get_streamfield_value(self, block_numbers, changed_blocks=None):
+        return StreamValue(
+            TestPage.test_streamfield.field.stream_block,
+            [
+                {
+                    "id": "00000000-0000-0000-0000-{:012d}".format(i),
+                    "type": "test_richtextblock",
+                    "value": (changed_blocks or {}).get(i) or '<p>Paragraph {0}</p><ul><li>Item {0}</li><li><b>Bold</b> item</li></ul>'.format(i),
+                }
+                for i in block_numbers
+            ],
+            is_lazy=True,
+        )
+
+    def create_page(self, num_blocks):
+        snippet = TestSnippet.objects.create(field="Test snippet content")
+        page = Page.objects.get(id=1).add_child(
+            instance=TestPage(
+                title="Test page",
+                slug="test-page-{}".format(num_blocks),
+                test_charfield="This is some test content",
+                test_snippet=snippet,
+                test_streamfield=self.get_streamfield_value(range(num_blocks)),
+            )
+        )
+        return TranslationSource.from_instance(page)[0]
+
+    def test_extract_segments(self):
+        source = self.create_page(2)
+        source.extract_segments()
+
+        self.assertEqual(
+            list(
+                StringSegment.objects.filter(source=source)
+                .order_by("order")
+                .values_list("context__path", "string__data")
+            ),
+            [
+                ("test_charfield", "This is some test content"),
+                ("test_streamfield.00000000-0000-0000-0000-000000000000", "Paragraph 0"),
+                ("test_streamfield.00000000-0000-0000-0000-000000000000", "Item 0"),
+                ("test_streamfield.00000000-0000-0000-0000-000000000000", "<b>Bold</b> item"),
+                ("test_streamfield.00000000-0000-0000-0000-000000000001", "Paragraph 1"),
+                ("test_streamfield.00000000-0000-0000-0000-000000000001", "Item 1"),
+                ("test_streamfield.00000000-0000-0000-0000-000000000001", "<b>Bold</b> item"),
+            ],
+        )
+        self.assertEqual(TemplateSegment.objects.filter(source=source).count(), 2)
+        self.assertEqual(RelatedObjectSegment.objects.filter(source=source).count(), 1)
+
+        # Both blocks share the same template and the same "<b>Bold</b> item" string
+        self.assertEqual(
+            TemplateSegment.objects.filter(source=source).values("template").distinct().count(), 1
+        )
+        self.assertEqual(
+            StringSegment.objects.filter(source=source, string__data="<b>Bold</b> item").values("string").distinct().count(), 1
+        )
+
+    def test_extract_segments_twice_doesnt_duplicate_segments(self):
+        source = self.create_page(2)
+        source.extract_segments()
+        source.extract_segments()
+
+        self.assertEqual(StringSegment.objects.filter(source=source).count(), 7)
+        self.assertEqual(TemplateSegment.objects.filter(source=source).count(), 2)
+        self.assertEqual(RelatedObjectSegment.objects.filter(source=source).count(), 1)
+
+    def test_number_of_queries_doesnt_depend_on_number_of_segments(self):
+        small_source = self.create_page(2)
+        # Note: kept small enough that SQLite doesn't need to split any inserts into multiple batches
+        large_source = self.create_page(50)
+
+        ContentType.objects.clear_cache()
+        with self.assertNumQueries(32):
+            small_source.extract_segments()
+
+        # Two fewer queries as the template was created by the first source
+        ContentType.objects.clear_cache()
+        with self.assertNumQueries(30):
+            large_source.extract_segments()
+
+        self.assertEqual(StringSegment.objects.filter(source=large_source).count(), 151)
+
+        # The strings, template, contexts and related object already exist now
+        ContentType.objects.clear_cache()
+        with self.assertNumQueries(21):
+            large_source.extract_segments()
+
+    def test_extract_segments_copies_unchanged_segments_from_previous_source(self):
+        previous_source = self.create_page(3)
+        previous_source.extract_segments()
+
+        # Change the second block and add a new one at the beginning
+        page = previous_source.get_source_instance()
+        page.test_streamfield = self.get_streamfield_value([3, 0, 1, 2], changed_blocks={1: "<p>Changed paragraph</p>"})
+        page.save()
+        source, created = TranslationSource.from_instance(page)
+        self.assertEqual(source.get_previous_source(), previous_source)
+
+        with mock.patch("wagtail_localize.segments.extract.extract_strings", wraps=extract_strings) as extract_strings_mock:
+            source.extract_segments()
+
+        # Only the changed and the new blocks were extracted
+        self.assertEqual(extract_strings_mock.call_count, 2)
+
+        # The segments are the same as if everything had been extracted
+        def get_segments(source):
+            return [
+                (segment.__class__.__name__, segment.context.path, segment.order, getattr(segment, "string_id", None), getattr(segment, "template_id", None), getattr(segment, "object_id", None))
+                for model in [StringSegment, TemplateSegment, RelatedObjectSegment]
+                for segment in model.objects.filter(source=source).select_related("context")
+            ]
+
+        segments = get_segments(source)
+        StringSegment.objects.filter(source=source).delete()
+        TemplateSegment.objects.filter(source=source).delete()
+        RelatedObjectSegment.objects.filter(source=source).delete()
+        source.save_segments(extract_segments(source.as_instance()))
+
+        self.assertEqual(sorted(segments, key=lambda segment: segment[2]), sorted(get_segments(source), key=lambda segment: segment[2]))
+        self.assertEqual(
+            list(StringSegment.objects.filter(source=source).order_by("order").values_list("string__data", flat=True)),
+            [
+                "This is some test content",
+                "Paragraph 3", "Item 3", "<b>Bold</b> item",
+                "Paragraph 0", "Item 0", "<b>Bold</b> item",
+                "Changed paragraph",
+                "Paragraph 2", "Item 2", "<b>Bold</b> item",
+            ],
+        )
+
+    def test_get_unchanged_paths(self):
+        old_data = {
+            "test_charfield": "Foo",
+            "test_textfield": "Bar",
+            "test_streamfield": json.dumps([
+                {"id": "block-1", "type": "test_textblock", "value": "One"},
+                {"id": "block-2", "type": "test_textblock", "value": "Two"},
+            ]),
+            "test_childobjects": [
+                {"pk": 1, "translation_key": "child-1", "field": "One"},
+                {"pk": 2, "translation_key": "child-2", "field": "Two"},
+            ],
+        }
+        new_data = {
+            "test_charfield": "Foo",
+            "test_textfield": "Changed",
+            "test_streamfield": json.dumps([
+                {"id": "block-1", "type": "test_textblock", "value": "One"},
+                {"id": "block-2", "type": "test_textblock", "value": "Changed"},
+            ]),
+            "test_childobjects": [
+                {"pk": 1, "translation_key": "child-1", "field": "One"},
+                {"pk": 2, "translation_key": "child-2", "field": "Changed", "sort_order": 1},
+            ],
+        }
+
+        self.assertEqual(get_unchanged_paths(TestPage, old_data, new_data), {
+            ("test_charfield",),
+            ("test_streamfield", "block-1"),
+            ("test_childobjects", "child-1"),
+        })
+
+
+class TestMachineTranslate(TestCase):
+    def setUp(self):
+        self.page_a = create_test_page(title="Page A", slug="page-a", test_charfield="Read more", test_textfield="Hello world")
+        self.page_b = create_test_page(title="Page B", slug="page-b", test_charfield="Read more", test_textfield="Read more")
+        self.sources = TranslationSource.objects.filter(object_id__in=[self.page_a.translation_key, self.page_b.translation_key])
+        self.fr_locale = Locale.objects.create(language_code="fr")
+        self.de_locale = Locale.objects.create(language_code="de")
+
+    def test_machine_translate(self):
+        translator = DummyTranslator({})
+
+        with mock.patch.object(DummyTranslator, "translate", wraps=translator.translate) as translate:
+            created = self.sources.machine_translate([self.fr_locale, self.de_locale], machine_translator=translator)
+
+        # Each unique string is translated once per locale
+        self.assertEqual(translate.call_count, 2)
+        self.assertEqual(
+            [string.data for string in translate.call_args[0][2]],
+            [string.data for string in translate.call_args_list[0][0][2]],
+        )
+        self.assertEqual(sorted(string.data for string in translate.call_args[0][2]), ["Hello world", "Read more"])
+
+        # But translations are created for every context
+        self.assertEqual(created, {self.fr_locale: 4, self.de_locale: 4})
+        self.assertEqual(
+            StringTranslation.objects.filter(
+                locale=self.fr_locale,
+                context__object_id=self.page_b.translation_key,
+                context__path="test_textfield",
+            ).get().data,
+            "more Read",
+        )
+
+    def test_only_missing_translations_are_created(self):
+        translator = DummyTranslator({})
+        string = String.objects.get(data="Read more")
+        StringTranslation.objects.create(
+            translation_of=string,
+            locale=self.fr_locale,
+            context=TranslationContext.objects.get(object_id=self.page_a.translation_key, path="test_charfield"),
+            data="Lire la suite",
+        )
+
+        created = self.sources.machine_translate([self.fr_locale], machine_translator=translator)
+        self.assertEqual(created, {self.fr_locale: 3})
+
+        created = self.sources.machine_translate([self.fr_locale], machine_translator=translator)
+        self.assertEqual(created, {self.fr_locale: 0})
+
+    def test_updates_progress(self):
+        translation = Translation.objects.create(
+            object_id=self.page_a.translation_key,
+            target_locale=self.fr_locale,
+            source=self.sources.get(object_id=self.page_a.translation_key),
+        )
+        self.assertEqual(translation.get_progress(), (2, 0))
+
+        self.sources.machine_translate([self.fr_locale], machine_translator=DummyTranslator({}))
+
+        self.assertEqual(translation.get_progress(), (2, 2))
+
 
 class TestCreateOrUpdateTranslationForPage(TestCase):
     def setUp(self):
@@ -463,3 +726,76 @@ class TestCreateOrUpdateTranslationForPage(TestCase):
         self.assertEqual(e.exception.segment.context.path, "test_snippet")
         self.assertEqual(e.exception.segment.object_id, self.snippet.translation_key)
         self.assertEqual(e.exception.locale, self.dest_locale)
+
+    def test_get_related_object_instances(self):
+        de_locale = Locale.objects.create(language_code="de")
+        de_snippet = self.snippet.copy_for_translation(de_locale)
+        de_snippet.save()
+        es_locale = Locale.objects.create(language_code="es")
+
+        objects = [segment.object for segment in RelatedObjectSegment.objects.filter(source=self.source).select_related("object")]
+
+        with self.assertNumQueries(1):
+            instances = TranslatableObject.objects.get_instances_many(objects, [self.dest_locale, de_locale, es_locale])
+
+        self.assertEqual(instances, {
+            (self.snippet.translation_key, self.dest_locale.id): self.translated_snippet,
+            (self.snippet.translation_key, de_locale.id): de_snippet,
+        })
+
+    def test_create_or_update_translations(self):
+        de_locale = Locale.objects.create(language_code="de")
+        es_locale = Locale.objects.create(language_code="es")
+        self.snippet.copy_for_translation(de_locale).save()
+        self.snippet.copy_for_translation(es_locale).save()
+
+        # Add a streamfield, so we can check that each locale gets its own copy of it
+        self.page.test_streamfield = StreamValue(
+            TestPage.test_streamfield.field.stream_block,
+            [
+                {
+                    "id": "id",
+                    "type": "test_charblock",
+                    "value": "This is some test content",
+                }
+            ],
+            is_lazy=True,
+        )
+        self.page.save_revision().publish()
+        self.page.refresh_from_db()
+        source = TranslationSource.from_instance(self.page)[0]
+        source.extract_segments()
+
+        for locale, data in [(self.dest_locale, "Ceci est du contenu de test"), (de_locale, "Dies ist ein Testinhalt")]:
+            for path in ["test_charfield", "test_streamfield.id"]:
+                StringTranslation.objects.update_or_create(
+                    translation_of=self.string,
+                    locale=locale,
+                    context=TranslationContext.objects.get(object_id=self.page.translation_key, path=path),
+                    defaults={"data": data},
+                )
+
+        # There are no translations into Spanish, so that one should fail
+        translations, errors = source.create_or_update_translations([self.dest_locale, de_locale, es_locale])
+
+        self.assertEqual(translations.keys(), {self.dest_locale, de_locale})
+
+        fr_page, created = translations[self.dest_locale]
+        self.assertTrue(created)
+        self.assertEqual(fr_page.test_charfield, "Ceci est du contenu de test")
+        self.assertEqual(fr_page.test_streamfield[0].value, "Ceci est du contenu de test")
+        self.assertEqual(fr_page.test_snippet, self.translated_snippet)
+
+        de_page, created = translations[de_locale]
+        self.assertTrue(created)
+        self.assertEqual(de_page.test_charfield, "Dies ist ein Testinhalt")
+        self.assertEqual(de_page.test_snippet, self.snippet.get_translation(de_locale))
+        self.assertEqual(de_page.test_streamfield[0].value, "Dies ist ein Testinhalt")
+
+        self.assertEqual(errors.keys(), {es_locale})
+        self.assertIsInstance(errors[es_locale], MissingTranslationError)
+        self.assertFalse(TestPage.objects.filter(translation_key=self.page.translation_key, locale=es_locale).exists())
+
+        # The French page in the database wasn't changed by the German translation
+        fr_page = TestPage.objects.get(id=fr_page.id)
+        self.assertEqual(fr_page.test_streamfield[0].value, "Ceci est du contenu de test")
@@ -0,0 +1,218 @@
+import hashlib
+import random
+import re
+
+from django.conf import settings
+
+
+# Strings are indexed using MinHash locality-sensitive hashing. The MinHash signature of each
+# string's shingles is split into bands and a hash of each band is stored in StringMinHashBand.
+# Strings that share a band hash with the text being searched for are candidates, which are
+# then ranked by their actual similarity. With 8 bands of 4 rows, strings with a similarity of
+# 0.8 are found more than 98% of the time, and ones with 0.3 or less are rarely looked at.
+NUM_BANDS = 8
+ROWS_PER_BAND = 4
+
+# (a, b) pairs for the hash functions of the MinHash signature. These are generated with a
+# fixed seed as band hashes are stored in the database so they must never change.
+MERSENNE_PRIME = (1 << 61) - 1
+_random = random.Random(2029)
+PERMUTATIONS = [
+    (_random.randrange(1, MERSENNE_PRIME), _random.randrange(0, MERSENNE_PRIME))
+    for i in range(NUM_BANDS * ROWS_PER_BAND)
+]
+
+# How many candidates to rank for each requested match
+CANDIDATES_PER_MATCH = 10
+
+TAG_RE = re.compile(r"<[^>]*>")
+WORD_RE = re.compile(r"\w+")
+
+
+def get_shingles(text):
+    """
+    Returns the set of words and pairs of adjacent words in the given text, ignoring case
+    and any HTML tags.
+    """
+    words = WORD_RE.findall(TAG_RE.sub(" ", text).lower())
+    return set(words) | {" ".join(pair) for pair in zip(words, words[1:])}
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def get_minhash(shingles):
+    """
+    Returns the MinHash signature of the given set of shingles.
+    """
+    hashes = [_hash(shingle) for shingle in shingles]
+
+    return [
+        min((a * h + b) % MERSENNE_PRIME for h in hashes)
+        for a, b in PERMUTATIONS
+    ]
+
+
+def get_band_hashes(text):
+    """
+    Returns a hash of each band of the text's MinHash signature, or an empty list if the
+    text doesn't contain any words.
+
+    These are signed 64 bit integers, so they fit in a BigIntegerField. The band's index
+    is included in its hash so that values from different bands never match.
+    """
+    shingles = get_shingles(text)
+    if not shingles:
+        return []
+
+    minhash = get_minhash(shingles)
+
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                repr((band, minhash[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])).encode(),
+                digest_size=8,
+            ).digest(),
+            "big",
+            signed=True,
+        )
+        for band in range(NUM_BANDS)
+    ]
+
+
+def get_similarity(shingles_a, shingles_b):
+    """
+    Returns the Jaccard similarity of two sets of shingles.
+    """
+    if not shingles_a or not shingles_b:
+        return 0.0
+
+    return len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+
+
+def is_index_enabled():
+    """
+    Returns True if new Strings should be added to the index as they are created.
+
+    This is enabled with the WAGTAILLOCALIZE_TRANSLATION_MEMORY_INDEX setting.
+    """
+    return bool(getattr(settings, 'WAGTAILLOCALIZE_TRANSLATION_MEMORY_INDEX', False))
+
+
+def index_strings(strings):
+    """
+    Adds the given Strings to the index.
+    """
+    from .models import StringMinHashBand
+
+    StringMinHashBand.objects.bulk_create([
+        StringMinHashBand(string_id=string.id, locale_id=string.locale_id, band_hash=band_hash)
+        for string in strings
+        for band_hash in get_band_hashes(string.data)
+    ])
+
+
+def update_index(batch_size=1000):
+    """
+    Adds any Strings that aren't in the index yet, such as the ones that were created before
+    the index was enabled. Returns the number of Strings that were indexed.
+    """
+    from django.db.models import Exists, OuterRef
+
+    from .models import String, StringMinHashBand
+
+    strings = (
+        String.objects.annotate(is_indexed=Exists(StringMinHashBand.objects.filter(string_id=OuterRef("pk"))))
+        .filter(is_indexed=False)
+        .only("id", "locale_id", "data")
+        .order_by("id")
+    )
+
+    # Fetched in batches rather than with iterator() as the index is written to in the loop.
+    # Strings without any words have no band hashes, so batches are paged by id
+    num_indexed = 0
+    last_id = 0
+    while True:
+        batch = list(strings.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return num_indexed
+
+        index_strings(batch)
+        num_indexed += len(batch)
+        last_id = batch[-1].id
+
+
+class TranslationMemoryMatch:
+    """
+    A source string that is similar to the text that was searched for, with its existing
+    StringTranslations.
+    """
+    def __init__(self, string, similarity, translations):
+        self.string = string
+        self.similarity = similarity
+        self.translations = translations
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, TranslationMemoryMatch)
+            and self.string == other.string
+            and self.similarity == other.similarity
+            and self.translations == other.translations
+        )
+
+    def __repr__(self):
+        return f"<TranslationMemoryMatch '{self.string.data}' {self.similarity:.2f}>"
+
+
+def find_similar_strings(locale, text, target_locale=None, limit=5, min_similarity=0.5):
+    """
+    Returns up to `limit` TranslationMemoryMatches for the source strings in the given locale
+    that are most similar to the text, most similar first.
+
+    Only the translations into target_locale are returned, if it's specified.
+
+    Only indexed strings can be found, see is_index_enabled and update_index.
+    """
+    from django.db.models import Count
+
+    from .models import String, StringMinHashBand, StringTranslation, pk
+
+    band_hashes = get_band_hashes(text)
+    if not band_hashes:
+        return []
+
+    # Strings that share the most bands are likely to be the most similar, so only rank those
+    candidate_ids = (
+        StringMinHashBand.objects.filter(locale_id=pk(locale), band_hash__in=band_hashes)
+        .values("string_id")
+        .annotate(matching_bands=Count("id"))
+        .order_by("-matching_bands")
+        .values_list("string_id", flat=True)[:limit * CANDIDATES_PER_MATCH]
+    )
+
+    shingles = get_shingles(text)
+    matches = []
+    for string in String.objects.filter(id__in=list(candidate_ids)):
+        similarity = get_similarity(shingles, get_shingles(string.data))
+
+        if similarity >= min_similarity:
+            matches.append((similarity, string))
+
+    matches.sort(key=lambda match: (-match[0], match[1].id))
+    matches = matches[:limit]
+
+    translations = StringTranslation.objects.filter(
+        translation_of_id__in=[string.id for similarity, string in matches]
+    ).order_by("id")
+    if target_locale is not None:
+        translations = translations.filter(locale_id=pk(target_locale))
+
+    translations_by_string_id = {}
+    for translation in translations:
+        translations_by_string_id.setdefault(translation.translation_of_id, []).append(translation)
+
+    return [
+        TranslationMemoryMatch(string, similarity, translations_by_string_id.get(string.id, []))
+        for similarity, string in matches
+    ]